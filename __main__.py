@@ -0,0 +1,79 @@
+"""Command line tools
+
+Run from a checkout with: python <checkout> grep [-F] [-i] [-c] [-j WORKERS] PATTERN FILE...
+                      or: python <checkout> codegen [-i] [--eager] [-o OUTPUT] MODULE
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from model._klean import _str_to_klean_obj
+from matchers.files import search_file
+from resolvers.codegen import definitions, generate
+from resolvers.python_bytes import ENCODINGS
+from resolvers.python_parse import parse
+
+def _grep(args):
+    # print every match as offset:match, like grep -bo, with the file name
+    # first when there are several files
+    flags = re.IGNORECASE if args.ignore_case else 0
+    klean = _str_to_klean_obj(args.pattern) if args.fixed_strings else parse(args.pattern)
+    out = sys.stdout.buffer
+    found = False
+    for path in args.files:
+        matches = search_file(klean, path, workers=args.workers, flags=flags, encoding=args.encoding)
+        found = found or bool(matches)
+        prefix = f'{path}:'.encode() if len(args.files) > 1 else b''
+        if args.count:
+            out.write(prefix + f'{len(matches)}\n'.encode())
+            continue
+        for match in matches:
+            out.write(prefix + f'{match.start}:'.encode() + match.data + b'\n')
+    out.flush()
+    return 0 if found else 1
+
+def _codegen(args):
+    # write the module of compiled patterns for every Klean global of a module,
+    # which may be imported from the working directory
+    sys.path.insert(1, os.getcwd())
+    flags = re.IGNORECASE if args.ignore_case else 0
+    source = generate(definitions(args.module), flags=flags, lazy=not args.eager,
+                      source=args.module)
+    if args.output is None:
+        sys.stdout.write(source)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            out.write(source)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='klean')
+    commands = parser.add_subparsers(dest='command', required=True)
+    grep = commands.add_parser('grep', help='print the byte offset of every match in files')
+    grep.add_argument('pattern', help='a python regular expression')
+    grep.add_argument('files', nargs='+')
+    grep.add_argument('-F', '--fixed-strings', action='store_true',
+                      help='find the pattern as plain text')
+    grep.add_argument('-i', '--ignore-case', action='store_true')
+    grep.add_argument('-c', '--count', action='store_true', help='print only the number of matches')
+    grep.add_argument('-j', '--workers', type=int, default=None,
+                      help='processes to search with, by default one per core')
+    grep.add_argument('--encoding', choices=ENCODINGS, default='utf-8')
+    grep.set_defaults(run=_grep)
+    codegen = commands.add_parser('codegen', help='write a module of precompiled patterns')
+    codegen.add_argument('module', help='an importable module whose public Klean globals to write')
+    codegen.add_argument('-o', '--output', help='the file to write, by default standard output')
+    codegen.add_argument('-i', '--ignore-case', action='store_true')
+    codegen.add_argument('--eager', action='store_true',
+                         help='compile every pattern on import rather than on first use')
+    codegen.set_defaults(run=_codegen)
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Run the benchmark suite, save the results as JSON and compare to a baseline
+
+Run from the repository root with:
+    python -m benchmarks [--quick] [--output results.json] [--baseline baseline.json]
+
+A saved --output file is itself a baseline for later runs. Cases more than
+--threshold times slower than the baseline are listed as regressions and the
+exit status is 1.
+"""
+
+import argparse
+import json
+import platform
+import sys
+
+from benchmarks import suite
+from benchmarks._harness import report
+
+def compare(results, baseline, threshold):
+    """Rows of (case, baseline s, current s, ratio) and the names of regressions"""
+    rows = []
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            rows.append((name, '-', seconds, '-'))
+            continue
+        ratio = seconds / before if before else float('inf')
+        rows.append((name, before, seconds, ratio))
+        if ratio > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--quick', action='store_true', help='only run the smaller sizes')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='slowdown from the baseline counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = suite.run(args.quick)
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'quick': args.quick,
+        'results': results,
+        }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+    if not args.baseline:
+        report('benchmarks', list(results.items()), ('case', 'seconds'))
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    rows, regressions = compare(results, baseline, args.threshold)
+    report('benchmarks', rows, ('case', 'baseline s', 'seconds', 'ratio'))
+    for name in regressions:
+        print(f'regression: {name}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""Shared timing helpers for the benchmark scripts"""
+
+import time
+
+def best_of(func, repeat=3):
+    """Run func repeat times and return the fastest wall clock time in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def report(title, rows, columns):
+    """Print rows of (label, *values) under a title as an aligned table"""
+    print(title)
+    # the labels are right aligned as wide as the longest of them
+    width = max([16] + [len(str(row[0])) + 2 for row in rows])
+    print('  ' + f'{columns[0]:>{width}}' + ''.join(f'{column:>16}' for column in columns[1:]))
+    for row in rows:
+        print('  ' + f'{row[0]:>{width}}' +
+              ''.join(f'{value:>16.6g}' if isinstance(value, float) else f'{value:>16}'
+                      for value in row[1:]))
@@ -0,0 +1,54 @@
+"""Compare naive and trie-factored alternations of 100 to 100k keywords
+
+Run from the repository root with: python -m benchmarks.alternation
+"""
+
+import random
+import re
+
+from model._klean import Group, Sequence
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+SIZES = (100, 1000, 10000, 100000)
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+def keywords(count, seed=0):
+    """count distinct sorted lower case words, 4 to 10 characters long"""
+    generator = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(generator.choice(ALPHABET) for _ in range(generator.randint(4, 10))))
+    return sorted(words)
+
+def corpus(words, length=100000, seed=1):
+    """Random text of about length characters with some of the words mixed in"""
+    generator = random.Random(seed)
+    pieces = []
+    size = 0
+    while size < length:
+        if generator.random() < 0.05:
+            pieces.append(generator.choice(words))
+        else:
+            pieces.append(''.join(generator.choice(ALPHABET + ' ') for _ in range(8)))
+        size += len(pieces[-1])
+    return ''.join(pieces)
+
+def run():
+    rows = []
+    for size in SIZES:
+        words = keywords(size)
+        text = corpus(words)
+        naive = '(' + '|'.join(map(re.escape, words)) + ')'
+        trie = format(Group(*map(Sequence, words), OR=True))
+        for name, pattern in (('naive', naive), ('trie', trie)):
+            compile_seconds = best_of(lambda: re.compile(pattern), repeat=1)
+            compiled = re.compile(pattern)
+            search_seconds = best_of(lambda: compiled.findall(text), repeat=1)
+            rows.append((f'{name} {size}', len(pattern), compile_seconds, search_seconds))
+        assert re.findall(naive, text) == re.findall(trie, text)
+    return rows
+
+if __name__ == '__main__':
+    report('alternation of keywords', run(), ('pattern', 'length', 'compile s', 'findall s'))
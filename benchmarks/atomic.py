@@ -0,0 +1,31 @@
+"""Time a validation pattern failing with and without atomic groups
+
+(\w+\s?)+\Z backtracks through every way of dividing a run of word characters
+before failing; made atomic or possessive, each division is tried once.
+
+Run from the repository root with: python -m benchmarks.atomic
+"""
+
+from model._klean import Group, Quantification
+from model.representations import StringEnd, StringStart, Whitespace, Word
+from resolvers.python import compile
+
+from benchmarks._harness import best_of, report
+
+def _words(atomic=False, possessive=False):
+    word = Group(Group(Word(), repetition=Quantification(min=1)),
+                 Group(Whitespace(), repetition=Quantification(max=1)), atomic=atomic)
+    words = Group(word, repetition=Quantification(min=1, possessive=possessive))
+    return Group(StringStart(), words, StringEnd())
+
+def main():
+    patterns = [compile(_words()), compile(_words(atomic=True)), compile(_words(possessive=True))]
+    rows = []
+    for size in (14, 18, 22):
+        string = 'a' * size + '!'
+        rows.append((f'{size} chars', *(best_of(lambda: pattern.search(string), 1)
+                                        for pattern in patterns)))
+    report('failing search', rows, ('input', 'plain s', 'atomic s', 'possessive s'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Compare re with the linear-time automaton on adversarial and ordinary input
+
+Run from the repository root with: python -m benchmarks.automaton
+"""
+
+import random
+
+from model._klean import Group, Quantification, Sequence
+from model.representations import Decimal, StringEnd, StringStart, Whitespace, Word
+from resolvers import automaton, python
+
+from benchmarks._harness import best_of, report
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 :'
+
+def adversarial():
+    # (\w+\s?)+\Z against a run of word characters ending in a non-word one;
+    # re tries every way of dividing the run before failing
+    part = Group(Group(Word(), repetition=Quantification(min=1)),
+                 Group(Whitespace(), repetition=Quantification(max=1)))
+    exp = Group(StringStart(), Group(part, repetition=Quantification(min=1)), StringEnd())
+    pattern = python.compile(exp)
+    matcher = automaton.compile(exp)
+    rows = []
+    for size in (14, 18, 22):
+        string = 'a' * size + '!'
+        rows.append((f'{size} chars', best_of(lambda: pattern.search(string), 1),
+                     best_of(lambda: matcher.search(string))))
+    string = 'a' * 100000 + '!'
+    rows.append(('100000 chars', '-', best_of(lambda: matcher.search(string))))
+    return rows
+
+def ordinary():
+    exp = Group(Sequence('id:'), Group(Decimal(), repetition=Quantification(min=1)))
+    generator = random.Random(0)
+    text = ''.join(generator.choice(ALPHABET) for _ in range(200000))
+    pattern = python.compile(exp)
+    matcher = automaton.compile(exp)
+    plain = best_of(lambda: [m.span() for m in pattern.finditer(text)])
+    linear = best_of(lambda: [m.span() for m in matcher.finditer(text)])
+    return [('200000 chars', plain, linear)]
+
+if __name__ == '__main__':
+    report('backtracking', adversarial(), ('input', 're s', 'automaton s'))
+    report('finditer', ordinary(), ('input', 're s', 'automaton s'))
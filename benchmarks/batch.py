@@ -0,0 +1,34 @@
+"""Compare a python loop of re.match with match_many across worker counts
+
+Run from the repository root with: python -m benchmarks.batch
+"""
+
+import os
+import random
+
+from model._klean import Group, Quantification
+from model.representations import Decimal, StringEnd, StringStart, Word
+from matchers.batch import match_many
+from resolvers.python import compile
+
+from benchmarks._harness import best_of, report
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+def run(count=1000000):
+    exp = Group(StringStart(), Group(Word(), repetition=Quantification(min=1, max=16)),
+                Decimal(), StringEnd())
+    generator = random.Random(0)
+    strings = [''.join(generator.choice(ALPHABET) for _ in range(generator.randint(1, 20)))
+               for _ in range(count)]
+    pattern = compile(exp)
+    rows = [('loop', best_of(lambda: [pattern.match(string) is not None for string in strings]))]
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        rows.append((f'{workers} processes', best_of(
+            lambda: match_many(exp, strings, workers=workers, executor='process'))))
+        workers *= 2
+    return rows
+
+if __name__ == '__main__':
+    report('validate 1000000 strings', run(), ('', 'seconds'))
@@ -0,0 +1,53 @@
+"""Compare matching with every Group capturing against only the asked for ones
+
+Every Group used to be written as a capturing group; now they are written as
+(?:...) unless they capture. The capturing patterns here are the same trees
+with every Group made to capture.
+
+Run from the repository root with: python -m benchmarks.capture
+"""
+
+import random
+import re
+
+from model._klean import Group, Quantification, Range
+from model.passes import optimize
+from model.representations import Decimal, Whitespace, Word
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 :-'
+
+def _capture_all(klean):
+    if isinstance(klean, Group) and klean.capture is None:
+        return Group(*klean, OR=klean.OR, repetition=klean.repetition, capture=True)
+    return klean
+
+def _repeat(klean, low=0, high=0):
+    return Group(klean, repetition=Quantification(min=low, max=high))
+
+def cases():
+    digits = lambda count: _repeat(Decimal(), count, count)
+    yield 'date', digits(4) & '-' & digits(2) & '-' & digits(2)
+    yield 'field', _repeat(Word(), 1) & ':' & _repeat(Whitespace()) & Decimal()
+    yield 'pairs', _repeat(Range(('a', 'f')) & Range(('0', '9')), 1)
+    yield 'hex', _repeat(Range(('0', '9'), ('a', 'f')) | '-', 4)
+
+def main():
+    generator = random.Random(0)
+    text = ''.join(generator.choice(ALPHABET) for _ in range(200000))
+    rows = []
+    for name, klean in cases():
+        plain = re.compile(format(klean))
+        capturing = re.compile(format(optimize(klean, [_capture_all])))
+        assert [m.span() for m in plain.finditer(text)] == \
+            [m.span() for m in capturing.finditer(text)]
+        before = best_of(lambda: [m.span() for m in capturing.finditer(text)])
+        after = best_of(lambda: [m.span() for m in plain.finditer(text)])
+        rows.append((name, before, after, f'{before / after:.2f}x'))
+    report('finditer over 200000 characters', rows,
+           ('pattern', 'capturing s', 'plain s', 'speedup'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Time a new process starting with its patterns, with and without codegen
+
+One process imports a module of Klean definitions and compiles them through
+resolvers.python; the other imports the module codegen wrote from those
+definitions, lazily or eagerly, and uses the same patterns.
+
+Run from the repository root with: python -m benchmarks.codegen
+"""
+
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+
+from resolvers.codegen import definitions, generate
+
+from benchmarks._harness import best_of, report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RULES = '''
+from model._klean import Group, Quantification, Sequence
+from model.representations import Decimal, Whitespace, Word
+
+SPACES = Group(Whitespace(), repetition=Quantification())
+{rules}
+'''
+RULE = ("RULE_{i} = Sequence('key{i}') & SPACES & '=' & SPACES & "
+        "Group(Decimal() | Word(), repetition=Quantification(min=1))\n")
+
+def _run(directory, code):
+    subprocess.run([sys.executable, '-c', code], cwd=directory, check=True,
+                   env={**os.environ, 'PYTHONPATH': ROOT})
+
+def main():
+    rows = []
+    for count in (10, 100):
+        with TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'rules.py'), 'w') as out:
+                out.write(RULES.format(rules=''.join(RULE.format(i=i) for i in range(count))))
+            sys.path.insert(0, directory)
+            try:
+                patterns = definitions('rules')
+            finally:
+                sys.path.remove(directory)
+                sys.modules.pop('rules')
+            for name, lazy in (('lazy', True), ('eager', False)):
+                with open(os.path.join(directory, f'{name}.py'), 'w') as out:
+                    out.write(generate(patterns, lazy=lazy, source='rules'))
+            use = f"[{{}}(getattr(rules, f'RULE_{{{{i}}}}')).search('key1 = 3') for i in range({count})]"
+            resolve = 'import rules; from resolvers.python import compile; ' + use.format('compile')
+            rows.append((f'{count} rules', best_of(lambda: _run(directory, resolve)),
+                         best_of(lambda: _run(directory, 'import lazy as rules; ' + use.format(''))),
+                         best_of(lambda: _run(directory, 'import eager as rules; ' + use.format('')))))
+    report('new process', rows, ('patterns', 'resolve s', 'lazy s', 'eager s'))
+
+if __name__ == '__main__':
+    main()
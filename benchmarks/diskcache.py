@@ -0,0 +1,62 @@
+"""Time a cold start compiling many patterns, with and without the disk cache
+
+Each start is timed as a new process would run it: building every tree with
+the operators and resolving it, reading the serialized trees and compiling
+them through a DiskPatternCache already filled by an earlier process, or
+loading the saved patterns by digest without building the trees at all.
+
+Run from the repository root with: python -m benchmarks.diskcache
+"""
+
+import re
+from tempfile import TemporaryDirectory
+
+from model._klean import Group, Quantification, Range, Sequence
+from model.passes import optimize
+from model.representations import Decimal, Whitespace
+from model.serialize import digest, dumps, loads
+from resolvers.diskcache import DiskPatternCache
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+COUNT = 300
+
+def tree(seed):
+    """An alternation of 50 key = value rules, about 500 nodes"""
+    spaces = Group(Whitespace(), repetition=Quantification())
+    rule = lambda i: (Sequence(f'key{seed}_{i}') & spaces & '=' & spaces
+                      & Group(Decimal() | Range(('a', 'f')), repetition=Quantification(min=1)))
+    alternation = rule(0)
+    for i in range(1, 50):
+        alternation = alternation | rule(i)
+    return alternation
+
+def _resolve():
+    re.purge()
+    return [re.compile(format(optimize(tree(seed)))) for seed in range(COUNT)]
+
+def _cached(directory, saved):
+    re.purge()
+    cache = DiskPatternCache(directory)
+    return [cache.compile(loads(data)) for data in saved]
+
+def _by_digest(directory, keys):
+    re.purge()
+    cache = DiskPatternCache(directory)
+    return [cache.load(key) for key in keys]
+
+def main():
+    saved = [dumps(tree(seed)) for seed in range(COUNT)]
+    keys = [digest(loads(data)) for data in saved]
+    with TemporaryDirectory() as directory:
+        _cached(directory, saved)
+        rows = [('build and resolve', best_of(_resolve)),
+                ('load and cache', best_of(lambda: _cached(directory, saved))),
+                ('cache by digest', best_of(lambda: _by_digest(directory, keys)))]
+    report(f'starting with {COUNT} patterns', rows, ('start', 'seconds'))
+    print(f'  serialized {sum(map(len, saved)) // COUNT} characters a tree, '
+          f'{sum(len(format(loads(data))) for data in saved) // COUNT} as patterns')
+
+if __name__ == '__main__':
+    main()
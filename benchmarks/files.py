@@ -0,0 +1,51 @@
+"""Compare reading a file and running re.finditer with search_file
+
+The rare pattern never matches, so each worker scans only its own shard when
+its scan is bounded by the longest match.
+
+Run from the repository root with: python -m benchmarks.files
+"""
+
+import os
+import random
+import tempfile
+
+from model._klean import Group, Quantification, Sequence
+from model.representations import Decimal
+from matchers.files import search_file
+from resolvers.python_bytes import compile
+
+from benchmarks._harness import best_of, report
+
+def run(size=64 * 1024 * 1024):
+    exp = Group(Sequence('ERROR '), Group(Decimal(), repetition=Quantification(min=1)))
+    rare = Group(Sequence('ERROR 5'), Group(Decimal(), repetition=Quantification(min=2, max=2)))
+    generator = random.Random(0)
+    words = ['INFO', 'WARN', 'ERROR', 'request', 'done', '200', '404', 'user']
+    line = lambda: ' '.join(generator.choice(words) for _ in range(8)) + '\n'
+    block = ''.join(line() for _ in range(10000)).encode()
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'log')
+        with open(path, 'wb') as f:
+            for _ in range(size // len(block)):
+                f.write(block)
+        pattern = compile(exp)
+        def whole():
+            with open(path, 'rb') as f:
+                return [(m.start(), m.end(), m.group()) for m in pattern.finditer(f.read())]
+        rows.append(('read + finditer', best_of(whole)))
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            rows.append((f'{workers} processes', best_of(lambda: search_file(exp, path, workers=workers))))
+            workers *= 2
+        rare_pattern = compile(rare)
+        def rare_whole():
+            with open(path, 'rb') as f:
+                return [(m.start(), m.end(), m.group()) for m in rare_pattern.finditer(f.read())]
+        rows.append(('rare, read + finditer', best_of(rare_whole)))
+        rows.append(('rare, 4 processes', best_of(lambda: search_file(rare, path, workers=4))))
+    return rows
+
+if __name__ == '__main__':
+    report('search a 64MB log', run(), ('', 'seconds'))
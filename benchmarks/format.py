@@ -0,0 +1,48 @@
+"""Time resolvers.python.format on generated trees from 10 to 1M nodes
+
+Shared trees are built from a few distinct groups each used twice by the one
+above, so they have the given number of paths through far fewer nodes.
+
+Run from the repository root with: python -m benchmarks.format
+"""
+
+from model._klean import Group, Literal, Quantification, Range, Sequence
+from model.representations import Decimal, Whitespace
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+SIZES = (10, 1000, 100000, 1000000)
+
+def wide_tree(nodes):
+    """An alternation of small concatenations, about nodes nodes in total"""
+    branch = lambda i: Group(Sequence(f'k{i}'), Range(('a', 'f')), Decimal(),
+                             repetition=Quantification(min=1))
+    return Group(*[branch(i) for i in range(max(1, nodes // 4))], OR=True)
+
+def deep_tree(nodes):
+    """A chain of nested quantified Groups, nodes levels deep"""
+    tree = Whitespace()
+    for i in range(nodes - 1):
+        tree = Group(tree, Literal('x'), repetition=Quantification(min=0, max=1))
+    return tree
+
+def shared_tree(nodes):
+    """A chain of Groups each holding the one below twice, about nodes paths"""
+    tree = Group(Sequence('ab'), Decimal(), OR=True)
+    while nodes > 8:
+        tree = Group(tree, Literal('x'), tree, repetition=Quantification(min=1))
+        nodes //= 2
+    return tree
+
+def run():
+    rows = []
+    for shape, build in (('wide', wide_tree), ('deep', deep_tree), ('shared', shared_tree)):
+        for size in SIZES:
+            tree = build(size)
+            seconds = best_of(lambda: format(tree))
+            rows.append((f'{shape} {size}', seconds, size / seconds))
+    return rows
+
+if __name__ == '__main__':
+    report('format()', run(), ('tree', 'seconds', 'nodes/second'))
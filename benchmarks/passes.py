@@ -0,0 +1,56 @@
+"""Time compiling and matching trees before and after each optimization pass
+
+Run from the repository root with: python -m benchmarks.passes
+"""
+
+import random
+import re
+
+from model._klean import Group, Literal, Quantification
+from model.passes import drop_groups, fold_quantifiers, merge_alternatives, merge_literals,\
+    optimize
+from model.representations import Decimal, Word
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 :'
+
+def _compile(klean):
+    re.purge()
+    return re.compile(format(klean))
+
+def _text(alphabet=ALPHABET, length=200000):
+    generator = random.Random(0)
+    return ''.join(generator.choice(alphabet) for _ in range(length))
+
+def cases():
+    # each tree is built the way operators and parsers tend to leave them
+    fields = Literal('k')
+    for i in range(200):
+        fields = Group(fields, Group(Literal(':'), Group(Word())))
+    yield drop_groups, 'nested groups', fields, _text()
+    # every group in an alternation of groups is entered at each position
+    words = Group(*(Group(*map(Literal, f'key{i}'), Decimal()) for i in range(50)), OR=True)
+    yield merge_literals, 'split literals', words, _text(length=20000)
+    # re joins single characters into a class itself when compiling, so this
+    # one saves compile time rather than match time
+    chars = [chr(point) for point in range(0x4e00, 0x5a00, 3)]
+    letters = Group(*map(Literal, chars), OR=True, repetition=Quantification(min=1))
+    yield merge_alternatives, 'char alternation', letters, _text(chars + [' '])
+    nested = Group(Group(Group(Word(), repetition=Quantification(min=1)),
+                         repetition=Quantification(min=1)), Literal('!'))
+    yield fold_quantifiers, 'nested repeat', nested, 'a' * 18
+
+def main():
+    rows = []
+    for rewrite, name, klean, text in cases():
+        for label, tree in (('before', klean), (rewrite.__name__, optimize(klean, [rewrite])),
+                            ('all passes', optimize(klean))):
+            pattern = _compile(tree)
+            rows.append((f'{name}, {label}', best_of(lambda: _compile(tree)),
+                         best_of(lambda: pattern.findall(text), repeat=3)))
+    report('compile and match', rows, ('tree', 're.compile s', 'findall s'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Compare one re.search per rule with a PatternSet over the same log lines
+
+Run from the repository root with: python -m benchmarks.patternset
+"""
+
+import random
+import re
+
+from model._klean import Group, Sequence, Quantification
+from model.representations import Decimal, Whitespace
+from matchers.patternset import PatternSet
+from resolvers.python import format
+
+from benchmarks._harness import best_of, report
+
+SIZES = (10, 100, 300)
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz '
+
+def rules(count, seed=0):
+    """count rules of the form <word>\\s*=\\s*\\d+"""
+    generator = random.Random(seed)
+    result = {}
+    while len(result) < count:
+        word = ''.join(generator.choice(ALPHABET[:-1]) for _ in range(generator.randint(5, 9)))
+        result[word] = Group(Sequence(word), Group(Whitespace(), repetition=Quantification()),
+                             Sequence('='), Group(Whitespace(), repetition=Quantification()),
+                             Group(Decimal(), repetition=Quantification(min=1)))
+    return result
+
+def lines(names, count=2000, seed=1, matching=0.1):
+    """count random lines of 100 characters, the matching share setting some rule's key"""
+    generator = random.Random(seed)
+    result = []
+    for _ in range(count):
+        line = ''.join(generator.choice(ALPHABET) for _ in range(100))
+        if generator.random() < matching:
+            line = line[:50] + f' {generator.choice(names)} = 12 ' + line[50:]
+        result.append(line)
+    return result
+
+def run(matching=0.1):
+    rows = []
+    for size in SIZES:
+        rule_set = rules(size)
+        text = lines(list(rule_set), matching=matching)
+        patterns = [(name, re.compile(format(klean))) for name, klean in rule_set.items()]
+        combined = PatternSet(rule_set)
+        separate = lambda: [[name for name, pattern in patterns if pattern.search(line)]
+                            for line in text]
+        assert separate() == [combined.search(line) for line in text]
+        rows.append((f'{size} rules', best_of(separate),
+                     best_of(lambda: [combined.search(line) for line in text])))
+    return rows
+
+if __name__ == '__main__':
+    for matching in (0.1, 1.0):
+        report(f'search 2000 lines, {matching:.0%} setting a key', run(matching),
+               ('rules', 'separate s', 'patternset s'))
@@ -0,0 +1,64 @@
+"""Compare plain re searches with prefiltered Matcher searches over log lines
+
+Run from the repository root with: python -m benchmarks.prefilter
+"""
+
+import random
+
+from model._klean import Group, Sequence, Quantification
+from model.representations import Decimal, StringEnd, StringStart, Whitespace, Word
+from matchers.prefilter import Matcher
+
+from benchmarks._harness import best_of, report
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 :'
+RATES = (0.0, 0.01, 0.1, 0.5)
+
+def lines(count, rate, seed=0):
+    """count random lines of 80 characters, about rate of them holding a match"""
+    generator = random.Random(seed)
+    result = []
+    for _ in range(count):
+        line = ''.join(generator.choice(ALPHABET) for _ in range(80))
+        if generator.random() < rate:
+            line = line[:40] + 'xy Title: 4 and' + line[55:]
+        result.append(line)
+    return result
+
+def run():
+    # the literal is not at the start, so re cannot skip ahead to it by itself
+    exp = Group(Group(Word(), repetition=Quantification(min=1)),
+                Group(Whitespace(), repetition=Quantification()), Sequence('Title:'),
+                Group(Whitespace(), repetition=Quantification(min=1)), Decimal())
+    rows = []
+    for rate in RATES:
+        text = lines(20000, rate)
+        matcher = Matcher(exp)
+        pattern = matcher.pattern
+        plain = best_of(lambda: [pattern.search(line) for line in text])
+        matcher.clear()
+        filtered = best_of(lambda: [matcher.search(line) for line in text])
+        info = matcher.info()
+        rows.append((f'{rate:.0%} matching', plain, filtered, f'{info.rejected / info.checked:.1%}'))
+    return rows
+
+def validate():
+    # bulk validation of identifiers, where most inputs fail on length alone;
+    # re backtracks through the nested repeats before rejecting them
+    part = Group(Word(), repetition=Quantification(min=1, max=4))
+    exp = Group(StringStart(), Group(part, repetition=Quantification(min=2, max=6)),
+                Decimal(), StringEnd())
+    generator = random.Random(1)
+    inputs = [''.join(generator.choice(ALPHABET[:36]) for _ in range(generator.randint(1, 60)))
+              for _ in range(20000)]
+    matcher = Matcher(exp)
+    pattern = matcher.pattern
+    plain = best_of(lambda: [pattern.search(line) for line in inputs])
+    matcher.clear()
+    filtered = best_of(lambda: [matcher.search(line) for line in inputs])
+    info = matcher.info()
+    return [('identifiers', plain, filtered, f'{info.rejected / info.checked:.1%}')]
+
+if __name__ == '__main__':
+    report('search 20000 lines', run(), ('lines', 're s', 'matcher s', 'rejected'))
+    report('validate 20000 inputs', validate(), ('inputs', 're s', 'matcher s', 'rejected'))
@@ -0,0 +1,53 @@
+"""Compare finditer over a whole string with finditer_stream over its chunks
+
+Run from the repository root with: python -m benchmarks.stream
+"""
+
+import random
+import tracemalloc
+
+from model._klean import Group, Sequence, Quantification
+from model.representations import Decimal, WordBoundary
+from matchers.stream import finditer_stream
+from resolvers.python import compile
+
+from benchmarks._harness import best_of, report
+
+SIZES = (10**5, 10**6, 10**7)
+CHUNK = 64 * 1024
+
+def text(length, seed=0):
+    generator = random.Random(seed)
+    words = ['error', 'id', 'x1', 'warn', '2024', 'value']
+    pieces = []
+    size = 0
+    while size < length:
+        pieces.append(generator.choice(words))
+        size += len(pieces[-1]) + 1
+    return ' '.join(pieces)
+
+def peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run():
+    klean = Sequence(WordBoundary(), 'id', WordBoundary()) & Group(
+        Decimal(), repetition=Quantification(min=0, max=8))
+    pattern = compile(klean)
+    rows = []
+    for size in SIZES:
+        whole = text(size)
+        chunks = [whole[i:i+CHUNK] for i in range(0, len(whole), CHUNK)]
+        direct = lambda: sum(1 for match in pattern.finditer(whole))
+        stream = lambda: sum(1 for match in finditer_stream(klean, iter(chunks)))
+        assert direct() == stream()
+        rows.append((size, best_of(direct), best_of(stream), peak(stream)))
+    return rows
+
+if __name__ == '__main__':
+    report(f'finditer in {CHUNK} character chunks', run(),
+           ('characters', 'whole s', 'stream s', 'stream peak B'))
@@ -0,0 +1,91 @@
+"""The cases timed by python -m benchmarks
+
+Each case is named by what it measures and the size it measures it at, so
+results from different runs can be compared name by name.
+"""
+
+import random
+import re
+
+from model._klean import Group, Literal, Quantification, Range, Sequence
+from model.representations import Decimal, Whitespace, Word
+from resolvers.python import format
+
+from benchmarks._harness import best_of
+from benchmarks.alternation import corpus, keywords
+from benchmarks.format import deep_tree, shared_tree, wide_tree
+
+SIZES = (10, 1000, 100000, 1000000)
+QUICK_SIZES = (10, 1000, 10000)
+
+def _items(count):
+    return [Group(Sequence(f'k{i}'), Range(('a', 'f')), repetition=Quantification(min=1))
+            for i in range(count)]
+
+def _operators(items):
+    tree = items[0]
+    for item in items[1:]:
+        tree = tree & item
+    return tree
+
+def construction(sizes):
+    for size in sizes:
+        if size > 100000:
+            continue
+        items = _items(size)
+        yield f'construct operators {size}', lambda: _operators(items)
+        yield f'construct constructor {size}', lambda: Group(*items)
+
+def formatting(sizes):
+    for shape, build in (('wide', wide_tree), ('deep', deep_tree), ('shared', shared_tree)):
+        for size in sizes:
+            tree = build(size)
+            yield f'format {shape} {size}', lambda: format(tree)
+
+def _compile(pattern):
+    re.purge()
+    re.compile(pattern)
+
+def compilation(sizes):
+    # re's parser recurses on nesting, and fills memory on very long patterns
+    for size in sizes:
+        if size > 100000:
+            continue
+        pattern = format(wide_tree(size))
+        yield f're.compile wide {size}', lambda: _compile(pattern)
+    for size in (10, 100):
+        pattern = format(deep_tree(size))
+        yield f're.compile deep {size}', lambda: _compile(pattern)
+
+def matching(sizes):
+    words = keywords(1000)
+    text = corpus(words, length=sizes[-1] * 10 if sizes[-1] < 100000 else 1000000)
+    trie = re.compile(format(Group(*map(Sequence, words), OR=True)))
+    yield f'findall keywords {len(text)}', lambda: trie.findall(text)
+    generator = random.Random(2)
+    lines = [''.join(generator.choice('abc 123:') for _ in range(80)) for _ in range(len(text) // 80)]
+    field = re.compile(format(Group(Group(Word(), repetition=Quantification(min=1)), Literal(':'),
+                                    Group(Whitespace(), repetition=Quantification()), Decimal())))
+    yield f'search lines {len(lines)}', lambda: [field.search(line) for line in lines]
+
+GROUPS = (construction, formatting, compilation, matching)
+
+# a case is called repeatedly until one timing takes this long, so that short
+# cases are not lost in timer noise
+MIN_SECONDS = 0.05
+REPEAT = 5
+
+def _per_call(func):
+    calls = 1
+    while best_of(lambda: [func() for _ in range(calls)], repeat=1) < MIN_SECONDS:
+        calls *= 10
+    return best_of(lambda: [func() for _ in range(calls)], repeat=REPEAT) / calls
+
+def run(quick=False):
+    """Return a dict of case name to its best time per call in seconds"""
+    sizes = QUICK_SIZES if quick else SIZES
+    results = {}
+    for group in GROUPS:
+        for name, func in group(sizes):
+            results[name] = _per_call(func)
+    return results
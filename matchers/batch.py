@@ -0,0 +1,131 @@
+"""Match one Klean pattern against very many strings on a pool of workers
+
+The pattern is formatted once and handed to each worker when it starts, so
+only the strings and the results travel between processes. Inputs are read
+lazily in chunks and no more than a few chunks per worker are in flight at a
+time, so an iterable of any length can be matched in bounded memory.
+
+python's re holds the GIL while it matches, so executor='thread' only helps on
+a free-threaded build of python; executor='process' scales with cores anywhere.
+"""
+
+import os
+import re
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from model._klean import Klean
+from resolvers.python import format
+
+Spans = namedtuple('Spans', ['starts', 'ends'])
+
+# strings sent to a worker at a time
+BATCH_CHUNK = 4096
+# chunks submitted ahead of the one being collected, per worker
+BATCH_AHEAD = 2
+
+EXECUTORS = {
+    'process': ProcessPoolExecutor,
+    'thread': ThreadPoolExecutor,
+    }
+METHODS = ('match', 'search', 'fullmatch')
+
+def _matches(test, spans, chunk):
+    # the results for one chunk, as an array('B') of 0 and 1, or as Spans
+    # with -1 for the strings that did not match
+    if not spans:
+        return array('B', map(bool, map(test, chunk)))
+    starts = array('q')
+    ends = array('q')
+    for string in chunk:
+        found = test(string)
+        if found is None:
+            starts.append(-1)
+            ends.append(-1)
+        else:
+            start, end = found.span()
+            starts.append(start)
+            ends.append(end)
+    return Spans(starts, ends)
+
+# set in each worker process by _initialize
+_test = None
+_spans = False
+
+def _initialize(pattern, flags, method, spans):
+    global _test, _spans
+    _test = getattr(re.compile(pattern, flags), method)
+    _spans = spans
+
+def _worker_matches(chunk):
+    return _matches(_test, _spans, chunk)
+
+def _chunks(strings, chunksize):
+    strings = iter(strings)
+    while True:
+        chunk = list(islice(strings, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def _join(results, spans):
+    if not spans:
+        joined = array('B')
+        for result in results:
+            joined.extend(result)
+        return joined
+    joined = Spans(array('q'), array('q'))
+    for result in results:
+        joined.starts.extend(result.starts)
+        joined.ends.extend(result.ends)
+    return joined
+
+def _pooled(pool, func, chunks, ahead):
+    # the results of func on each chunk, in order, with at most ahead chunks
+    # waiting to be collected
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(func, chunk))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def match_many(klean, strings, workers=None, executor='process', method='match',
+               spans=False, flags=0, chunksize=BATCH_CHUNK):
+    """Return which of strings klean matches, in the order they were given
+
+    The result is an array('B') holding 1 for every string where
+    re.<method>(pattern, string) finds a match and 0 elsewhere, or with
+    spans=True a Spans pair of array('q') holding each match's start and end,
+    -1 for strings without one. workers defaults to os.cpu_count(); with one
+    worker the strings are matched in this process, without a pool.
+    """
+    if not isinstance(klean, Klean):
+        raise ValueError(f'match_many must be supplied with a Klean object, recieved {type(klean)} instead')
+    if executor not in EXECUTORS:
+        raise ValueError(f'executor must be one of {", ".join(EXECUTORS)}, recieved {executor!r}')
+    if method not in METHODS:
+        raise ValueError(f'method must be one of {", ".join(METHODS)}, recieved {method!r}')
+    if type(chunksize) != int or chunksize < 1:
+        raise ValueError('chunksize must be a positive intiger')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if type(workers) != int or workers < 1:
+        raise ValueError('workers must be a positive intiger')
+    pattern = format(klean, flags)
+    chunks = _chunks(strings, chunksize)
+    if workers == 1:
+        test = getattr(re.compile(pattern, flags), method)
+        return _join((_matches(test, spans, chunk) for chunk in chunks), spans)
+    if executor == 'thread':
+        test = getattr(re.compile(pattern, flags), method)
+        with ThreadPoolExecutor(workers) as pool:
+            return _join(_pooled(pool, partial(_matches, test, spans), chunks,
+                                 workers * BATCH_AHEAD), spans)
+    with ProcessPoolExecutor(workers, initializer=_initialize,
+                             initargs=(pattern, flags, method, spans)) as pool:
+        return _join(_pooled(pool, _worker_matches, chunks, workers * BATCH_AHEAD), spans)
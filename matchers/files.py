@@ -0,0 +1,128 @@
+"""Search a large file for a Klean pattern on a pool of processes
+
+The file is memory mapped rather than read, and cut into shards at newlines.
+Each worker maps the file itself and runs re.finditer from the start of its
+shard, so matches may run on into the next shard and assertions see the real
+text either side. When the pattern's matches are limited in length the scan
+stops that far past the shard, and a byte further for what $ looks at, which
+re can not tell from the whole file; otherwise it runs to the first match
+starting past the end, as a shorter text could change what re matches.
+
+A worker starts its shard as if nothing came before it. Where the previous
+shard's last match runs into this one, the shard's first matches may not be
+those re would find scanning the whole file; they are found again in this
+process from the end of that match until they agree with the shard's, which
+is almost always at once. Every match is therefore reported exactly once,
+and the records are those re.finditer gives on the whole file.
+"""
+
+import mmap
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from model._klean import Klean
+from model.analysis import length_bounds
+from resolvers.python_bytes import compile
+
+FileMatch = namedtuple('FileMatch', ['start', 'end', 'data'])
+
+# bytes searched by one worker at a time
+SHARD_SIZE = 32 * 1024 * 1024
+# files smaller than this are searched in this process
+SEARCH_POOLED = 4 * 1024 * 1024
+# the most bytes one character is written in
+WIDTHS = {'utf-8': 4, 'latin-1': 1}
+
+def _bounds(view, shards):
+    # start offsets of about equal shards, each moved on past a newline
+    size = len(view)
+    starts = [0]
+    for i in range(1, shards):
+        start = view.find(b'\n', max(size * i // shards, starts[-1])) + 1
+        if start <= starts[-1] or start >= size:
+            continue
+        starts.append(start)
+    return starts + [size]
+
+def _longest(klean, encoding):
+    # the most bytes a match may span, or None when that is not limited
+    longest = length_bounds(klean).max
+    return None if longest is None else longest * WIDTHS[encoding]
+
+def _endpos(view, end, longest):
+    # how far re must see for the matches starting before end to be those it
+    # finds in the whole of view
+    if longest is None:
+        return len(view)
+    return min(len(view), end + longest + 1)
+
+def _shard(pattern, view, start, end, longest=None):
+    # the spans of the matches starting from start to end, scanning from start
+    spans = []
+    for found in pattern.finditer(view, start, _endpos(view, end, longest)):
+        if found.start() >= end:
+            break
+        spans.append(found.span())
+    return spans
+
+def _search_shard(path, klean, flags, encoding, start, end):
+    pattern = compile(klean, flags, encoding)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        return _shard(pattern, view, start, end, _longest(klean, encoding))
+
+def _merge(pattern, view, shards, longest=None):
+    # the spans re.finditer finds on the whole of view, from those found in
+    # each (start, end, spans) shard
+    merged = []
+    for start, end, spans in shards:
+        last = merged[-1] if merged else None
+        if last is None or last[1] <= start:
+            merged.extend(spans)
+            continue
+        # the previous match ran into this shard
+        agreed = set(spans)
+        for found in pattern.finditer(view, last[1], _endpos(view, end, longest)):
+            span = found.span()
+            if span[0] >= end:
+                break
+            merged.append(span)
+            if span in agreed:
+                merged.extend(spans[spans.index(span)+1:])
+                break
+    return merged
+
+def search_file(klean, path, workers=None, flags=0, encoding='utf-8', shard_size=SHARD_SIZE):
+    """Return a FileMatch for every match of klean in the file at path, in order
+
+    Offsets are in bytes and data is the bytes matched; the pattern is made by
+    resolvers.python_bytes for text in encoding. workers defaults to
+    os.cpu_count(); with one worker, or a file smaller than SEARCH_POOLED, the
+    file is searched in this process.
+    """
+    if not isinstance(klean, Klean):
+        raise ValueError(f'search_file must be supplied with a Klean object, recieved {type(klean)} instead')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if type(workers) != int or workers < 1:
+        raise ValueError('workers must be a positive intiger')
+    if type(shard_size) != int or shard_size < 1:
+        raise ValueError('shard_size must be a positive intiger')
+    pattern = compile(klean, flags, encoding)
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return [FileMatch(*span, b'') for span in _shard(pattern, b'', 0, 1)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if workers == 1 or len(view) < SEARCH_POOLED:
+                spans = _shard(pattern, view, 0, len(view) + 1)
+            else:
+                starts = _bounds(view, max(workers, -(-len(view) // shard_size)))
+                # an empty match at the very end belongs to the last shard
+                ends = starts[1:-1] + [len(view) + 1]
+                with ProcessPoolExecutor(workers) as pool:
+                    futures = [(start, end, pool.submit(_search_shard, path, klean, flags,
+                                                        encoding, start, end))
+                               for start, end in zip(starts, ends)]
+                    shards = [(start, end, future.result()) for start, end, future in futures]
+                spans = _merge(pattern, view, shards, _longest(klean, encoding))
+            return [FileMatch(start, end, view[start:end]) for start, end in spans]
@@ -0,0 +1,164 @@
+"""Match many named Klean patterns against a string in one scan
+
+The rules are resolved through resolvers.python into a single alternation, each
+branch ending in an empty named group that tells which rule it was. One pass of
+finditer reports every rule whose match was scanned. A rule it did not report
+can only match where it did not look: at the start of a reported match an
+earlier rule took, or inside one. Only those positions are tried again, each
+with the rules whose leading literals start there.
+"""
+
+import re
+from collections import namedtuple
+from itertools import chain
+
+from model._klean import Group, Klean, Literal, Sequence
+from model.passes import _plain, optimize
+from resolvers.python import format
+from matchers.prefilter import Matcher
+
+PatternSetInfo = namedtuple('PatternSetInfo', ['scans', 'fallbacks'])
+
+RULE_GROUP = '(?P<_k{}>)'
+RULE_NAME = '_k{}'
+BRANCH_START = '(?:'
+BRANCH_END = ')'
+BRANCH_OR = '|'
+
+def _split_prefix(klean, flags=0):
+    # Return the literal characters klean always starts with and the pattern
+    # for the rest of it. Plain concatenations are opened up so that their
+    # leading literals can be shared between rules; atomic, possessive and
+    # capturing groups are kept whole. The rest is written for re to read under
+    # flags
+    pieces = []
+    stack = [klean]
+    while stack:
+        node = stack.pop()
+        if (_plain(node) and not node.OR) or isinstance(node, Sequence):
+            stack.extend(reversed(node.groups if isinstance(node, Group) else node.characters))
+        else:
+            pieces.append(node)
+    prefix = []
+    for piece in pieces:
+        if not isinstance(piece, Literal):
+            break
+        prefix.append(piece.char)
+    return ''.join(prefix), ''.join(format(piece, flags) for piece in pieces[len(prefix):])
+
+def _uncaptured(klean):
+    # a pass writing capturing groups as plain ones, as the rules' captures are
+    # not read from the combined pattern, and two rules may use one name
+    if isinstance(klean, Group) and klean.capture is not None:
+        return Group(*klean, OR=klean.OR, repetition=klean.repetition, atomic=klean.atomic)
+    return klean
+
+def _combine(split):
+    # One alternation of every rule, given as (prefix, rest) pairs, with
+    # branches sharing leading literals factored into a trie so that re only
+    # tries the rules whose first characters are present. Trie nodes are dicts
+    # from character to child, with the finished branches under None
+    trie = {}
+    for i, (prefix, rest) in enumerate(split):
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(rest + RULE_GROUP.format(i))
+    out = []
+    stack = [(trie, True)]
+    while stack:
+        next = stack.pop()
+        if isinstance(next, str):
+            out.append(next)
+            continue
+        node, root = next
+        branches = [(re.escape(char), child) for char, child in node.items() if char is not None]
+        branches.extend((rule, None) for rule in node.get(None, ()))
+        if len(branches) == 1:
+            text, child = branches[0]
+            out.append(text)
+            if child is not None:
+                stack.append((child, False))
+            continue
+        if not root:
+            out.append(BRANCH_START)
+            stack.append(BRANCH_END)
+        for i in range(len(branches)-1, -1, -1):
+            text, child = branches[i]
+            if child is not None:
+                stack.append((child, False))
+            stack.append(text)
+            if i:
+                stack.append(BRANCH_OR)
+    return ''.join(out)
+
+class PatternSet(object):
+    """A set of named Klean rules searched for together
+
+    rules is a mapping, or an iterable of (name, klean) pairs; search() returns
+    the names of the rules matching anywhere in a string, in rule order.
+    """
+
+    def __init__(self, rules, flags=0):
+        rules = dict(rules)
+        for name, klean in rules.items():
+            if not isinstance(klean, Klean):
+                raise ValueError(f'rule {name!r} must be a Klean object, recieved {type(klean)} instead')
+        self.names = tuple(rules)
+        self.flags = flags
+        split = [_split_prefix(optimize(klean, [_uncaptured]), flags) for klean in rules.values()]
+        self.pattern = re.compile(_combine(split), flags)
+        self._indices = {RULE_NAME.format(i): i for i in range(len(self.names))}
+        self._matchers = tuple(Matcher(klean, flags) for klean in rules.values())
+        # (rule, leading literals) for the rules that can match at a position,
+        # by the character there; a rule with no leading literals, or any rule
+        # ignoring case, may match anywhere
+        self._by_first = {}
+        self._anywhere = []
+        for i, (prefix, rest) in enumerate(split):
+            if prefix and not flags & re.IGNORECASE:
+                self._by_first.setdefault(prefix[0], []).append((i, prefix))
+            else:
+                self._anywhere.append((i, ''))
+        self.scans = 0
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def _hidden(self, string, spans, missing, found):
+        # Try the rules not yet found at every position finditer matched from
+        # or through, until the missing count of them are; an empty match
+        # still covers the position it was found at
+        for start, end in spans:
+            for pos in range(start, max(end, start + 1)):
+                first = self._by_first.get(string[pos], ()) if pos < len(string) else ()
+                for i, prefix in chain(first, self._anywhere):
+                    if (string.startswith(prefix, pos) and not found[i]
+                            and self._matchers[i].match(string, pos) is not None):
+                        found[i] = True
+                        missing -= 1
+                        if not missing:
+                            return
+
+    def search(self, string):
+        self.scans += 1
+        found = [False] * len(self.names)
+        spans = []
+        for match in self.pattern.finditer(string):
+            spans.append(match.span())
+            found[self._indices[match.lastgroup]] = True
+        if not spans:
+            # no rule matches anywhere, as the earliest would have been found
+            return []
+        missing = found.count(False)
+        if missing:
+            self.fallbacks += missing
+            self._hidden(string, spans, missing, found)
+        return [name for name, matched in zip(self.names, found) if matched]
+
+    def info(self):
+        return PatternSetInfo(self.scans, self.fallbacks)
+
+    def clear(self):
+        self.scans = self.fallbacks = 0
@@ -0,0 +1,77 @@
+"""Run cheap tests before a Klean pattern's regular expression
+
+Most patterns contain literal text that every match must include, and many
+only match text of a limited length. Checking the length, or for the literal
+text with str.find or str.startswith, is far cheaper than running the full
+regular expression, so strings that fail are rejected without reaching re.
+"""
+
+import re
+from collections import namedtuple
+
+from model.analysis import RequiredLiterals, _anchored, length_bounds, required_literals
+from resolvers.python import compile
+
+PrefilterInfo = namedtuple('PrefilterInfo', ['checked', 'rejected'])
+
+class Matcher(object):
+    """A compiled Klean pattern guarded by its required literals and length
+
+    search, match and fullmatch behave like the re.Pattern methods of the same
+    name, but return None at once when the string cannot contain a match.
+    Strings too short for a match are always rejected; strings too long only
+    for fullmatch, or when the pattern is anchored from \\A to \\Z.
+    """
+
+    def __init__(self, klean, flags=0):
+        self.pattern = compile(klean, flags)
+        if flags & re.IGNORECASE:
+            # the literals no longer have to appear as written
+            self.literals = RequiredLiterals('', '', ())
+        else:
+            self.literals = required_literals(klean)
+        self.bounds = length_bounds(klean)
+        # the most characters search and match may be given, if limited
+        self._longest = self.bounds.max if _anchored(klean) else None
+        self.checked = 0
+        self.rejected = 0
+
+    def _fits(self, string, pos, endpos, longest):
+        # re clips pos and endpos to the string
+        length = min(endpos, len(string)) - max(pos, 0)
+        return self.bounds.min <= length and (longest is None or length <= longest)
+
+    def search(self, string, pos=0, endpos=None):
+        self.checked += 1
+        endpos = len(string) if endpos is None else endpos
+        factors = self.literals.factors
+        if (not self._fits(string, pos, endpos, self._longest)
+                or factors and string.find(factors[0], pos, endpos) < 0):
+            self.rejected += 1
+            return None
+        return self.pattern.search(string, pos, endpos)
+
+    def match(self, string, pos=0, endpos=None):
+        self.checked += 1
+        endpos = len(string) if endpos is None else endpos
+        if (not self._fits(string, pos, endpos, self._longest)
+                or not string.startswith(self.literals.prefix, pos, endpos)):
+            self.rejected += 1
+            return None
+        return self.pattern.match(string, pos, endpos)
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        self.checked += 1
+        endpos = len(string) if endpos is None else endpos
+        if not (self._fits(string, pos, endpos, self.bounds.max)
+                and string.startswith(self.literals.prefix, pos, endpos)
+                and string.endswith(self.literals.suffix, pos, endpos)):
+            self.rejected += 1
+            return None
+        return self.pattern.fullmatch(string, pos, endpos)
+
+    def info(self):
+        return PrefilterInfo(self.checked, self.rejected)
+
+    def clear(self):
+        self.checked = self.rejected = 0
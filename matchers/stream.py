@@ -0,0 +1,69 @@
+"""Find the matches of a Klean pattern in text that arrives in chunks
+
+Only a bounded tail of the text is kept: enough to hold the longest possible
+match, plus one character before it for assertions such as \\b and two after
+it, as $ matches before a newline that ends the text. Memory use therefore
+depends on the pattern and the chunk size, never on the length of the whole
+input.
+"""
+
+import warnings
+from collections import namedtuple
+
+from model.analysis import length_bounds
+from resolvers.python import compile
+
+StreamMatch = namedtuple('StreamMatch', ['start', 'end', 'text'])
+
+# characters of lookahead used for patterns with no maximum length
+STREAM_WINDOW = 64 * 1024
+
+def finditer_stream(klean, chunks, flags=0, window=STREAM_WINDOW):
+    """Yield a StreamMatch for every match of klean in the joined chunks
+
+    chunks is any iterable of strings, such as a text file or
+    iter(lambda: source.read(65536), ''). Offsets are from the start of the
+    first chunk, and the matches are those re.finditer would give on the
+    whole text.
+
+    When matches may be any length (a Quantification with max=0 somewhere)
+    the pattern is treated as if no match were longer than window characters,
+    and a RuntimeWarning is issued: a longer match may be split in pieces or
+    missed.
+    """
+    pattern = compile(klean, flags)
+    longest = length_bounds(klean).max
+    if longest is None:
+        warnings.warn(f'{klean} has no maximum match length, matches longer than '
+                      f'{window} characters may be cut short', RuntimeWarning, stacklevel=2)
+        longest = window
+    buffer = ''
+    base = 0            # offset of buffer[0] in the whole text
+    pos = 0             # where the next search starts in buffer
+    empty_at = None     # offset of the last empty match yielded
+    for chunk in chunks:
+        buffer += chunk
+        # a match starting before settled has ended, and seen the two
+        # characters after it that $ looks at, so more text can not change it
+        settled = len(buffer) - (longest + 1)
+        for match in pattern.finditer(buffer, pos):
+            start, end = match.span()
+            if start >= settled:
+                break
+            pos = end
+            if start == end:
+                if base + start == empty_at:
+                    continue
+                empty_at = base + start
+            yield StreamMatch(base + start, base + end, match.group())
+        pos = max(pos, settled)
+        # keep a character before pos as context for \b, \B and ^
+        trim = max(pos - 1, 0)
+        buffer = buffer[trim:]
+        base += trim
+        pos -= trim
+    for match in pattern.finditer(buffer, pos):
+        start, end = match.span()
+        if start == end and base + start == empty_at:
+            continue
+        yield StreamMatch(base + start, base + end, match.group())
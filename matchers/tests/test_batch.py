@@ -0,0 +1,61 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Range, Sequence, Quantification
+from model.representations import Decimal, Word
+from matchers.batch import match_many
+from resolvers.python import _class_intervals, format
+
+def _key():
+    return Group(Sequence('key'), Group(Decimal(), repetition=Quantification(min=1)))
+
+def _strings(count, seed=0):
+    generator = random.Random(seed)
+    return [''.join(generator.choice('key0123 ') for _ in range(generator.randint(0, 12)))
+            for _ in range(count)]
+
+@pytest.mark.parametrize('executor,workers', [
+    ('process', 1),
+    ('thread', 3),
+    ('process', 2),
+    ])
+@pytest.mark.parametrize('method', ['match', 'search', 'fullmatch'])
+def test_agrees_with_re(executor, workers, method):
+    strings = _strings(2000)
+    test = getattr(re.compile(format(_key())), method)
+    expected = [test(string) for string in strings]
+    matched = match_many(_key(), iter(strings), workers=workers, executor=executor,
+                         method=method, chunksize=97)
+    assert list(matched) == [found is not None for found in expected]
+    spans = match_many(_key(), strings, workers=workers, executor=executor, method=method,
+                       spans=True, chunksize=97)
+    assert list(zip(spans.starts, spans.ends)) == \
+        [found.span() if found else (-1, -1) for found in expected]
+
+def test_empty():
+    assert len(match_many(Word(), [], workers=2, executor='thread')) == 0
+    assert len(match_many(Word(), [], workers=1, spans=True).starts) == 0
+
+def test_flags():
+    assert list(match_many(Sequence('key'), ['KEY', 'kex'], workers=1, flags=re.I)) == [1, 0]
+
+def test_flags_ascii():
+    # a range of every unicode digit is still every unicode digit under re.ASCII
+    digits = Range._from_intervals(_class_intervals(r'\d'), invert=False)
+    for executor, workers in (('thread', 1), ('thread', 2), ('process', 2)):
+        assert list(match_many(digits, ['\u0663', 'a'], workers=workers, executor=executor,
+                               flags=re.ASCII)) == [1, 0]
+
+@pytest.mark.parametrize('args', [
+    {'klean': 'key'},
+    {'executor': 'fork'},
+    {'method': 'findall'},
+    {'workers': 0},
+    {'chunksize': 0},
+    ])
+def test_illegal(args):
+    args = {'klean': _key(), 'strings': ['key1'], **args}
+    with pytest.raises(ValueError):
+        match_many(**args)
@@ -0,0 +1,110 @@
+import random
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Any, LineEnd, Whitespace, Word
+from matchers import files
+from matchers.files import _longest, _merge, _shard, search_file
+from resolvers.python_bytes import compile
+
+ROOT = Path(__file__).resolve().parents[2]
+
+PATTERNS = [
+    Sequence('ab'),
+    Group(Literal('a'), repetition=Quantification()),
+    Group(Whitespace(), repetition=Quantification(min=1)),
+    Group(Word(), Whitespace(), repetition=Quantification(min=1)),
+    Group(Range('b', ' ', invert=True), repetition=Quantification(min=2, max=30)),
+    Group(Any(), LineEnd()),
+    ]
+
+def _text(seed, size=3000):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('aab b\n\né') for _ in range(size)).encode()
+
+@pytest.mark.parametrize('klean', PATTERNS)
+@pytest.mark.parametrize('bounded', [False, True])
+def test_merge_any_bounds(klean, bounded):
+    pattern = compile(klean)
+    longest = _longest(klean, 'utf-8') if bounded else None
+    data = _text(0)
+    expected = [m.span() for m in pattern.finditer(data)]
+    rng = random.Random(1)
+    for i in range(20):
+        cuts = sorted(rng.sample(range(1, len(data)), rng.randint(1, 40)))
+        starts = [0] + cuts
+        ends = cuts + [len(data) + 1]
+        shards = [(start, end, _shard(pattern, data, start, end, longest))
+                  for start, end in zip(starts, ends)]
+        assert _merge(pattern, data, shards, longest) == expected
+
+class _Recording(object):
+    # a pattern keeping the endpos of each finditer
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.endpos = []
+
+    def finditer(self, string, pos, endpos):
+        self.endpos.append(endpos)
+        return self.pattern.finditer(string, pos, endpos)
+
+def test_shard_bounded():
+    klean = Group(Literal('é'), Sequence('b\n'), OR=True, repetition=Quantification(max=2))
+    assert _longest(klean, 'utf-8') == 16 and _longest(klean, 'latin-1') == 4
+    assert _longest(Group(klean, repetition=Quantification()), 'utf-8') is None
+    data = b'x' * 1000 + b'b\n' + b'y' * 1000
+    pattern = _Recording(compile(Sequence('b\n')))
+    assert _shard(pattern, data, 0, 1000, 8) == []
+    assert _shard(pattern, data, 0, 1001, 8) == [(1000, 1002)]
+    assert _shard(pattern, data, 0, 1000) == []
+    assert pattern.endpos == [1009, 1010, 2002]
+
+@pytest.mark.parametrize('klean', PATTERNS)
+def test_search_file(klean, tmp_path, monkeypatch):
+    monkeypatch.setattr(files, 'SEARCH_POOLED', 0)
+    data = _text(2)
+    path = tmp_path / 'log'
+    path.write_bytes(data)
+    expected = [(m.start(), m.end(), m.group()) for m in compile(klean).finditer(data)]
+    assert search_file(klean, path, workers=2, shard_size=500) == expected
+    assert search_file(klean, path, workers=1) == expected
+
+def test_search_file_empty(tmp_path):
+    path = tmp_path / 'empty'
+    path.write_bytes(b'')
+    assert search_file(Sequence('ab'), path) == []
+    assert search_file(Group(Literal('a'), repetition=Quantification()), path) == [(0, 0, b'')]
+
+def test_search_file_empty_matches(tmp_path):
+    # an empty match is never reported inside a character
+    path = tmp_path / 'log'
+    path.write_bytes('é\n'.encode())
+    star = Group(Literal('x'), repetition=Quantification())
+    assert search_file(star, path) == [(0, 0, b''), (2, 2, b''), (3, 3, b'')]
+
+def test_search_file_illegal(tmp_path):
+    with pytest.raises(ValueError):
+        search_file('ab', tmp_path / 'log')
+    with pytest.raises(ValueError):
+        search_file(Sequence('ab'), tmp_path / 'log', workers=0)
+
+def test_grep(tmp_path):
+    path = tmp_path / 'log'
+    path.write_bytes('one Key\ntwo key é\n'.encode())
+    command = [sys.executable, str(ROOT), 'grep', '-i', 'key', str(path)]
+    result = subprocess.run(command, capture_output=True)
+    assert result.returncode == 0
+    assert result.stdout == b'4:Key\n12:key\n'
+    result = subprocess.run(command[:-1] + ['-c', str(path), str(path)], capture_output=True)
+    assert result.stdout == f'{path}:2\n{path}:2\n'.encode()
+    result = subprocess.run(command[:3] + ['nothing', str(path)], capture_output=True)
+    assert result.returncode == 1 and result.stdout == b''
+    result = subprocess.run(command[:3] + [r'\w+ key', str(path)], capture_output=True)
+    assert result.stdout == b'8:two key\n'
+    result = subprocess.run(command[:3] + ['-F', '.', str(path)], capture_output=True)
+    assert result.returncode == 1
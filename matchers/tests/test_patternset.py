@@ -0,0 +1,103 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Decimal, StringEnd, StringStart, Whitespace, Word, WordBoundary
+from matchers.patternset import PatternSet
+from resolvers.python import _class_intervals, format
+
+RULES = {
+    'error': Sequence('ERROR'),
+    'code': Group(Sequence('E'), Group(Decimal(), repetition=Quantification(min=3, max=3))),
+    'start': Sequence(StringStart(), 'ERROR'),
+    'number': Group(Decimal(), repetition=Quantification(min=1)),
+    'end': Group(Word(), StringEnd()),
+    }
+
+@pytest.mark.parametrize("string,expected", [
+    ('', []),
+    ('nothing to see here!', []),
+    ('ERROR', ['error', 'start', 'end']),
+    ('ERROR E404', ['error', 'code', 'start', 'number', 'end']),
+    ('an ERROR 7 ', ['error', 'number']),
+    ('E12', ['number', 'end']),
+    ('E12 ERR', ['number', 'end']),
+    ])
+def test_search(string, expected):
+    assert PatternSet(RULES).search(string) == expected
+
+def test_shared_prefixes():
+    words = ['blue', 'blues', 'brown', 'b', 'green', 'grey']
+    rules = PatternSet({word: Sequence(word) for word in words})
+    assert rules.pattern.pattern == 'b(?:lue(?:s(?P<_k1>)|(?P<_k0>))|rown(?P<_k2>)|(?P<_k3>))|gre(?:en(?P<_k4>)|y(?P<_k5>))'
+    assert rules.search('bluesy') == ['blue', 'blues', 'b']
+    assert rules.search('grey brown') == ['brown', 'b', 'grey']
+
+def test_pairs():
+    rules = PatternSet([('b', Literal('b')), ('a', Literal('a'))])
+    assert rules.names == ('b', 'a')
+    assert len(rules) == 2
+    assert rules.search('ab') == ['b', 'a']
+
+def test_flags():
+    rules = PatternSet({'error': Sequence('error')}, re.IGNORECASE)
+    assert rules.search('ERROR') == ['error']
+
+def test_flags_ascii():
+    # a range of every unicode digit is still every unicode digit under re.ASCII
+    digits = Range._from_intervals(_class_intervals(r'\d'), invert=False)
+    rules = PatternSet({'x': Sequence('k') & digits, 'y': digits}, re.ASCII)
+    assert rules.search('k\u0663') == ['x', 'y']
+    assert rules.pattern.search('k\u0663').group() == 'k\u0663'
+
+def test_atomic_kept_whole():
+    star = Group(Literal('a'), repetition=Quantification())
+    rules = PatternSet({'atomic': Group(Literal('x'), Group(star, atomic=True), Literal('a')),
+                        'possessive': Group(Literal('y'), Group(star, repetition=Quantification(
+                            1, 1, possessive=True)), Literal('a'))})
+    assert rules.search('xaaa yaaa') == []
+
+def test_hidden_matches():
+    rules = PatternSet({'long': Sequence('abcd'), 'inner': Sequence('bc'), 'same': Sequence('ab'),
+                        'empty': Group(), 'tail': Group(Literal('d'), StringEnd()),
+                        'later': Sequence('cx')})
+    assert rules.search('xabcd') == ['long', 'inner', 'same', 'empty', 'tail']
+    assert rules.info() == (1, 4)
+    assert rules.search('abcdcx') == ['long', 'inner', 'same', 'empty', 'later']
+
+def test_captures():
+    year = Group(Group(Decimal(), repetition=Quantification(min=4, max=4)), capture='year')
+    rules = PatternSet({'date': Group(year, Literal('-')), 'copyright': Group(Sequence('(c)'), year),
+                        'numbered': Group(Group(Literal('x'), capture=True), Decimal())})
+    assert '(?P<year>' not in rules.pattern.pattern
+    assert rules.search('(c)2024-') == ['date', 'copyright']
+    assert rules.search('x1') == ['numbered']
+
+def test_info():
+    rules = PatternSet(RULES)
+    rules.search('nothing!')
+    assert rules.info() == (1, 0)
+    rules.search('ERROR')
+    assert rules.info() == (2, 4)
+    rules.clear()
+    assert rules.info() == (0, 0)
+
+def test_illegal():
+    with pytest.raises(ValueError):
+        PatternSet({'text': 'abc'})
+
+def test_agrees_with_re():
+    rng = random.Random(9)
+    words = ['ab', 'abc', 'bc', 'c', 'ca', 'a1']
+    rules = {word: Sequence(word) for word in words}
+    rules['digits'] = Group(Decimal(), repetition=Quantification(min=1))
+    rules['word'] = Sequence(WordBoundary(), 'ab', WordBoundary())
+    rules['range'] = Group(Range('a', 'b'), Literal('1'))
+    patterns = {name: re.compile(format(klean)) for name, klean in rules.items()}
+    rule_set = PatternSet(rules)
+    for i in range(500):
+        string = ''.join(rng.choice('abc1 ') for j in range(rng.randint(0, 10)))
+        expected = [name for name, pattern in patterns.items() if pattern.search(string)]
+        assert rule_set.search(string) == expected
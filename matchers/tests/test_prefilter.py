@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Sequence, Quantification
+from model.representations import Decimal, StringEnd, StringStart, Whitespace, Word
+from matchers.prefilter import Matcher
+
+def _title():
+    exp = StringStart() & 'Title'
+    exp &= Group(Whitespace(), repetition=Quantification(min=0, max=0)) & ':' & Word()
+    return exp
+
+def test_search_rejects():
+    matcher = Matcher(Group(Sequence('key'), Decimal()))
+    assert matcher.search('no match here') is None
+    assert matcher.search('a key without a digit') is None
+    assert matcher.search('the key5 is here').group() == 'key5'
+    assert matcher.info() == (3, 1)
+    matcher.clear()
+    assert matcher.info() == (0, 0)
+
+def test_search_positions():
+    matcher = Matcher(Group(Sequence('key'), Decimal()))
+    assert matcher.search('key1', 1) is None
+    assert matcher.search('xkey1', 1).span() == (1, 5)
+    # too short for a key and a digit
+    assert matcher.search('key1', 0, 3) is None
+    assert matcher.info() == (3, 2)
+
+def test_match_prefix():
+    matcher = Matcher(_title())
+    assert matcher.match('Title :x') is not None
+    assert matcher.match('title :x') is None
+    assert matcher.match(' Title :x') is None
+    assert matcher.info() == (3, 2)
+
+def test_fullmatch_suffix():
+    matcher = Matcher(Group(Sequence('ab'), Decimal(), Sequence('cd')))
+    assert matcher.fullmatch('ab1cd').group() == 'ab1cd'
+    assert matcher.fullmatch('ab1cde') is None
+    assert matcher.fullmatch('xab1cde', 1, 6) is not None
+    assert matcher.info() == (3, 1)
+
+def test_no_literals():
+    matcher = Matcher(Group(Decimal(), repetition=Quantification(min=1)))
+    assert matcher.search('abc 123').group() == '123'
+    assert matcher.search('abc') is None
+    assert matcher.info() == (2, 0)
+
+def test_ignorecase():
+    matcher = Matcher(Sequence('Title'), re.IGNORECASE)
+    assert matcher.search('TITLE').group() == 'TITLE'
+    assert matcher.info() == (1, 0)
+
+@pytest.mark.parametrize("string", [
+    'Title:a', 'Title  :b', 'xTitle:a', 'Title:', 'Tit:le', '',
+    ])
+def test_agrees_with_re(string):
+    exp = _title()
+    matcher = Matcher(exp)
+    pattern = matcher.pattern
+    for method in ('search', 'match', 'fullmatch'):
+        expected = getattr(pattern, method)(string)
+        result = getattr(matcher, method)(string)
+        assert (result and result.span()) == (expected and expected.span())
+
+def test_length():
+    exp = Group(Word(), repetition=Quantification(min=2, max=4))
+    matcher = Matcher(exp)
+    assert matcher.fullmatch('abc') is not None
+    assert matcher.fullmatch('abcde') is None
+    assert matcher.fullmatch('a') is None
+    assert matcher.search('a') is None
+    assert matcher.search('abcdef').group() == 'abcd'
+    assert matcher.match('abcdef', 1, 20).group() == 'bcde'
+    assert matcher.info() == (6, 3)
+
+def test_length_anchored():
+    matcher = Matcher(Sequence(StringStart(), 'id', StringEnd()) & Group(Decimal(), repetition=Quantification(min=0, max=4)))
+    assert matcher.bounds == (2, 6)
+    assert matcher.search('id12') is None
+    assert matcher.search('id') is not None
+    matcher = Matcher(Group(StringStart(), Sequence('id'), Group(Decimal(), repetition=Quantification(min=0, max=4)), StringEnd()))
+    assert matcher.search('id1234') is not None
+    assert matcher.search('id12345') is None
+    assert matcher.match('id12345') is None
+    assert matcher.search('xid12', 1) is None
+    assert matcher.info() == (4, 2)
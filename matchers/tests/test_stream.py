@@ -0,0 +1,74 @@
+import random
+import re
+import tracemalloc
+import warnings
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Decimal, LineEnd, LineStart, StringEnd, StringStart, Word,\
+    WordBoundary
+from matchers.stream import StreamMatch, finditer_stream
+from resolvers.python import format
+
+def _chunked(string, rng):
+    chunks = []
+    while string:
+        size = rng.randint(1, 5)
+        chunks.append(string[:size])
+        string = string[size:]
+    return chunks
+
+PATTERNS = [
+    Sequence('ab'),
+    Group(Sequence('ab'), Decimal(), OR=True),
+    Group(Decimal(), Decimal(), repetition=Quantification(min=0, max=2)),
+    Sequence(WordBoundary(), 'a', Word(), WordBoundary()),
+    Sequence(StringStart(), 'a'),
+    Group(Sequence('b'), StringEnd()),
+    Group(Literal('b'), LineEnd()),
+    Group(Group(Literal('1'), repetition=Quantification(max=2)), LineEnd()),
+    Group(Range('a', 'b'), repetition=Quantification(min=0, max=3)),
+    Group(Group(Word(), repetition=Quantification(min=1)), Literal('1')),
+    ]
+
+@pytest.mark.parametrize("klean", PATTERNS)
+def test_agrees_with_re(klean):
+    rng = random.Random(10)
+    pattern = re.compile(format(klean))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for i in range(200):
+            string = ''.join(rng.choice('ab1 \n') for j in range(rng.randint(0, 30)))
+            expected = [(m.start(), m.end(), m.group()) for m in pattern.finditer(string)]
+            assert list(finditer_stream(klean, _chunked(string, rng))) == expected
+
+def test_offsets():
+    matches = list(finditer_stream(Sequence('key'), ['a ke', 'y b', 'ke', 'y']))
+    assert matches == [StreamMatch(2, 5, 'key'), StreamMatch(7, 10, 'key')]
+
+def test_unbounded_warns():
+    klean = Group(Decimal(), repetition=Quantification(min=1))
+    with pytest.warns(RuntimeWarning):
+        matches = list(finditer_stream(klean, ['12', '34 5', '6'], window=100))
+    assert matches == [(0, 4, '1234'), (5, 7, '56')]
+
+def test_unbounded_window():
+    # a match longer than the window is split where the buffered text ends
+    klean = Group(Decimal(), repetition=Quantification(min=1))
+    with pytest.warns(RuntimeWarning):
+        matches = list(finditer_stream(klean, ['1'] * 10, window=4))
+    assert matches == [(0, 6, '111111'), (6, 10, '1111')]
+
+def test_bounded_memory():
+    def chunks():
+        for i in range(2000):
+            yield 'x' * 4095 + 'a'
+    tracemalloc.start()
+    try:
+        count = sum(1 for match in finditer_stream(Sequence('xa'), chunks()))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert count == 2000
+    assert peak < 1024 * 1024
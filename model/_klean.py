@@ -1,6 +1,12 @@
 # Base Regular Expression Objects
+from array import array
+from bisect import bisect_right
 from collections.abc import Sized
 from functools import total_ordering
+from itertools import chain, islice
+from weakref import WeakValueDictionary
+
+MAX_CODEPOINT = 0x10FFFF
 
 def _str_to_klean_obj(string):
     if isinstance(string, Klean):
@@ -11,39 +17,180 @@ def _str_to_klean_obj(string):
     except ValueError:
         return Sequence(string)
 
-class Klean(object):
+def _pairs(intervals):
+    return zip(intervals[::2], intervals[1::2])
+
+def _merge_intervals(pairs):
+    # sort and coalesce overlapping or touching (start, end) pairs into a flat array
+    merged = array('L')
+    for start, end in sorted(pairs):
+        if start > end:
+            continue
+        if merged and start <= merged[-1] + 1:
+            if end > merged[-1]:
+                merged[-1] = end
+        else:
+            merged.append(start)
+            merged.append(end)
+    return merged
+
+def _complement_intervals(intervals):
+    # every code point not covered by a merged interval array
+    complement = array('L')
+    next_start = 0
+    for start, end in _pairs(intervals):
+        if start > next_start:
+            complement.append(next_start)
+            complement.append(start - 1)
+        next_start = end + 1
+    if next_start <= MAX_CODEPOINT:
+        complement.append(next_start)
+        complement.append(MAX_CODEPOINT)
+    return complement
+
+# the built in nodes set their attributes while they are built with _set,
+# skipping the frozen check in their own __setattr__
+_set = object.__setattr__
+
+def _intern(node):
+    # freeze a newly built node, or hand back the live node of equal structure
+    key = node._key()
+    instances = type(node)._instances
+    existing = instances.get(key)
+    if existing is not None:
+        return existing
+    _set(node, '_hash', hash(key))
+    instances[key] = node
+    return node
+
+def _rebuild(cls, args, kwargs):
+    return cls(*args, **kwargs)
+
+def _spliceable(klean, OR):
+    # An unquantified, uncaptured, not atomic Group can absorb neighbours of
+    # its own kind; with a single member it is either kind
+    return (isinstance(klean, Group) and (klean.OR == OR or len(klean) == 1)
+            and klean.repetition.min == 1 and klean.repetition.max == 1
+            and not klean.repetition.possessive and klean.capture is None and not klean.atomic)
+
+def _join(lhs, rhs, OR=False):
+    # Combine two Klean objects into one flat n-ary Group, splicing operands of
+    # the same kind rather than nesting them
+    if _spliceable(lhs, OR):
+        if _spliceable(rhs, OR):
+            return lhs._extended(rhs.groups, OR)
+        return lhs._extended((rhs,), OR)
+    if _spliceable(rhs, OR):
+        return Group(lhs, *rhs.groups, OR=OR)
+    return Group(lhs, rhs, OR=OR)
+
+_FOLD_START = hash(())
+
+class _Members(object):
+    # Interning key for the first size entries of a shared member list
+    __slots__ = ('members', 'size', 'fold')
+
+    def __init__(self, members, size, fold):
+        self.members = members
+        self.size = size
+        self.fold = fold
+
+    def __hash__(self):
+        return self.fold
+
+    def __eq__(self, rhs):
+        if not isinstance(rhs, _Members):
+            return NotImplemented
+        if self.fold != rhs.fold or self.size != rhs.size:
+            return False
+        if self.members is rhs.members:
+            return True
+        return self.members[:self.size] == rhs.members[:rhs.size]
+
+class _Interned(type):
+    # Each class keeps a weak table of its live instances by structure, so
+    # building an equal node twice yields the same immutable object
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._instances = WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        return _intern(super().__call__(*args, **kwargs))
+
+class _Immutable(object, metaclass=_Interned):
+    # Attributes may only be set while the node is being constructed
+    __slots__ = ('_hash', '__weakref__')
+
+    def __setattr__(self, name, value):
+        # only subclasses defined elsewhere come through here, and their nodes
+        # are frozen once _intern gives them a hash
+        if hasattr(self, '_hash'):
+            raise AttributeError(f'{self.__class__.__name__} objects are immutable')
+        _set(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} objects are immutable')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _key(self):
+        # The structure that identifies this node among its class's instances
+        raise NotImplementedError
+
+class Klean(_Immutable):
     #Parent Regular Expression Object
-    #TODO: Metaclass
-    pass
+    __slots__ = ()
 
 class Operator(Klean):
     # Alter a match pattern
-    # Each Operator must be defined as a subclass that pre-defines the following as instance variables
+    # Each Operator must be defined as a subclass that pre-defines the following as class variables
+    __slots__ = ()
     op = ''
     short_desc = ''
 
     def __init__(self):
-        raise NotImplementedError
+        if not self.op:
+            raise NotImplementedError
+
+    def _key(self):
+        return (self.op,)
+
+    def __reduce__(self):
+        return (type(self), ())
 
     def __str__(self):
         if self.short_desc:
             return f'<{self.short_desc}>'
-        return self.metachar
+        return self.op
 
 @total_ordering
 class Literal(Klean):
     # A literal character to match
+    __slots__ = ('char',)
+
     def __init__(self, character):
         #if isinstance(character, Literal):
         #    return self.__init__(Literal.character)
         if not isinstance(character, str) or len(character) != 1:
             raise ValueError(f'{self.__class__.__name__} can only take a single character')
-        self.char = character
+        _set(self, 'char', character)
+
+    def _key(self):
+        return (self.char,)
+
+    def __reduce__(self):
+        return (Literal, (self.char,))
 
     def __hash__(self):
-        return hash(self.char)
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Literal):
             return self.char == rhs.char
         return NotImplemented
@@ -60,9 +207,9 @@ class Literal(Klean):
         if isinstance(rhs, (Literal, Abstract)):
             return Sequence(self, rhs)
         elif isinstance(rhs, Sequence):
-            return Sequence(*([self] + rhs.characters))
+            return Sequence(self, *rhs.characters)
         elif isinstance(rhs, (Range, Group)):
-            return Group(self, rhs)
+            return _join(self, rhs)
         else:
             return NotImplemented
 
@@ -73,9 +220,9 @@ class Literal(Klean):
         if isinstance(lhs, (Literal, Abstract)):
             return Sequence(lhs, self)
         elif isinstance(lhs, Sequence):
-            return Sequence(*(lhs.characters + [self]))
+            return lhs._extended((self,))
         elif isinstance(lhs, (Range, Group)):
-            return Group(lhs, self)
+            return _join(lhs, self)
         else:
             return NotImplemented
 
@@ -86,9 +233,9 @@ class Literal(Klean):
         if isinstance(rhs, Literal):
             return Range(self, rhs)
         elif isinstance(rhs, Range):
-            return Range(*(set((self,)) | rhs.range))
+            return Range(self)._union(rhs)
         elif isinstance(rhs, (Abstract, Sequence, Group)):
-            return Group(self, rhs, OR=True)
+            return _join(self, rhs, OR=True)
         else:
             return NotImplemented
 
@@ -99,9 +246,9 @@ class Literal(Klean):
         if isinstance(lhs, Literal):
             return Range(lhs, self)
         elif isinstance(lhs, Range):
-            return Range(*(lhs.range | set((self,))))
+            return lhs._union(Range(self))
         elif isinstance(lhs, (Abstract, Sequence, Group)):
-            return Group(lhs, self, OR=True)
+            return _join(lhs, self, OR=True)
         else:
             return NotImplemented
 
@@ -110,18 +257,30 @@ class Literal(Klean):
 
 class Abstract(Klean):
     # Match a portion of a string not able to be represented by a character
-    # Each Abstract must be defined as a subclass that pre-defines the following as instance variables
+    # Each Abstract must be defined as a subclass that pre-defines the following as class variables
+    __slots__ = ()
     metachar = ''
     short_desc = ''
     # empty string
+    width = 1
+    # number of characters consumed, 0 for anchors such as \A or \b
 
     def __init__(self):
-        raise NotImplementedError
+        if not self.metachar:
+            raise NotImplementedError
+
+    def _key(self):
+        return (self.metachar,)
+
+    def __reduce__(self):
+        return (type(self), ())
 
     def __hash__(self):
-        return hash(self.metachar)
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Abstract):
             return self.metachar == rhs.metachar
         return NotImplemented
@@ -133,9 +292,9 @@ class Abstract(Klean):
         if isinstance(rhs, (Literal, Abstract)):
             return Sequence(self, rhs)
         elif isinstance(rhs, Sequence):
-            return Sequence(*([self] + rhs.characters))
+            return Sequence(self, *rhs.characters)
         elif isinstance(rhs, (Range, Group)):
-            return Group(self, rhs)
+            return _join(self, rhs)
         else:
             return NotImplemented
 
@@ -146,9 +305,9 @@ class Abstract(Klean):
         if isinstance(lhs, (Literal, Abstract)):
             return Sequence(lhs, self)
         elif isinstance(lhs, Sequence):
-            return Sequence(*(lhs.characters + [self]))
+            return lhs._extended((self,))
         elif isinstance(lhs, (Range, Group)):
-            return Group(lhs, self)
+            return _join(lhs, self)
         else:
             return NotImplemented
 
@@ -157,7 +316,7 @@ class Abstract(Klean):
             rhs = _str_to_klean_obj(rhs)
 
         if isinstance(rhs, Klean):
-            return Group(self, rhs, OR=True)
+            return _join(self, rhs, OR=True)
         else:
             return NotImplemented
 
@@ -166,7 +325,7 @@ class Abstract(Klean):
             lhs = _str_to_klean_obj(lhs)
 
         if isinstance(lhs, Klean):
-            return Group(lhs, self, OR=True)
+            return _join(lhs, self, OR=True)
         else:
             return NotImplemented
 
@@ -175,8 +334,50 @@ class Abstract(Klean):
             return f'<{self.short_desc}>'
         return self.metachar
 
-class Sequence(Klean):
+class _Chain(Klean):
+    # A Klean made of an ordered run of members. The member list may be shared
+    # with the node this one was extended from, so a node only ever reads its
+    # first _size entries and extending it appends past them; that makes long
+    # operator chains linear to build
+    __slots__ = ('_members', '_size', '_fold')
+
+    def _set_members(self, members):
+        fold = _FOLD_START
+        for member in members:
+            fold = hash((fold, member._hash))
+        self._set_chain(members, len(members), fold)
+
+    def _set_chain(self, members, size, fold):
+        _set(self, '_members', members)
+        _set(self, '_size', size)
+        _set(self, '_fold', fold)
+
+    def _grow(self, members):
+        shared, size, fold = self._members, self._size, self._fold
+        for member in members:
+            if len(shared) == size:
+                shared.append(member)
+            if shared[size] is not member:
+                # another node already continued this list differently
+                shared = shared[:size]
+                shared.append(member)
+            size += 1
+            fold = hash((fold, member._hash))
+        return shared, size, fold
+
+    def _members_key(self):
+        return _Members(self._members, self._size, self._fold)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return islice(self._members, self._size)
+
+class Sequence(_Chain):
     # Multiple Literals anded together
+    __slots__ = ()
+
     def __init__(self, *characters):
         # flatten any multi-character strings or Sequences
         characters = list(characters)
@@ -186,11 +387,31 @@ class Sequence(Klean):
                 characters[i:i] = [_c for _c in c]
         if not characters or not any(characters):
             raise ValueError('No values provided')
-        self.characters = [(c if isinstance(c, (Literal, Abstract)) else Literal(c)) for c in characters]
+        self._set_members([(c if isinstance(c, (Literal, Abstract)) else Literal(c)) for c in characters])
+
+    @property
+    def characters(self):
+        return tuple(self)
+
+    def _extended(self, characters):
+        new = Sequence.__new__(Sequence)
+        new._set_chain(*self._grow(characters))
+        return _intern(new)
+
+    def _key(self):
+        return self._members_key()
+
+    def __reduce__(self):
+        return (Sequence, self.characters)
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Sequence):
-            return self.characters ==  rhs.characters
+            return self._hash == rhs._hash and self._members_key() == rhs._members_key()
         return NotImplemented
 
     def __and__(self, rhs):
@@ -198,13 +419,11 @@ class Sequence(Klean):
             rhs = _str_to_klean_obj(rhs)
 
         if isinstance(rhs, (Literal, Abstract)):
-            return Sequence(*(self.characters + [rhs]))
+            return self._extended((rhs,))
         elif isinstance(rhs, Sequence):
-            return Sequence(*[self.characters + rhs.characters])
-        elif isinstance(rhs, Range):
-            return Group(self, rhs, OR=True)
-        elif isinstance(rhs, Group):
-            return Group(self, rhs)
+            return self._extended(rhs.characters)
+        elif isinstance(rhs, (Range, Group)):
+            return _join(self, rhs)
         else:
             return NotImplemented
 
@@ -213,13 +432,11 @@ class Sequence(Klean):
             lhs = _str_to_klean_obj(lhs)
 
         if isinstance(lhs, (Literal, Abstract)):
-            return Sequence(*([lhs] + self.characters))
+            return Sequence(lhs, *self.characters)
         elif isinstance(lhs, Sequence):
-            return Sequence(*[lhs.characters + self.characters])
-        elif isinstance(lhs, Range):
-            return Group(lhs, self, OR=True)
-        elif isinstance(lhs, Group):
-            return Group(lhs, self)
+            return lhs._extended(self.characters)
+        elif isinstance(lhs, (Range, Group)):
+            return _join(lhs, self)
         else:
             return NotImplemented
 
@@ -228,7 +445,7 @@ class Sequence(Klean):
             rhs = _str_to_klean_obj(rhs)
 
         if isinstance(rhs, Klean):
-            return Group(self, rhs, OR=True)
+            return _join(self, rhs, OR=True)
         else:
             return NotImplemented
 
@@ -237,22 +454,23 @@ class Sequence(Klean):
             lhs = _str_to_klean_obj(lhs)
 
         if isinstance(lhs, Klean):
-            return Group(lhs, self, OR=True)
+            return _join(lhs, self, OR=True)
         else:
             return NotImplemented
 
     def __str__(self):
-        return ''.join(str(char) for char in self.characters)
-
-    def __len__(self):
-        return len(self.characters)
+        return ''.join(str(char) for char in self)
 
 class Range(Klean):
     # A compact representation of multiple literals
+    # Members are stored as a flat array of sorted, merged, inclusive code point
+    # intervals: [start0, end0, start1, end1, ...]; it must never be modified
+    __slots__ = ('invert', 'intervals')
+
     def __init__(self, *args, invert=False):
 
-        self.invert = invert
-        self.range = set()
+        _set(self, 'invert', invert)
+        pairs = []
         for literal in args:
             try:
                 start, end = literal
@@ -262,23 +480,82 @@ class Range(Klean):
             end = getattr(end, 'char', end)
             if not start or not end:
                 raise ValueError('Empty value passed in')
-            for char in range(ord(start), ord(end)+1):
-                self.range.add(Literal(chr(char)))
+            pairs.append((ord(start), ord(end)))
+        _set(self, 'intervals', _merge_intervals(pairs))
+
+    @classmethod
+    def _from_intervals(cls, intervals, invert=False):
+        # Build a plain Range directly from an already merged interval array
+        new = Range.__new__(Range)
+        _set(new, 'invert', invert)
+        _set(new, 'intervals', intervals)
+        return _intern(new)
+
+    def _key(self):
+        return (self.intervals.tobytes(), self.invert)
+
+    def __reduce__(self):
+        return (Range._from_intervals, (self.intervals, self.invert))
+
+    def spans(self):
+        # The stored (start, end) code point pairs, ignoring invert
+        intervals = self.intervals
+        for i in range(0, len(intervals), 2):
+            yield intervals[i], intervals[i+1]
+
+    def _matched_intervals(self):
+        if self.invert:
+            return _complement_intervals(self.intervals)
+        return self.intervals
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Range):
-            return self.range ==  rhs.range and self.invert == rhs.invert
+            return (self._hash == rhs._hash and self.invert == rhs.invert
+                    and self.intervals == rhs.intervals)
         return NotImplemented
 
-    def __not__(self):
-        self.invert = not self.invert
+    def __contains__(self, item):
+        char = getattr(item, 'char', item)
+        if not isinstance(char, str) or len(char) != 1:
+            return False
+        point = ord(char)
+        intervals = self.intervals
+        i = bisect_right(intervals, point)
+        inside = i % 2 == 1 or (i > 0 and intervals[i-1] == point)
+        return inside != bool(self.invert)
+
+    def __iter__(self):
+        # Every Literal matched by this range, in code point order
+        intervals = self._matched_intervals()
+        for i in range(0, len(intervals), 2):
+            for point in range(intervals[i], intervals[i+1]+1):
+                yield Literal(chr(point))
+
+    def _union(self, rhs):
+        if not self.invert and not rhs.invert:
+            return Range._from_intervals(_merge_intervals(
+                chain(self.spans(), rhs.spans())))
+        # keep an inverted result inverted; its complement is the smaller set
+        matched = _merge_intervals(chain(_pairs(self._matched_intervals()),
+                                         _pairs(rhs._matched_intervals())))
+        return Range._from_intervals(_complement_intervals(matched), invert=True)
+
+    def __invert__(self):
+        return Range._from_intervals(self.intervals, invert=not self.invert)
+
+    __not__ = __invert__
 
     def __and__(self, rhs):
         if isinstance(rhs, str):
             rhs = _str_to_klean_obj(rhs)
 
         if isinstance(rhs, Klean):
-            return Group(self, rhs)
+            return _join(self, rhs)
         else:
             return NotImplemented
 
@@ -287,7 +564,7 @@ class Range(Klean):
             lhs = _str_to_klean_obj(lhs)
 
         if isinstance(lhs, Klean):
-            return Group(lhs, self)
+            return _join(lhs, self)
         else:
             return NotImplemented
 
@@ -296,11 +573,11 @@ class Range(Klean):
             rhs = _str_to_klean_obj(rhs)
 
         if isinstance(rhs, Literal):
-            return Range(*(self.range | set((rhs,))))
+            return self._union(Range(rhs))
         elif isinstance(rhs, Range):
-            return Range(self.range | rhs.range)
+            return self._union(rhs)
         elif isinstance(rhs, (Abstract, Sequence, Group)):
-            return Group(self, rhs, OR=True)
+            return _join(self, rhs, OR=True)
         else:
             return NotImplemented
 
@@ -309,53 +586,115 @@ class Range(Klean):
             lhs = _str_to_klean_obj(lhs)
 
         if isinstance(lhs, Literal):
-            return Range(*(set((lhs,)) | self.range))
+            return Range(lhs)._union(self)
         elif isinstance(lhs, Range):
-            return Range(*(lhs.range | self.range))
+            return lhs._union(self)
         elif isinstance(lhs, (Abstract, Sequence, Group)):
-            return Group(lhs, self, OR=True)
+            return _join(lhs, self, OR=True)
         else:
             return NotImplemented
 
     def __str__(self):
+        from model.representations import Not
         invert = str(Not()) if self.invert else ''
-        return f'{{{invert}{",".join(sorted([c.char for c in self.range]))}}}'
-
-class Group(Klean):
-    # A group of pattern matches; either literals or other groups or both
-
-    def __init__(self, *groups, repetition=None, OR=False):
+        chars = ','.join(chr(point) for start, end in self.spans()
+                         for point in range(start, end+1))
+        return f'{{{invert}{chars}}}'
+
+class Group(_Chain):
+    # A group of pattern matches; either literals or other groups or both.
+    # capture is None for a group only matched, True for one whose match is
+    # kept by position, or the name its match is kept under. Once an atomic
+    # group has matched it is never backtracked into to try another way
+    __slots__ = ('OR', 'repetition', 'capture', 'atomic')
+
+    def __init__(self, *groups, repetition=None, OR=False, capture=None, atomic=False):
         assert all(isinstance(g, Klean) for g in groups)
-        self.groups = groups
-        self.OR = OR
+        if capture is False:
+            capture = None
+        if not (capture is None or capture is True or
+                (isinstance(capture, str) and capture.isidentifier())):
+            raise ValueError(f'capture must be None, True or a name, recieved {capture!r} instead')
+        self._set_members(list(groups))
+        _set(self, 'OR', bool(OR))
         if repetition is None:
             repetition = Quantification(min=1, max=1)
-        self.repetition = repetition
+        _set(self, 'repetition', repetition)
+        _set(self, 'capture', capture)
+        _set(self, 'atomic', bool(atomic))
+
+    @property
+    def groups(self):
+        return tuple(self)
+
+    def _extended(self, groups, OR):
+        new = Group.__new__(Group)
+        new._set_chain(*self._grow(groups))
+        _set(new, 'OR', OR)
+        _set(new, 'repetition', self.repetition)
+        _set(new, 'capture', self.capture)
+        _set(new, 'atomic', self.atomic)
+        return _intern(new)
+
+    def _key(self):
+        return (self._members_key(), self.OR, self.repetition, self.capture, self.atomic)
+
+    def __reduce__(self):
+        return (_rebuild, (Group, self.groups, {'OR': self.OR, 'repetition': self.repetition,
+                                                'capture': self.capture, 'atomic': self.atomic}))
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Group):
-            return self.groups ==  rhs.groups and self.repetition == rhs.repetition
+            return (self._hash == rhs._hash and self.OR == rhs.OR
+                    and self.repetition == rhs.repetition and self.capture == rhs.capture
+                    and self.atomic == rhs.atomic
+                    and self._members_key() == rhs._members_key())
         return NotImplemented
 
     def __and__(self, rhs):
         if isinstance(rhs, str):
             rhs = _str_to_klean_obj(rhs)
         if isinstance(rhs, Klean):
-            return Group(self, rhs)
+            return _join(self, rhs)
+        else:
+            return NotImplemented
+
+    def __rand__(self, lhs):
+        if isinstance(lhs, str):
+            lhs = _str_to_klean_obj(lhs)
+        if isinstance(lhs, Klean):
+            return _join(lhs, self)
         else:
             return NotImplemented
 
     def __or__(self, rhs):
         if isinstance(rhs, str):
-            rhs = _str_to_reo_obj(rhs)
+            rhs = _str_to_klean_obj(rhs)
         if isinstance(rhs, Klean):
-            return Group(self, rhs, OR=True)
+            return _join(self, rhs, OR=True)
+        else:
+            return NotImplemented
+
+    def __ror__(self, lhs):
+        if isinstance(lhs, str):
+            lhs = _str_to_klean_obj(lhs)
+        if isinstance(lhs, Klean):
+            return _join(lhs, self, OR=True)
         else:
             return NotImplemented
 
     def __str__(self):
         between = '<OR>' if self.OR else ''
-        return f'({between.join([str(g) for g in self.groups])}){self.repetition}'
+        capture = '' if self.capture is None else '<CAPTURE>' if self.capture is True \
+            else f'<CAPTURE {self.capture}>'
+        if self.atomic:
+            capture += '<ATOMIC>'
+        return f'({capture}{between.join([str(g) for g in self])}){self.repetition}'
 
 # Pre-built ranges:
 # ALL (*)
@@ -364,14 +703,18 @@ class Group(Klean):
 # DECIMAL (\d)
 # WHITESPACE (\s)
 
-class Quantification(object):
+class Quantification(_Immutable):
     # A repitition to apply to a pattern; inclusive
     # A max of 0 means infinity
     # if max < min, max = min
     # * == min=0, max=0
     # + == min=1, max=0
     # ? == min=0, max=1
-    def __init__(self, min=0, max=0, greedy=True):
+    # A possessive repetition takes as many as it can and is never backtracked
+    # into to give any back
+    __slots__ = ('min', 'max', 'greedy', 'possessive')
+
+    def __init__(self, min=0, max=0, greedy=True, possessive=False):
         if type(min) != int or min < 0:
             print("@@@@", min, type(min))
             raise ValueError('min must be an unsigned intiger')
@@ -380,14 +723,30 @@ class Quantification(object):
             raise ValueError('max must be an unsigned intiger')
         if max < min and max != 0:
             max = min
-        self.min = min
-        self.max = max
-        self.greedy = bool(greedy)
+        if possessive and not greedy:
+            raise ValueError('a possessive repetition must be greedy')
+        _set(self, 'min', min)
+        _set(self, 'max', max)
+        _set(self, 'greedy', bool(greedy))
+        _set(self, 'possessive', bool(possessive))
+
+    def _key(self):
+        return (self.min, self.max, self.greedy, self.possessive)
+
+    def __reduce__(self):
+        return (Quantification, self._key())
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if isinstance(rhs, Quantification):
-            return self.min == rhs.min and self.max == rhs.max and self.greedy == rhs.greedy
+            return (self.min == rhs.min and self.max == rhs.max and self.greedy == rhs.greedy
+                    and self.possessive == rhs.possessive)
         return NotImplemented
 
     def __str__(self):
-        return f'<{self.min},{self.max or ""}{"GREATEST" if self.greedy else "LEAST"}>'
+        mode = 'POSSESSIVE' if self.possessive else 'GREATEST' if self.greedy else 'LEAST'
+        return f'<{self.min},{self.max or ""}{mode}>'
@@ -0,0 +1,357 @@
+"""Static analysis of Klean trees
+
+Passes walk the tree bottom up with an explicit stack, visiting each distinct
+node once, so shared subtrees and very deep trees cost no more than their size.
+"""
+from collections import namedtuple
+from itertools import chain
+
+from model._klean import Abstract, Group, Literal, Range, Sequence
+from model.representations import StringEnd, StringStart
+
+def _children(klean):
+    if isinstance(klean, (Group, Sequence)):
+        return klean
+    return ()
+
+def _postorder(klean):
+    # Yield every distinct node below and including klean, children first
+    seen = set()
+    stack = [(klean, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(tuple(_children(node)))
+                     if id(child) not in seen)
+
+RequiredLiterals = namedtuple('RequiredLiterals', ['prefix', 'suffix', 'factors'])
+
+# What is known of the strings a node matches: the one string it always matches
+# (or None), a prefix and suffix every match starts and ends with, and factors
+# that every match contains
+_Facts = namedtuple('_Facts', ['exact', 'prefix', 'suffix', 'factors'])
+_UNKNOWN = _Facts(None, '', '', frozenset())
+
+def _exactly(string):
+    return _Facts(string, string, string, frozenset((string,)))
+
+def _concatenate(facts):
+    # Join facts left to right, collecting runs of exact strings so that long
+    # sequences are concatenated once rather than one character at a time
+    prefix = None
+    factors = set()
+    run = []
+    for fact in facts:
+        if fact.exact is not None:
+            run.append(fact.exact)
+            continue
+        run.append(fact.prefix)
+        joined = ''.join(run)
+        if prefix is None:
+            prefix = joined
+        factors.add(joined)
+        factors.update(fact.factors)
+        run = [fact.suffix]
+    if prefix is None:
+        return _exactly(''.join(run))
+    suffix = ''.join(run)
+    factors.add(suffix)
+    return _Facts(None, prefix, suffix, frozenset(factors))
+
+def _common_prefix(strings):
+    first, last = min(strings), max(strings)
+    for i, char in enumerate(first):
+        if char != last[i]:
+            return first[:i]
+    return first
+
+def _alternate(facts):
+    exact = {fact.exact for fact in facts}
+    if len(exact) == 1 and None not in exact:
+        return facts[0]
+    prefix = _common_prefix([fact.prefix for fact in facts])
+    suffix = _common_prefix([fact.suffix[::-1] for fact in facts])[::-1]
+    factors = frozenset.intersection(*(fact.factors for fact in facts))
+    return _Facts(None, prefix, suffix, factors | {prefix, suffix})
+
+def _repeat(fact, quantity):
+    if quantity.min == 0:
+        return _UNKNOWN
+    if quantity.min == quantity.max == 1:
+        return fact
+    # at least one copy is always matched, but its neighbours are unknown
+    return _Facts(None, fact.prefix, fact.suffix, fact.factors)
+
+def _facts(klean, known):
+    if isinstance(klean, Literal):
+        return _exactly(klean.char)
+    if isinstance(klean, Abstract):
+        return _exactly('') if klean.width == 0 else _UNKNOWN
+    if isinstance(klean, Range):
+        intervals = klean.intervals
+        if not klean.invert and len(intervals) == 2 and intervals[0] == intervals[1]:
+            return _exactly(chr(intervals[0]))
+        return _UNKNOWN
+    if isinstance(klean, Sequence):
+        return _concatenate(known[id(member)] for member in klean)
+    if isinstance(klean, Group):
+        members = [known[id(member)] for member in klean]
+        if klean.OR and members:
+            fact = _alternate(members)
+        else:
+            fact = _concatenate(members)
+        return _repeat(fact, klean.repetition)
+    raise ValueError(f'required_literals must be supplied with a Klean object, recieved {type(klean)} instead')
+
+def required_literals(klean):
+    """Return the literal text every match of klean must contain
+
+    The result holds the prefix every match starts with, the suffix every
+    match ends with, and a tuple of factors every match contains somewhere,
+    longest first. Any of them may be empty when nothing is required.
+    """
+    known = {}
+    for node in _postorder(klean):
+        known[id(node)] = _facts(node, known)
+    fact = known[id(klean)]
+    factors = sorted((factor for factor in fact.factors if factor),
+                     key=lambda factor: (-len(factor), factor))
+    return RequiredLiterals(fact.prefix, fact.suffix, tuple(factors))
+
+LengthBounds = namedtuple('LengthBounds', ['min', 'max'])
+
+def _bounds(klean, known):
+    if isinstance(klean, Abstract):
+        return klean.width, klean.width
+    if isinstance(klean, (Literal, Range)):
+        return 1, 1
+    if not isinstance(klean, (Group, Sequence)):
+        raise ValueError(f'length_bounds must be supplied with a Klean object, recieved {type(klean)} instead')
+    members = [known[id(member)] for member in klean]
+    maxes = [high for low, high in members]
+    if isinstance(klean, Group) and klean.OR and members:
+        low = min(low for low, high in members)
+        high = None if None in maxes else max(maxes)
+    else:
+        low = sum(low for low, high in members)
+        high = None if None in maxes else sum(maxes)
+    if isinstance(klean, Group):
+        repetition = klean.repetition
+        low *= repetition.min
+        if high != 0:
+            # max=0 repeats without limit
+            high = None if high is None or repetition.max == 0 else high * repetition.max
+    return low, high
+
+def length_bounds(klean):
+    """Return the shortest and longest text a match of klean can span
+
+    The longest is None when a repetition without a maximum makes it unbounded.
+    """
+    known = {}
+    for node in _postorder(klean):
+        known[id(node)] = _bounds(node, known)
+    return LengthBounds(*known[id(klean)])
+
+def _edges(klean):
+    # The nodes every match of klean starts and ends with, looking inside
+    # concatenations that are matched at least once
+    first = last = klean
+    while isinstance(first, (Group, Sequence)) and len(first) and not (
+            isinstance(first, Group) and (first.OR or first.repetition.min == 0)):
+        first = next(iter(first))
+    while isinstance(last, (Group, Sequence)) and len(last) and not (
+            isinstance(last, Group) and (last.OR or last.repetition.min == 0)):
+        last = last.groups[-1] if isinstance(last, Group) else last.characters[-1]
+    return first, last
+
+def _anchored(klean):
+    # Whether every match of klean runs from \A to \Z, the whole string
+    first, last = _edges(klean)
+    return first == StringStart() and last == StringEnd()
+
+HIGH = 'high'
+MEDIUM = 'medium'
+LOW = 'low'
+SEVERITIES = (HIGH, MEDIUM, LOW)
+
+Finding = namedtuple('Finding', ['severity', 'node', 'reason'])
+
+# Character tests for the class Abstracts, close to python's re under unicode
+CLASS_TESTS = {
+    r'\d': str.isdecimal,
+    r'\D': lambda char: not char.isdecimal(),
+    r'\w': lambda char: char.isalnum() or char == '_',
+    r'\W': lambda char: not (char.isalnum() or char == '_'),
+    r'\s': str.isspace,
+    r'\S': lambda char: not char.isspace(),
+    '.': lambda char: char != '\n',
+    }
+# characters tried when comparing two classes, one of each kind the tests tell apart
+WITNESSES = 'aZ0_ \t\n!-\xe9\u0663\u3000\u4e2d'
+# ranges with more members than this are compared by test instead of by member
+RANGE_EXPAND = 256
+
+def _characters(atoms):
+    # Split atoms into the set of characters they list and tests for the rest
+    chars = set()
+    tests = []
+    for atom in atoms:
+        if isinstance(atom, Literal):
+            chars.add(atom.char)
+        elif isinstance(atom, Range):
+            intervals = atom._matched_intervals()
+            size = sum(intervals[i+1] - intervals[i] + 1 for i in range(0, len(intervals), 2))
+            if size <= RANGE_EXPAND:
+                chars.update(literal.char for literal in atom)
+            else:
+                tests.append((atom.__contains__, [chr(point) for point in intervals]))
+        else:
+            # an unknown Abstract might match anything
+            tests.append((CLASS_TESTS.get(atom.metachar, lambda char: True), ()))
+    return chars, tests
+
+def _overlap(lhs, rhs):
+    # Whether some character is matched by one of lhs's atoms and one of rhs's
+    lhs_chars, lhs_tests = _characters(lhs)
+    rhs_chars, rhs_tests = _characters(rhs)
+    if lhs_chars & rhs_chars:
+        return True
+    if any(test(char) for test, samples in rhs_tests for char in lhs_chars):
+        return True
+    if any(test(char) for test, samples in lhs_tests for char in rhs_chars):
+        return True
+    for lhs_test, lhs_samples in lhs_tests:
+        for rhs_test, rhs_samples in rhs_tests:
+            if any(lhs_test(char) and rhs_test(char)
+                   for char in chain(WITNESSES, lhs_samples, rhs_samples)):
+                return True
+    return False
+
+def _starts(klean, known):
+    # (nullable, first, atoms): whether klean can match empty text, the atoms
+    # a match can start with, and every atom it may consume
+    if isinstance(klean, Abstract) and klean.width == 0:
+        return True, frozenset(), frozenset()
+    if isinstance(klean, (Literal, Range, Abstract)):
+        return False, frozenset((klean,)), frozenset((klean,))
+    members = [known[id(member)] for member in klean]
+    atoms = frozenset().union(*(member[2] for member in members))
+    if isinstance(klean, Group) and klean.OR and members:
+        nullable = any(member[0] for member in members)
+        first = frozenset().union(*(member[1] for member in members))
+    else:
+        nullable = True
+        first = set()
+        for member in members:
+            first.update(member[1])
+            if not member[0]:
+                nullable = False
+                break
+        first = frozenset(first)
+    if isinstance(klean, Group) and klean.repetition.min == 0:
+        nullable = True
+    return nullable, first, atoms
+
+def _repeats(klean):
+    # Whether klean is a group repeated a variable number of times, beyond ?
+    if not isinstance(klean, Group):
+        return False
+    repetition = klean.repetition
+    return repetition.max == 0 or repetition.max > max(repetition.min, 1)
+
+def _committed(klean):
+    # Whether what klean matched is never given back to what is around it
+    return isinstance(klean, Group) and (klean.atomic or klean.repetition.possessive)
+
+def _text(klean):
+    if isinstance(klean, Literal):
+        return klean.char
+    if isinstance(klean, Sequence) and all(isinstance(char, Literal) for char in klean):
+        return ''.join(char.char for char in klean)
+    return None
+
+def _ambiguous(klean, known):
+    # Whether two alternatives of klean can start matching the same text.
+    # Plain strings only clash when one is a prefix of another
+    words = []
+    seen = frozenset()
+    for member in klean:
+        text = _text(member)
+        if text is not None:
+            words.append(text)
+            continue
+        first = known[id(member)][1]
+        if _overlap(first, seen):
+            return True
+        seen |= first
+    words.sort()
+    if any(words[i+1].startswith(words[i]) for i in range(len(words) - 1)):
+        return True
+    return bool(words) and _overlap(frozenset(Literal(word[0]) for word in words), seen)
+
+def backtracking_risks(klean):
+    """Return Findings for the parts of klean that make re backtrack badly
+
+    Each finding holds a severity (HIGH, MEDIUM or LOW), the offending subtree
+    and the reason: quantifiers nested in an unbounded repetition that can
+    divide the same text between them, alternatives under a repetition that
+    can match the same text, or neighbouring unbounded quantifiers over the
+    same characters. Character classes are compared approximately, erring on
+    the side of a finding. Atomic groups and possessive repetitions are not
+    backtracked into, so what is around them can not make them backtrack. The
+    most severe findings come first.
+    """
+    known = {}
+    for node in _postorder(klean):
+        known[id(node)] = _starts(node, known)
+    findings = {}
+
+    def report(severity, node, reason):
+        findings.setdefault((id(node), reason), Finding(severity, node, reason))
+
+    # each entry holds a node, the nearest unbounded repetition around it,
+    # whether everything after it in that repetition can match empty text,
+    # and the nearest variable repetition around it
+    stack = [(klean, None, False, None)]
+    visited = set()
+    while stack:
+        node, outer, tail, repeat = stack.pop()
+        key = (id(node), id(outer), tail, id(repeat))
+        if key in visited or not isinstance(node, Group):
+            continue
+        visited.add(key)
+        if _committed(node):
+            outer, tail, repeat = None, False, None
+        if _repeats(node) and not node.repetition.possessive:
+            if outer is not None and tail and _overlap(known[id(node)][2], known[id(outer)][1]):
+                report(HIGH if node.repetition.max == 0 else MEDIUM, outer,
+                       'nested quantifiers can divide the same text in many ways')
+            repeat = node
+            if node.repetition.max == 0:
+                outer, tail = node, True
+        if node.OR:
+            if repeat is not None and _ambiguous(node, known):
+                report(HIGH if repeat.repetition.max == 0 else MEDIUM, node,
+                       'alternatives under a repetition can match the same text')
+            stack.extend((member, outer, tail, repeat) for member in node)
+            continue
+        members = node.groups
+        rest = tail
+        for i in range(len(members)-1, -1, -1):
+            member = members[i]
+            stack.append((member, outer, rest, repeat))
+            following = members[i+1] if i + 1 < len(members) else None
+            if (following is not None and _repeats(member) and _repeats(following)
+                    and not _committed(member)
+                    and member.repetition.max == following.repetition.max == 0
+                    and _overlap(known[id(member)][2], known[id(following)][2])):
+                report(LOW, node, 'neighbouring quantifiers can divide the same text')
+            rest = rest and known[id(member)][0]
+    return sorted(findings.values(), key=lambda finding: SEVERITIES.index(finding.severity))
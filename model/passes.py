@@ -0,0 +1,198 @@
+"""Rewrite Klean trees into smaller trees that match the same text
+
+optimize() runs a pipeline of passes over a tree before it is given to a
+resolver. A pass is a function taking one node, whose children have already
+been rewritten, and returning the node to use in its place; any function of
+that shape can be added to the pipeline. The tree is walked bottom up with an
+explicit stack, as the analysis passes walk it, so deep trees and shared
+subtrees cost no more than their size.
+
+The rewritten tree matches the same text at the same places. Only groups that
+do not capture are dropped or merged, so captures are numbered and filled as
+they were.
+"""
+
+from functools import reduce
+
+from model._klean import Abstract, Group, Literal, Quantification, Range, Sequence
+from model.analysis import _postorder
+
+ONCE = Quantification(min=1, max=1)
+
+def _plain(klean):
+    # an unquantified group that neither captures nor is atomic
+    return (isinstance(klean, Group) and klean.repetition == ONCE and klean.capture is None
+            and not klean.atomic)
+
+def _like(klean, members, OR=None):
+    # a group of members that is otherwise as klean is
+    return Group(*members, OR=klean.OR if OR is None else OR, repetition=klean.repetition,
+                 capture=klean.capture, atomic=klean.atomic)
+
+def _spliced(klean, OR):
+    # The members a group stands for inside an OR (or AND) parent: its own
+    # members when it is a plain group of that kind, or of one member
+    if _plain(klean):
+        if len(klean) == 1 or (klean.OR == OR and (len(klean) or not OR)):
+            return tuple(klean)
+    return (klean,)
+
+def drop_groups(klean):
+    """Drop the {1,1} groups that the parenthesis around changes nothing
+
+    Unquantified groups are spliced into a parent of the same kind, a group
+    of one unquantified group takes that group's members, and an unquantified
+    group of one member becomes the member. Capturing and atomic groups are
+    kept.
+    """
+    if not isinstance(klean, Group):
+        return klean
+    members = [member for group in klean for member in _spliced(group, klean.OR)]
+    OR = klean.OR
+    if len(members) == 1 and _plain(members[0]):
+        OR = members[0].OR
+        members = list(members[0])
+    if len(members) == 1 and _plain(klean):
+        return members[0]
+    if members == list(klean) and OR == klean.OR:
+        return klean
+    return _like(klean, members, OR)
+
+def _joined(run):
+    # extend the first Sequence of the run in place of copying it, so that
+    # merging up a deep tree stays linear
+    first, rest = run[0], run[1:]
+    if not isinstance(first, Sequence):
+        first = Sequence(first)
+    return first._extended(char for member in rest
+                           for char in (member if isinstance(member, Sequence) else (member,)))
+
+def merge_literals(klean):
+    """Join runs of Literals, Abstracts and Sequences in an AND group into Sequences"""
+    if not isinstance(klean, Group) or klean.OR:
+        return klean
+    members = []
+    run = []
+    for member in list(klean) + [None]:
+        if isinstance(member, (Literal, Abstract, Sequence)):
+            run.append(member)
+            continue
+        if len(run) > 1:
+            members.append(_joined(run))
+        else:
+            members.extend(run)
+        run = []
+        if member is not None:
+            members.append(member)
+    if len(members) == len(klean):
+        return klean
+    if len(members) == 1 and _plain(klean):
+        return members[0]
+    return _like(klean, members)
+
+def _single(klean):
+    return isinstance(klean, (Literal, Range))
+
+def merge_alternatives(klean):
+    """Join runs of single character alternatives in an OR group into one Range
+
+    Only neighbouring alternatives are joined, as which alternative matches
+    first decides what an OR group matches.
+    """
+    if not isinstance(klean, Group) or not klean.OR:
+        return klean
+    members = []
+    run = []
+    for member in list(klean) + [None]:
+        if _single(member):
+            run.append(member if isinstance(member, Range) else Range(member))
+            original = member
+            continue
+        if len(run) > 1:
+            members.append(reduce(Range._union, run))
+        elif run:
+            members.append(original)
+        run = []
+        if member is not None:
+            members.append(member)
+    if len(members) == len(klean):
+        return klean
+    if len(members) == 1:
+        if _plain(klean):
+            return members[0]
+        return _like(klean, members, OR=False)
+    return _like(klean, members)
+
+def _product(inner, outer):
+    # The repetition matching every count of characters the outer repetition of
+    # the inner one does, or None when those counts have gaps, as (x{2}){0,3}
+    # matching 0, 2, 4 or 6
+    if inner.greedy != outer.greedy:
+        return None
+    a, b = inner.min, inner.max or None
+    c, d = outer.min, outer.max or None
+    if c != d:
+        if b is None:
+            if a > 1 and c == 0:
+                return None
+        elif a > 1 + c * (b - a):
+            return None
+    high = None if b is None or d is None else b * d
+    return Quantification(min=a * c, max=high or 0, greedy=inner.greedy)
+
+def _foldable(klean):
+    return (isinstance(klean, Group) and len(klean) == 1 and klean.repetition != ONCE
+            and klean.capture is None and not klean.atomic and not klean.repetition.possessive)
+
+def fold_quantifiers(klean):
+    """Fold a quantified group of one quantified character into one group, (x*)* to x*
+
+    Only groups of a single character are folded, where every way of dividing
+    the characters between the repetitions matches the same text, and only
+    when neither group captures, is atomic or is possessive.
+    """
+    if not _foldable(klean):
+        return klean
+    inner = klean.groups[0]
+    if not _foldable(inner):
+        return klean
+    body = inner.groups[0]
+    if not _single(body) and not (isinstance(body, Abstract) and body.width == 1):
+        return klean
+    repetition = _product(inner.repetition, klean.repetition)
+    if repetition is None:
+        return klean
+    if repetition == ONCE:
+        return body
+    return Group(body, repetition=repetition)
+
+PASSES = (drop_groups, merge_literals, merge_alternatives, fold_quantifiers)
+
+def _rewrite(node, passes):
+    # run the passes over one node until none of them changes it
+    changed = True
+    while changed:
+        changed = False
+        for rewrite in passes:
+            new = rewrite(node)
+            if new is not node:
+                node, changed = new, True
+    return node
+
+def optimize(klean, passes=PASSES):
+    """Return a tree matching what klean matches, rewritten by each of passes
+
+    Each pass is a function of one node to the node replacing it, and is
+    given nodes whose children have already been rewritten.
+    """
+    done = {}
+    for node in _postorder(klean):
+        new = node
+        if isinstance(node, Group):
+            members = [done[id(member)] for member in node]
+            if any(member is not old for member, old in zip(members, node)):
+                new = _like(node, members)
+        if not isinstance(node, Sequence):
+            new = _rewrite(new, passes)
+        done[id(node)] = new
+    return done[id(klean)]
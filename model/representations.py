@@ -9,141 +9,136 @@ from model._klean import Abstract, Literal, Operator, Range, Sequence
 
 class StringStart(Abstract):
     """Start of String"""
-
-    def __init__(self):
-        self.metachar = '\A'
-        self.short_desc = 'SOS'
+    __slots__ = ()
+    metachar = r'\A'
+    short_desc = 'SOS'
+    width = 0
 
 class StringEnd(Abstract):
     """End of String"""
-
-    def __init__(self):
-        self.metachar = '\Z'
-        self.short_desc = 'EOS'
+    __slots__ = ()
+    metachar = r'\Z'
+    short_desc = 'EOS'
+    width = 0
 
 class LineStart(Abstract):
     """Start of Line"""
     # sometimes equivilant to StringStart
-
-    def __init__(self):
-        self.metachar = '^'
-        self.short_desc = 'SOL'
+    __slots__ = ()
+    metachar = '^'
+    short_desc = 'SOL'
+    width = 0
 
 class LineEnd(Abstract):
     """End of Line"""
     # sometimes equivilant to StringEnd
-
-    def __init__(self):
-        self.metachar = '$'
-        self.short_desc = 'EOL'
+    __slots__ = ()
+    metachar = '$'
+    short_desc = 'EOL'
+    width = 0
 
 class WordBoundary(Abstract):
     """Start or end of a word"""
-
-    def __init__(self):
-        self.metachar = '\b'
-        self.short_desc = 'WB'
+    __slots__ = ()
+    metachar = r'\b'
+    short_desc = 'WB'
+    width = 0
 
 class NotWordBoundary(Abstract):
     """Anywhere but the start or end of a word"""
-
-    def __init__(self):
-        self.metachar = '\B'
-        self.short_desc = 'NWB'
+    __slots__ = ()
+    metachar = r'\B'
+    short_desc = 'NWB'
+    width = 0
 
 class Decimal(Abstract):
     """Base 10 digits"""
-
-    def __init__(self):
-        self.metachar = '\d'
-        self.short_desc = 'D'
+    __slots__ = ()
+    metachar = r'\d'
+    short_desc = 'D'
 
 class NotDecimal(Abstract):
     """Anything but a base 10 digit"""
-
-    def __init__(self):
-        self.metachar = '\D'
-        self.short_desc = 'ND'
+    __slots__ = ()
+    metachar = r'\D'
+    short_desc = 'ND'
 
 class Whitespace(Abstract):
     """Any Whitespace character"""
-
-    def __init__(self):
-        self.metachar = '\s'
-        self.short_desc = 'SPACE'
+    __slots__ = ()
+    metachar = r'\s'
+    short_desc = 'SPACE'
 
 class NotWhitespace(Abstract):
     """Any character but whitespace"""
-
-    def __init__(self):
-        self.metachar = '\S'
-        self.short_desc = 'NSPACE'
+    __slots__ = ()
+    metachar = r'\S'
+    short_desc = 'NSPACE'
 
 class Word(Abstract):
     """Any character that can make up a word"""
-
-    def __init__(self):
-        self.metachar = '\w'
-        self.short_desc = 'WORD'
+    __slots__ = ()
+    metachar = r'\w'
+    short_desc = 'WORD'
 
 class NotWord(Abstract):
     """Any character that cannot make up a word"""
-
-    def __init__(self):
-        self.metachar = '\W'
-        self.short_desc = 'NWORD'
+    __slots__ = ()
+    metachar = r'\W'
+    short_desc = 'NWORD'
 
 class Any(Abstract):
     """Any Single Character except a newline"""
-
-    def __init__(self):
-        self.metachar = '.'
-        self.short_desc = 'ANY'
+    __slots__ = ()
+    metachar = '.'
+    short_desc = 'ANY'
 
 class AnyAtAll(Abstract):
     """Any Single Character including a newline"""
-
-    def __init__(self):
-        self.metachar = '.'
-        self.short_desc = 'ANY'
+    __slots__ = ()
+    metachar = '.'
+    short_desc = 'ANY'
 
 # All possible operators
 
 class Or(Operator):
-    def __init__(self):
-        self.op = '|'
-        self.short_desc = 'OR'
+    __slots__ = ()
+    op = '|'
+    short_desc = 'OR'
 
 class Not(Operator):
-    def __init__(self):
-        self.op = '^'
-        self.short_desc = 'NOT'
+    __slots__ = ()
+    op = '^'
+    short_desc = 'NOT'
 
 # some pre-built character sequences
 
 class Empty(Sequence):
     """Match a line with no characters in it"""
+    __slots__ = ()
 
     def __init__(self):
-        self.characters = [StringStart, StringEnd]
+        super(Empty, self).__init__(StringStart(), StringEnd())
 
 # Some pre-built character ranges
 
 class LowerAscii(Range):
     """Match any lower case ascii character"""
+    __slots__ = ()
 
     def __init__(self):
-        super(LowerAscii, self).__init__(string.ascii_lowercase[0], string.ascii_lowercase[-1])
+        super(LowerAscii, self).__init__((string.ascii_lowercase[0], string.ascii_lowercase[-1]))
 
 class UpperAscii(Range):
     """Match any upper case ascii character"""
+    __slots__ = ()
 
     def __init__(self):
-        super(UpperAscii, self).__init__(string.ascii_uppercase[0], string.ascii_uppercase[-1])
+        super(UpperAscii, self).__init__((string.ascii_uppercase[0], string.ascii_uppercase[-1]))
 
 class Hex(Range):
     """Match any hexidecimal character"""
+    __slots__ = ()
 
     def __init__(self):
-        digits = string.digit + 'aAbBcCdDeEfF'
-        super(Hex, self).__init__(string.digits)
+        super(Hex, self).__init__(*string.hexdigits)
@@ -0,0 +1,130 @@
+"""Write Klean trees as compact JSON and read them back
+
+A tree is written as its distinct nodes, children before parents, with each
+Group naming its members by their position in that list; a subtree shared by
+several parents is written once. Nodes are written as:
+
+    'a'                                   a Literal
+    ['A', 'Decimal']                      an Abstract, by class name
+    ['S', 'ab', 3, 'c']                   a Sequence of literal text and Abstracts
+    ['R', 1, 97, 99, 120, 120]            a Range: invert, then its intervals
+    ['G', [0, 1], 0, 1, 1, 1, 0, None, 0] a Group: members, OR, min, max,
+                                          greedy, possessive, capture, atomic
+
+The last node is the root. The format is versioned, and loads() refuses
+data written in any other version.
+"""
+
+import json
+from array import array
+from hashlib import sha256
+
+from model._klean import Abstract, Group, Klean, Literal, Quantification, Range, Sequence
+
+VERSION = 1
+
+def _abstracts(cls=Abstract):
+    # every Abstract class by name, found among the subclasses of Abstract
+    found = {}
+    for sub in cls.__subclasses__():
+        found[sub.__name__] = sub
+        found.update(_abstracts(sub))
+    return found
+
+def _nodes(klean):
+    # Every distinct Group, Range, Abstract and Literal below and including
+    # klean, children first; the members of Sequences are written inline
+    seen = set()
+    stack = [(klean, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.append((node, True))
+        if isinstance(node, Group):
+            stack.extend((member, False) for member in reversed(node.groups)
+                         if id(member) not in seen)
+        elif isinstance(node, Sequence):
+            stack.extend((member, False) for member in reversed(node.characters)
+                         if isinstance(member, Abstract) and id(member) not in seen)
+
+def _sequence(klean, index):
+    # a Sequence's runs of literal text and the indexes of its Abstracts
+    items = ['S']
+    for member in klean:
+        if isinstance(member, Literal):
+            if isinstance(items[-1], str) and len(items) > 1:
+                items[-1] += member.char
+            else:
+                items.append(member.char)
+        else:
+            items.append(index[id(member)])
+    return items
+
+def dumps(klean):
+    """Return klean as a compact JSON string"""
+    if not isinstance(klean, Klean):
+        raise ValueError(f'dumps must be supplied with a Klean object, recieved {type(klean)} instead')
+    index = {}
+    nodes = []
+    for node in _nodes(klean):
+        if isinstance(node, Literal):
+            item = node.char
+        elif isinstance(node, Abstract):
+            item = ['A', type(node).__name__]
+        elif isinstance(node, Sequence):
+            item = _sequence(node, index)
+        elif isinstance(node, Range):
+            item = ['R', int(node.invert), *node.intervals]
+        elif isinstance(node, Group):
+            repetition = node.repetition
+            item = ['G', [index[id(member)] for member in node], int(node.OR), repetition.min,
+                    repetition.max, int(repetition.greedy), int(repetition.possessive),
+                    node.capture, int(node.atomic)]
+        else:
+            raise ValueError(f'{type(node)} can not be serialized')
+        index[id(node)] = len(nodes)
+        nodes.append(item)
+    return json.dumps([VERSION, nodes], ensure_ascii=False, separators=(',', ':'))
+
+def loads(data):
+    """Return the Klean tree data, as written by dumps(), stands for"""
+    version, items = json.loads(data)
+    if version != VERSION:
+        raise ValueError(f'can only load version {VERSION}, recieved version {version!r}')
+    abstracts = _abstracts()
+    nodes = []
+    for item in items:
+        if isinstance(item, str):
+            node = Literal(item)
+        elif item[0] == 'A':
+            if item[1] not in abstracts:
+                raise ValueError(f'{item[1]!r} is not an Abstract')
+            node = abstracts[item[1]]()
+        elif item[0] == 'S':
+            node = Sequence(*(part if isinstance(part, str) else nodes[part] for part in item[1:]))
+        elif item[0] == 'R':
+            node = Range._from_intervals(array('L', item[2:]), invert=bool(item[1]))
+        elif item[0] == 'G':
+            members, OR, low, high, greedy, possessive, capture, atomic = item[1:]
+            node = Group(*(nodes[member] for member in members), OR=OR, capture=capture,
+                         atomic=atomic, repetition=Quantification(min=low, max=high, greedy=greedy,
+                                                                  possessive=possessive))
+        else:
+            raise ValueError(f'{item[0]!r} is not a node type')
+        nodes.append(node)
+    if not nodes:
+        raise ValueError('No nodes provided')
+    return nodes[-1]
+
+def digest(klean):
+    """A hex digest of klean's structure, the same in every process
+
+    Python's own hashes of strings differ between processes, so this is the
+    key to use for anything kept between them.
+    """
+    return sha256(dumps(klean).encode('utf-8')).hexdigest()
@@ -0,0 +1,30 @@
+from model._klean import Group, Literal, Quantification, Sequence
+
+def random_klean(rng, depth, leaves, text='ab', literals='ab1', committed=None):
+    """A random tree nesting groups up to depth deep, for checking against re
+
+    Besides Sequences of text and Literals of literals, the tree is built from
+    the nodes in leaves. With committed=None its groups are plain, with False
+    some capture, and with True some are atomic or possessive instead; trees
+    never have both, as re in python 3.11 can fail on captures inside
+    possessive repetitions.
+    """
+    choice = rng.randrange(6 if depth else 3)
+    if choice == 0:
+        return Sequence(''.join(rng.choice(text) for i in range(rng.randint(1, 2))))
+    if choice == 1:
+        return rng.choice(leaves)
+    if choice == 2:
+        return Literal(rng.choice(literals))
+    members = [random_klean(rng, depth - 1, leaves, text, literals, committed)
+               for i in range(rng.randint(1, 3))]
+    low = rng.randint(0, 2)
+    repetition = rng.choice([Quantification(min=1, max=1), Quantification(
+        min=low, max=rng.choice([0, low, low + 1, low + 2]), greedy=rng.random() < 0.7)])
+    if committed is None:
+        return Group(*members, OR=choice == 3, repetition=repetition)
+    if not committed:
+        return Group(*members, OR=choice == 3, repetition=repetition, capture=rng.random() < 0.3)
+    if repetition.greedy and rng.random() < 0.2:
+        repetition = Quantification(repetition.min, repetition.max, possessive=True)
+    return Group(*members, OR=choice == 3, repetition=repetition, atomic=rng.random() < 0.2)
@@ -0,0 +1,152 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.analysis import HIGH, LOW, MEDIUM, _anchored, backtracking_risks, length_bounds,\
+    required_literals
+from model.representations import Any, Decimal, LineStart, NotWhitespace, StringEnd, StringStart,\
+    Whitespace, Word
+from model.tests._trees import random_klean
+from resolvers.python import format
+
+@pytest.mark.parametrize("input,expected", [
+    (Literal('a'), ('a', 'a', ('a',))),
+    (Sequence('abc'), ('abc', 'abc', ('abc',))),
+    (Decimal(), ('', '', ())),
+    (Range('x'), ('x', 'x', ('x',))),
+    (Range('x', 'y'), ('', '', ())),
+    (Sequence(StringStart(), 'a', 'b', LineStart()), ('ab', 'ab', ('ab',))),
+    (Sequence('ab', Decimal(), 'cd', Word(), 'e'), ('ab', 'e', ('ab', 'cd', 'e'))),
+    (Group(Sequence('foobar'), Sequence('fooqbar'), OR=True), ('foo', 'bar', ('bar', 'foo'))),
+    (Group(Sequence('abc'), Sequence('abc'), OR=True), ('abc', 'abc', ('abc',))),
+    (Group(Sequence('xaby'), Sequence('zab'), Decimal(), OR=True), ('', '', ())),
+    (Group(Sequence('ab'), repetition=Quantification(min=0, max=0)), ('', '', ())),
+    (Group(Sequence('ab'), repetition=Quantification(min=2, max=2)), ('ab', 'ab', ('ab',))),
+    (Group(Sequence('ab'), Group(Whitespace(), repetition=Quantification(min=1)),
+           Sequence('cd')), ('ab', 'cd', ('ab', 'cd'))),
+    (Group(Group(Sequence('key'), Decimal(), Literal('x')), Group(Decimal(), Sequence('key')), OR=True),
+     ('', '', ('key',))),
+    ])
+def test_required_literals(input, expected):
+    assert required_literals(input) == expected
+
+def test_required_literals_shared():
+    # a subtree shared many times over is only analysed once
+    exp = Group(Sequence('ab'), Decimal())
+    for i in range(200):
+        exp = Group(exp, exp)
+    assert required_literals(exp).prefix == 'ab'
+
+def test_required_literals_deep():
+    exp = Sequence('needle')
+    for i in range(20000):
+        exp = Group(exp, Decimal(), repetition=Quantification(min=1))
+    assert required_literals(exp) == ('needle', '', ('needle',))
+
+def test_required_literals_illegal():
+    with pytest.raises(ValueError):
+        required_literals('abc')
+
+LEAVES = [Decimal(), StringStart(), StringEnd(), Range('a', 'c')]
+
+def test_required_literals_sound():
+    rng = random.Random(8)
+    for i in range(300):
+        exp = random_klean(rng, 3, LEAVES, literals='abc')
+        literals = required_literals(exp)
+        pattern = re.compile(format(exp))
+        for j in range(20):
+            string = ''.join(rng.choice('abc1') for k in range(rng.randint(0, 12)))
+            match = pattern.search(string)
+            if match is None:
+                continue
+            assert match.group().startswith(literals.prefix)
+            assert match.group().endswith(literals.suffix)
+            for factor in literals.factors:
+                assert factor in match.group()
+
+@pytest.mark.parametrize("input,expected", [
+    (Literal('a'), (1, 1)),
+    (Sequence(StringStart(), 'abc', LineStart()), (3, 3)),
+    (Group(Sequence('ab'), Decimal(), OR=True), (1, 2)),
+    (Group(Sequence('ab'), Decimal(), repetition=Quantification(min=2, max=4)), (6, 12)),
+    (Group(Decimal(), repetition=Quantification(min=1)), (1, None)),
+    (Group(Sequence('ab'), Group(Decimal(), repetition=Quantification()), OR=True), (0, None)),
+    (Group(StringStart(), repetition=Quantification(min=1)), (0, 0)),
+    (Group(Group(Decimal(), repetition=Quantification(min=3)),
+           repetition=Quantification(min=0, max=2)), (0, None)),
+    ])
+def test_length_bounds(input, expected):
+    assert length_bounds(input) == expected
+
+def test_length_bounds_sound():
+    rng = random.Random(11)
+    for i in range(300):
+        exp = random_klean(rng, 3, LEAVES, literals='abc')
+        low, high = length_bounds(exp)
+        pattern = re.compile(format(exp))
+        for j in range(20):
+            string = ''.join(rng.choice('abc1') for k in range(rng.randint(0, 12)))
+            for match in pattern.finditer(string):
+                assert low <= len(match.group())
+                assert high is None or len(match.group()) <= high
+
+@pytest.mark.parametrize("input,expected", [
+    (Sequence(StringStart(), 'abc', StringEnd()), True),
+    (Group(StringStart(), Group(Decimal(), repetition=Quantification(min=1)),
+           Group(Sequence('x'), StringEnd())), True),
+    (Group(Group(StringStart(), Literal('a'), repetition=Quantification(min=0, max=1)),
+           StringEnd()), False),
+    (Group(Sequence(StringStart(), 'a'), Sequence(StringStart(), 'b', StringEnd()), OR=True), False),
+    (Sequence(StringStart(), 'abc'), False),
+    ])
+def test_anchored(input, expected):
+    assert _anchored(input) == expected
+
+def _repeated(*members, min=0, max=0, OR=False):
+    return Group(*members, OR=OR, repetition=Quantification(min=min, max=max))
+
+@pytest.mark.parametrize("input,expected", [
+    # nested quantifiers
+    (_repeated(_repeated(Whitespace(), min=1)), [HIGH]),
+    (_repeated(_repeated(Word(), min=1), _repeated(Whitespace(), max=1), min=1), [HIGH]),
+    (_repeated(_repeated(Literal('a'), min=1, max=5), min=1), [MEDIUM]),
+    (_repeated(Sequence('x'), _repeated(Decimal(), min=1), min=1), []),
+    (_repeated(_repeated(Decimal(), min=1), Literal('.'), min=1), []),
+    (_repeated(_repeated(Whitespace(), min=1), _repeated(Word(), min=1)), []),
+    (_repeated(_repeated(Range('a', 'f'), min=1), _repeated(Range('0', '9'), min=1)), []),
+    (_repeated(_repeated(Range('a', 'f'), min=1), _repeated(Range('c', 'z')), min=1), [HIGH]),
+    # alternation under repetition
+    (_repeated(Word(), Decimal(), OR=True, min=1), [HIGH]),
+    (_repeated(Sequence('a'), Sequence('aa'), OR=True, max=4), [MEDIUM]),
+    (_repeated(Sequence('blue'), Sequence('brown'), Whitespace(), OR=True, min=1), []),
+    (_repeated(Sequence('blue'), Group(Word(), Decimal()), OR=True, min=1), [HIGH]),
+    (Group(Word(), Decimal(), OR=True), []),
+    # neighbouring quantifiers
+    (Group(_repeated(Word(), min=1), _repeated(Decimal(), min=1)), [LOW]),
+    (Group(_repeated(NotWhitespace()), Literal('='), _repeated(Any())), []),
+    (Group(_repeated(Whitespace()), _repeated(Word())), []),
+    # atomic groups and possessive repetitions
+    (_repeated(Group(_repeated(Whitespace(), min=1), atomic=True)), []),
+    (Group(_repeated(_repeated(Word(), min=1), Literal(' '), min=1), atomic=True), []),
+    (Group(Group(_repeated(_repeated(Word(), min=1), min=1), StringEnd(), atomic=True)), [HIGH]),
+    (Group(Word(), Decimal(), OR=True, repetition=Quantification(possessive=True)), []),
+    (Group(Group(Word(), repetition=Quantification(min=1, possessive=True)), _repeated(Decimal())), []),
+    ])
+def test_backtracking_risks(input, expected):
+    assert [finding.severity for finding in backtracking_risks(input)] == expected
+
+def test_backtracking_risks_node():
+    inner = _repeated(Whitespace(), min=1)
+    outer = Group(Sequence('key'), _repeated(inner, Decimal(), OR=True))
+    findings = backtracking_risks(outer)
+    assert findings == [
+        (HIGH, _repeated(inner, Decimal(), OR=True), 'nested quantifiers can divide the same text in many ways')]
+
+def test_backtracking_risks_deep():
+    exp = Literal('a')
+    for i in range(20000):
+        exp = Group(exp, Sequence('b'), repetition=Quantification(min=0, max=1))
+    assert backtracking_risks(exp) == []
@@ -21,6 +21,10 @@ def test_quantification():
     assert quantity == Quantification(0, 4, True)
     quantity = Quantification(min=0, max=1, greedy=False)
     assert quantity == Quantification(0, 1, False)
+    quantity = Quantification(min=1, possessive=True)
+    assert quantity == Quantification(1, 0, True, True)
+    assert quantity != Quantification(1, 0)
+    assert str(quantity) == '<1,POSSESSIVE>'
 
 def test_quantification_illegal():
     with pytest.raises(ValueError):
@@ -43,6 +47,8 @@ def test_quantification_illegal():
         Quantification({})
     with pytest.raises(ValueError):
         Quantification(())
+    with pytest.raises(ValueError):
+        Quantification(greedy=False, possessive=True)
 
 def test_literal():
     literal = Literal('a')
@@ -111,15 +117,22 @@ def test_literal_and():
 
     forward = Literal('R') & Group(*(Literal('E'),))
     backward = Group(*(Literal('R'),)) & Literal('E')
-    assert forward != backward
-    assert forward == Group(Literal('R'), Group(*(Literal('E'),)))
-    assert backward == Group(Group(*(Literal('R'),)), Literal('E'))
+    assert forward == backward
+    assert forward == Group(Literal('R'), Literal('E'))
 
     forward = Literal('R') & Group(*(Literal('E'), Literal('D')))
     backward = Group(*(Literal('R'), Literal('E'))) & Literal('D')
+    assert forward == backward
+    assert forward == Group(Literal('R'), Literal('E'), Literal('D'))
+
+    forward = Literal('R') & Group(Literal('E'), repetition=Quantification())
+    backward = Group(Literal('R'), repetition=Quantification()) & Literal('E')
     assert forward != backward
-    assert forward == Group(Literal('R'), Group(*(Literal('E'), Literal('D'))))
-    assert backward == Group(Group(*(Literal('R'), Literal('E'))), Literal('D'))
+    assert forward == Group(Literal('R'), Group(Literal('E'), repetition=Quantification()))
+    assert backward == Group(Group(Literal('R'), repetition=Quantification()), Literal('E'))
+
+    forward = Literal('R') & Group(*(Literal('E'), Literal('D')), OR=True)
+    assert forward == Group(Literal('R'), Group(*(Literal('E'), Literal('D')), OR=True))
 
 def test_literal_and_illegal():
     with pytest.raises(TypeError):
@@ -176,18 +189,21 @@ def test_literal_or():
 
     forward = Literal('R') | Group(*(Literal('E'),))
     backward = Group(*(Literal('R'),)) | Literal('E')
-    assert forward != backward
-    assert forward == Group(Literal('R'), Group(*(Literal('E'),)), OR=True)
-    assert backward == Group(Group(*(Literal('R'),)), Literal('E'), OR=True)
+    assert forward == backward
+    assert forward == Group(Literal('R'), Literal('E'), OR=True)
+    assert backward == Group(Literal('R'), Literal('E'), OR=True)
 
     forward = Literal('R') | Group(*(Literal('E'), Literal('D')))
     backward = Group(*(Literal('R'), Literal('E'))) | Literal('D')
     assert forward != backward
     assert forward == Group(Literal('R'), Group(*(Literal('E'), Literal('D'))), OR=True)
-
-
     assert backward == Group(Group(*(Literal('R'), Literal('E'))), Literal('D'), OR=True)
 
+    forward = Literal('R') | Group(*(Literal('E'), Sequence('D', 'C')), OR=True)
+    backward = Group(*(Literal('R'), Sequence('E', 'D')), OR=True) | Literal('C')
+    assert forward == Group(Literal('R'), Literal('E'), Sequence('D', 'C'), OR=True)
+    assert backward == Group(Literal('R'), Sequence('E', 'D'), Literal('C'), OR=True)
+
 def test_literal_or_illegal():
     with pytest.raises(TypeError):
         forward = Literal('R') | None
@@ -208,6 +224,12 @@ class DummyPosition(Abstract):
         self.metachar = '\\p'
         self.short_desc = 'TEST'
 
+def test_abstract_subclass_frozen():
+    position = DummyPosition()
+    assert position.short_desc == 'TEST'
+    with pytest.raises(AttributeError):
+        position.metachar = '\\q'
+
 def test_abstract_illegal():
     with pytest.raises(NotImplementedError):
         Abstract()
@@ -260,15 +282,13 @@ def test_abstract_and():
 
     forward = DummyPosition() & Group(*(DummyPosition(),))
     backward = Group(*(DummyPosition(),)) & DummyPosition()
-    assert forward != backward
-    assert forward == Group(DummyPosition(), Group(*(DummyPosition(),)))
-    assert backward == Group(Group(*(DummyPosition(),)), DummyPosition())
+    assert forward == backward
+    assert forward == Group(DummyPosition(), DummyPosition())
 
     forward = DummyPosition() & Group(*(DummyPosition(), DummyPosition()))
     backward = Group(*(DummyPosition(), DummyPosition())) & DummyPosition()
-    assert forward != backward
-    assert forward == Group(DummyPosition(), Group(*(DummyPosition(), DummyPosition())))
-    assert backward == Group(Group(*(DummyPosition(), DummyPosition())), DummyPosition())
+    assert forward == backward
+    assert forward == Group(DummyPosition(), DummyPosition(), DummyPosition())
 
 def test_abstract_and_illegal():
     with pytest.raises(TypeError):
@@ -332,9 +352,8 @@ def test_abstract_or():
 
     forward = DummyPosition() | Group(*(DummyPosition(),))
     backward = Group(*(DummyPosition(),)) | DummyPosition()
-    assert forward != backward
-    assert forward == Group(DummyPosition(), Group(*(DummyPosition(),)), OR=True)
-    assert backward == Group(Group(*(DummyPosition(),)), DummyPosition(), OR=True)
+    assert forward == backward
+    assert forward == Group(DummyPosition(), DummyPosition(), OR=True)
 
     forward = DummyPosition() | Group(*(DummyPosition(), DummyPosition()))
     backward = Group(*(DummyPosition(), DummyPosition())) | DummyPosition()
@@ -456,26 +475,25 @@ def test_sequence_and():
     forward = Sequence('A') & Group(Literal('B'))
     backward = Group(Literal('A')) & Sequence('B')
     assert forward != backward
-    assert forward == Group(Sequence('A'), Group(Literal('B')))
-    assert backward == Group(Group(Literal('A')), Sequence('B'))
+    assert forward == Group(Sequence('A'), Literal('B'))
+    assert backward == Group(Literal('A'), Sequence('B'))
 
     forward = Sequence('A') & Group(Sequence('B', 'C', 'D'))
     backward = Group(Literal('A')) & Sequence('B', 'C', 'D')
     assert forward != backward
-    assert forward == Group(Sequence('A'), Group(Sequence('B', 'C', 'D')))
-    assert backward == Group(Group(Literal('A')), Sequence('B', 'C', 'D'))
+    assert forward == Group(Sequence('A'), Sequence('B', 'C', 'D'))
+    assert backward == Group(Literal('A'), Sequence('B', 'C', 'D'))
 
     forward = Sequence('A', 'B', 'C') & Group(Literal('D'))
     backward = Group(Sequence('A', 'B', 'C')) & Sequence('D')
     assert forward != backward
-    assert forward == Group(Sequence('A', 'B', 'C'), Group(Literal('D')))
-    assert backward == Group(Group(Sequence('A', 'B', 'C')), Sequence('D'))
+    assert forward == Group(Sequence('A', 'B', 'C'), Literal('D'))
+    assert backward == Group(Sequence('A', 'B', 'C'), Sequence('D'))
 
     forward = Sequence('A', 'B', 'C') & Group(Sequence('D', 'E', 'F'))
     backward = Group(Sequence('A', 'B', 'C')) & Sequence('D', 'E', 'F')
-    assert forward != backward
-    assert forward == Group(Sequence('A', 'B', 'C'), Group(Sequence('D', 'E', 'F')))
-    assert backward == Group(Group(Sequence('A', 'B', 'C')), Sequence('D', 'E', 'F'))
+    assert forward == backward
+    assert forward == Group(Sequence('A', 'B', 'C'), Sequence('D', 'E', 'F'))
 
 def test_sequence_and_illegal():
     with pytest.raises(TypeError):
@@ -564,26 +582,28 @@ def test_sequence_or():
     forward = Sequence('A') | Group(Literal('B'))
     backward = Group(Literal('A')) | Sequence('B')
     assert forward != backward
-    assert forward == Group(Sequence('A'), Group(Literal('B')), OR=True)
-    assert backward == Group(Group(Literal('A')), Sequence('B'), OR=True)
+    assert forward == Group(Sequence('A'), Literal('B'), OR=True)
+    assert backward == Group(Literal('A'), Sequence('B'), OR=True)
 
     forward = Sequence('A') | Group(Sequence('B', 'C', 'D'))
     backward = Group(Literal('A')) | Sequence('B', 'C', 'D')
     assert forward != backward
-    assert forward == Group(Sequence('A'), Group(Sequence('B', 'C', 'D')), OR=True)
-    assert backward == Group(Group(Literal('A')), Sequence('B', 'C', 'D'), OR=True)
+    assert forward == Group(Sequence('A'), Sequence('B', 'C', 'D'), OR=True)
+    assert backward == Group(Literal('A'), Sequence('B', 'C', 'D'), OR=True)
 
     forward = Sequence('A', 'B', 'C') | Group(Literal('D'))
     backward = Group(Sequence('A', 'B', 'C')) | Sequence('D')
     assert forward != backward
-    assert forward == Group(Sequence('A', 'B', 'C'), Group(Literal('D')), OR=True)
-    assert backward == Group(Group(Sequence('A', 'B', 'C')), Sequence('D'), OR=True)
+    assert forward == Group(Sequence('A', 'B', 'C'), Literal('D'), OR=True)
+    assert backward == Group(Sequence('A', 'B', 'C'), Sequence('D'), OR=True)
 
     forward = Sequence('A', 'B', 'C') | Group(Sequence('D', 'E', 'F'))
     backward = Group(Sequence('A', 'B', 'C')) | Sequence('D', 'E', 'F')
-    assert forward != backward
-    assert forward == Group(Sequence('A', 'B', 'C'), Group(Sequence('D', 'E', 'F')), OR=True)
-    assert backward == Group(Group(Sequence('A', 'B', 'C')), Sequence('D', 'E', 'F'), OR=True)
+    assert forward == backward
+    assert forward == Group(Sequence('A', 'B', 'C'), Sequence('D', 'E', 'F'), OR=True)
+
+    forward = Sequence('A') | Group(Sequence('B'), Sequence('CD'))
+    assert forward == Group(Sequence('A'), Group(Sequence('B'), Sequence('CD')), OR=True)
 
 def test_sequence_or_illegal():
     with pytest.raises(TypeError):
@@ -765,3 +785,96 @@ def test_range_or_illegal():
     with pytest.raises(TypeError):
         forward = ('A', 'B', 'C') | Range(('A', 'C'))
 
+def test_range_intervals():
+    range = Range('c', ('a', 'b'), 'e', ('x', 'z'), 'y')
+    assert list(range.spans()) == [(ord('a'), ord('c')), (ord('e'), ord('e')), (ord('x'), ord('z'))]
+    assert range == Range(('a', 'c'), 'e', ('x', 'z'))
+    assert [literal.char for literal in range] == ['a', 'b', 'c', 'e', 'x', 'y', 'z']
+    assert 'b' in range
+    assert Literal('z') in range
+    assert 'd' not in range
+    assert 'w' not in range
+    assert 'ab' not in range
+
+def test_range_full_unicode():
+    range = Range(('\x00', '\U0010FFFF'))
+    assert len(range.intervals) == 2
+    assert '\U0001F600' in range
+    assert range == Range(('\x00', 'z'), ('a', '\U0010FFFF'))
+    inverted = Range('a', invert=True)
+    assert 'a' not in inverted
+    assert 'b' in inverted
+    assert '\U0010FFFF' in inverted
+    assert len(inverted.intervals) == 2
+
+def test_range_union_inverted():
+    union = Range('a', 'b', invert=True) | Range('b')
+    assert union == Range('a', invert=True)
+    union = Range('a', invert=True) | 'a'
+    assert union == Range(invert=True)
+    assert 'a' in union
+    union = Range(('a', 'c')) | Range(('b', 'f'))
+    assert union == Range(('a', 'f'))
+
+def test_group_capture():
+    assert Group(Literal('a')).capture is None
+    assert Group(Literal('a'), capture=False) is Group(Literal('a'))
+    assert Group(Literal('a'), capture=True) is not Group(Literal('a'))
+    assert Group(Literal('a'), capture='x') != Group(Literal('a'), capture='y')
+    assert str(Group(Literal('a'), capture='x')) == '(<CAPTURE x>a)<1,1GREATEST>'
+    # capturing groups are operands, not spliced into
+    captured = Group(Literal('a'), Literal('b'), capture=True)
+    assert (captured & 'c').groups == (captured, Literal('c'))
+    assert ('c' | captured).groups == (Literal('c'), captured)
+    for illegal in ('1x', 'a b', 1, b'x'):
+        with pytest.raises(ValueError):
+            Group(Literal('a'), capture=illegal)
+
+def test_group_atomic():
+    atomic = Group(Literal('a'), Literal('b'), atomic=True)
+    assert atomic is not Group(Literal('a'), Literal('b'))
+    assert str(atomic) == '(<ATOMIC>ab)<1,1GREATEST>'
+    assert (atomic & 'c').groups == (atomic, Literal('c'))
+    assert (Literal('c') | atomic).groups == (Literal('c'), atomic)
+    # a possessive {1}+ group gives nothing back either
+    once = Group(Group(Literal('a'), repetition=Quantification()),
+                 repetition=Quantification(1, 1, possessive=True))
+    assert (once & 'a').groups == (once, Literal('a'))
+
+def test_interning():
+    assert Literal('a') is Literal('a')
+    assert DummyPosition() is DummyPosition()
+    assert Sequence('blue') is Sequence('b', 'l', 'ue')
+    assert Range(('a', 'c')) is Range('a', 'b', 'c')
+    assert Quantification(1, 0) is Quantification(min=1)
+    assert Group(Sequence('blue'), Range('a'), OR=True) is Group(Sequence('blue'), Range('a'), OR=True)
+    assert Group(Sequence('blue'), Range('a'), OR=True) is not Group(Sequence('blue'), Range('a'))
+    assert Literal('a') & 'b' is Sequence('ab')
+    assert len({Sequence('ab'), Literal('a') & 'b', Range('a'), Range('a'), Group(Literal('a'))}) == 3
+
+def test_immutable():
+    literal = Literal('a')
+    with pytest.raises(AttributeError):
+        literal.char = 'b'
+    with pytest.raises(AttributeError):
+        literal.extra = 'b'
+    with pytest.raises(AttributeError):
+        del literal.char
+    range = Range('a')
+    with pytest.raises(AttributeError):
+        range.invert = True
+    assert ~range == Range('a', invert=True)
+    assert range.invert is False
+    group = Group(Literal('a'))
+    with pytest.raises(AttributeError):
+        group.OR = True
+    with pytest.raises(AttributeError):
+        Quantification().min = 3
+
+def test_pickle():
+    import copy
+    import pickle
+    tree = Group(Sequence('blue'), Range(('a', 'z'), invert=True), DummyPosition(), OR=True,
+                 repetition=Quantification(min=2, greedy=False), capture='name', atomic=True)
+    assert pickle.loads(pickle.dumps(tree)) is tree
+    assert copy.deepcopy(tree) is tree
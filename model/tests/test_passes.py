@@ -0,0 +1,116 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Quantification, Range, Sequence
+from model.passes import drop_groups, fold_quantifiers, merge_alternatives, merge_literals,\
+    optimize
+from model.representations import Any, Decimal, StringEnd, StringStart, Word
+from model.tests._trees import random_klean
+from resolvers.python import format
+
+def _repeat(klean, low=0, high=0, greedy=True):
+    return Group(klean, repetition=Quantification(min=low, max=high, greedy=greedy))
+
+def test_or():
+    exp = Group(Literal('+'), Literal('-'), OR=True, repetition=Quantification(min=0, max=1))
+    exp |= Decimal() | Group(Decimal(), Literal('.'), Decimal())
+    assert format(optimize(exp)) == r'(?:(?:[\+\-])?|\d|\d\.\d)'
+
+@pytest.mark.parametrize("klean,expected", [
+    (Group(Literal('a')), Literal('a')),
+    (Group(Group(Sequence('ab'), Word()), Decimal()), Group(Sequence('ab'), Word(), Decimal())),
+    (Group(Group(Literal('a'), Literal('b'), OR=True), Literal('c'), OR=True),
+     Group(Literal('a'), Literal('b'), Literal('c'), OR=True)),
+    (Group(Group(Literal('a'), Literal('b'), OR=True), Literal('c')),
+     Group(Group(Literal('a'), Literal('b'), OR=True), Literal('c'))),
+    (_repeat(Group(Literal('a'), Literal('b'))),
+     Group(Literal('a'), Literal('b'), repetition=Quantification())),
+    (Group(Group(Literal('a'), Literal('b'), OR=True), repetition=Quantification(min=2)),
+     Group(Literal('a'), Literal('b'), OR=True, repetition=Quantification(min=2))),
+    # an empty alternative is kept
+    (Group(Group(), Literal('a'), OR=True), Group(Group(), Literal('a'), OR=True)),
+    (Group(Group(), Literal('a')), Literal('a')),
+    ])
+def test_drop_groups(klean, expected):
+    assert optimize(klean, [drop_groups]) == expected
+
+def test_merge_literals():
+    exp = Group(Literal('a'), Sequence('bc'), Decimal(), _repeat(Literal('d')), Literal('e'),
+                Literal('f'))
+    assert optimize(exp, [merge_literals]) == \
+        Group(Sequence('abc', Decimal()), _repeat(Literal('d')), Sequence('ef'))
+    assert optimize(Group(Literal('a'), Literal('b')), [merge_literals]) == Sequence('ab')
+
+def test_merge_alternatives():
+    exp = Group(Literal('a'), Range(('b', 'd')), Sequence('xy'), Literal('e'), Literal('a'),
+                Range('q', invert=True), OR=True)
+    assert optimize(exp, [merge_alternatives]) == \
+        Group(Range(('a', 'd')), Sequence('xy'), Range('q', invert=True), OR=True)
+    exp = Group(Literal('a'), Literal('b'), OR=True, repetition=Quantification(min=1))
+    assert optimize(exp, [merge_alternatives]) == _repeat(Range('a', 'b'), 1)
+
+@pytest.mark.parametrize("inner,outer,expected", [
+    ((0, 0), (0, 0), (0, 0)),
+    ((1, 0), (0, 0), (0, 0)),
+    ((0, 1), (1, 0), (0, 0)),
+    ((1, 2), (2, 3), (2, 6)),
+    ((2, 3), (3, 3), (6, 9)),
+    ((2, 0), (1, 0), (2, 0)),
+    ((2, 2), (0, 3), None),
+    ((2, 0), (0, 0), None),
+    ((3, 4), (1, 5), None),
+    ])
+def test_fold_quantifiers(inner, outer, expected):
+    exp = _repeat(_repeat(Literal('x'), *inner), *outer)
+    result = optimize(exp, [fold_quantifiers])
+    if expected is None:
+        assert result == exp
+    else:
+        assert result == _repeat(Literal('x'), *expected)
+
+def test_fold_quantifiers_mixed_greed():
+    exp = _repeat(_repeat(Literal('x'), greedy=False))
+    assert optimize(exp, [fold_quantifiers]) == exp
+    exp = _repeat(_repeat(Any(), greedy=False), greedy=False)
+    assert optimize(exp, [fold_quantifiers]) == _repeat(Any(), greedy=False)
+
+def test_captures_kept():
+    exp = Group(Group(Group(Literal('a'), capture=True)), Group(Literal('b'), Literal('c'), OR=True,
+                                                                capture='tail'))
+    assert optimize(exp) == Group(Group(Literal('a'), capture=True),
+                                  Group(Range('b', 'c'), capture='tail'))
+    exp = _repeat(Group(_repeat(Literal('x')), capture=True))
+    assert optimize(exp) == exp
+    exp = Group(_repeat(Literal('x')), capture=True, repetition=Quantification())
+    assert optimize(exp) == exp
+
+def test_atomic_and_possessive_kept():
+    exp = Group(Group(Literal('a'), Literal('b'), OR=True, atomic=True), Literal('c'))
+    assert optimize(exp) == Group(Group(Range('a', 'b'), atomic=True), Literal('c'))
+    exp = _repeat(Group(Literal('x'), repetition=Quantification(possessive=True)))
+    assert optimize(exp) == exp
+
+def test_shared_and_deep():
+    shared = Group(Group(Literal('a')), Group(Literal('b')))
+    assert optimize(Group(shared, shared, OR=True)) == Group(Sequence('ab'), Sequence('ab'), OR=True)
+    exp = Literal('a')
+    for i in range(5000):
+        exp = Group(exp, Literal('b'))
+    assert optimize(exp) == Sequence('a' + 'b' * 5000)
+
+LEAVES = [Decimal(), StringStart(), StringEnd(), Range('a', ('0', '5')), Range('b', invert=True),
+          Any(), Group()]
+
+@pytest.mark.parametrize("committed", [False, True])
+def test_matches_the_same(committed):
+    rng = random.Random(11)
+    for i in range(500):
+        exp = random_klean(rng, 3, LEAVES, committed=committed)
+        pattern = re.compile(format(exp))
+        optimized = re.compile(format(optimize(exp)))
+        for j in range(5):
+            string = ''.join(rng.choice('ab1\n') for k in range(rng.randint(0, 10)))
+            assert [(m.span(), m.groups()) for m in optimized.finditer(string)] == \
+                [(m.span(), m.groups()) for m in pattern.finditer(string)]
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from model._klean import Group, Literal, Quantification, Range, Sequence
+from model.representations import Any, AnyAtAll, Decimal, Hex, StringEnd, StringStart, Word
+from model.serialize import VERSION, digest, dumps, loads
+
+ROOT = Path(__file__).resolve().parents[2]
+
+@pytest.mark.parametrize("klean", [
+    Literal('a'),
+    Literal('é'),
+    Decimal(),
+    AnyAtAll(),
+    Sequence('ab', Word(), 'c', StringEnd()),
+    Range(('a', 'f'), '\U0001F600'),
+    Range('\n', invert=True),
+    Range(),
+    Hex(),
+    Group(),
+    Group(Literal('a'), Sequence('bc'), OR=True, capture='name', atomic=True,
+          repetition=Quantification(min=2, max=5, possessive=True)),
+    Group(Group(Any(), repetition=Quantification(greedy=False)), capture=True),
+    ])
+def test_round_trip(klean):
+    assert loads(dumps(klean)) == klean
+
+def test_shared_written_once():
+    shared = Group(Sequence('abc'), Decimal(), OR=True)
+    tree = Group(shared, Group(shared, Literal('x'), shared), shared)
+    version, nodes = json.loads(dumps(tree))
+    assert version == VERSION
+    assert nodes == [['S', 'abc'], ['A', 'Decimal'], ['G', [0, 1], 1, 1, 1, 1, 0, None, 0], 'x',
+                     ['G', [2, 3, 2], 0, 1, 1, 1, 0, None, 0],
+                     ['G', [2, 4, 2], 0, 1, 1, 1, 0, None, 0]]
+    assert loads(dumps(tree)) is tree
+
+def test_deep():
+    tree = StringStart()
+    for i in range(20000):
+        tree = Group(tree, Literal('x'), repetition=Quantification(max=1))
+    assert loads(dumps(tree)) is tree
+
+def test_digest_stable():
+    tree = Group(Sequence('key'), Range(('a', 'z')), repetition=Quantification(min=1))
+    code = ('from model.serialize import digest; from model._klean import *; '
+            "print(digest(Group(Sequence('key'), Range(('a', 'z')), "
+            'repetition=Quantification(min=1))))')
+    other = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                           check=True, cwd=ROOT, env={**os.environ, 'PYTHONHASHSEED': '1'})
+    assert other.stdout.strip() == digest(tree)
+    assert digest(tree) != digest(Group(Sequence('key'), Range(('a', 'z'))))
+
+@pytest.mark.parametrize("data", [
+    json.dumps([VERSION + 1, ['a']]),
+    json.dumps([VERSION, []]),
+    json.dumps([VERSION, [['A', 'Missing']]]),
+    json.dumps([VERSION, [['Q', 1]]]),
+    ])
+def test_loads_illegal(data):
+    with pytest.raises(ValueError):
+        loads(data)
+
+def test_dumps_illegal():
+    with pytest.raises(ValueError):
+        dumps('abc')
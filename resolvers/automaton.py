@@ -0,0 +1,470 @@
+"""Match Klean objects with a finite automaton instead of python's re
+
+compile() turns a Klean tree into Thompson NFA programs, which are run as
+DFAs built lazily, one state at a time, as the input needs them. Each character
+of the input is looked at a bounded number of times, so a search takes time
+linear in the length of the string however the pattern is written; patterns
+that make re backtrack exponentially, such as (\\w+\\s?)+\\Z, can not here.
+
+Matches are the ones re would find. A forward scan finds where the leftmost
+match ends, keeping threads in re's order of preference and dropping those
+behind a thread that has matched, and a backward scan from there finds where
+it starts. Abstracts are tested as python's re tests them, without flags. Only
+repetitions of groups that match empty text may, rarely, come out differently:
+re's backtracking over empty iterations is followed closely but not exactly.
+Matches have only their span; capturing Groups are matched as plain ones.
+Atomic groups and possessive repetitions are not supported.
+"""
+
+import re
+from functools import lru_cache
+from itertools import count
+
+from model._klean import Abstract, Group, Klean, Literal, Range, Sequence
+from resolvers.python import _format_abstract
+
+# program instructions, stored as [op, a, b, loop]
+CHAR = 0        # consume a character passing the test a, continue at pc+1
+SPLIT = 1       # continue at a, or failing that at b; see _closure for loop
+JMP = 2         # continue at a
+ASSERT = 3      # continue at pc+1 if the assertion a holds here
+MATCH = 4
+
+# instructions a program may have; repetitions are expanded into copies
+MAX_PROGRAM = 100000
+# DFA states kept before the cache is emptied and rebuilt as needed
+DFA_STATES = 4096
+
+# what is either side of a position, combined as prev * 4 + next
+START, WORD, OTHER, END, FINAL_NEWLINE = 0, 1, 2, 0, 3
+
+AT_START = 0
+AT_END = 1
+AT_LINE_END = 2
+AT_BOUNDARY = 3
+AT_NOT_BOUNDARY = 4
+ASSERTIONS = {
+    r'\A': AT_START,
+    r'\Z': AT_END,
+    '^': AT_START,
+    '$': AT_LINE_END,
+    r'\b': AT_BOUNDARY,
+    r'\B': AT_NOT_BOUNDARY,
+    }
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+def _context(string, i):
+    if i == 0:
+        prev = START
+    else:
+        prev = WORD if _is_word(string[i-1]) else OTHER
+    if i == len(string):
+        next = END
+    elif string[i] == '\n' and i == len(string) - 1:
+        next = FINAL_NEWLINE
+    else:
+        next = WORD if _is_word(string[i]) else OTHER
+    return prev * 4 + next
+
+def _holds(assertion, context):
+    prev, next = divmod(context, 4)
+    if assertion == AT_START:
+        return prev == START
+    if assertion == AT_END:
+        return next == END
+    if assertion == AT_LINE_END:
+        return next == END or next == FINAL_NEWLINE
+    boundary = (prev == WORD) != (next == WORD)
+    if assertion == AT_BOUNDARY:
+        return boundary
+    # re never finds \B in an empty string
+    return not boundary and not (prev == START and next == END)
+
+@lru_cache(maxsize=None)
+def _abstract_test(klean):
+    return re.compile(_format_abstract(klean)).fullmatch
+
+def _atom(klean):
+    # The instruction for a single character node
+    if isinstance(klean, Literal):
+        return [CHAR, klean.char.__eq__, None, None]
+    if isinstance(klean, Range):
+        return [CHAR, klean.__contains__, None, None]
+    if klean.width == 0:
+        if klean.metachar not in ASSERTIONS:
+            raise RuntimeError(f'{type(klean)} is not supported by the automaton')
+        return [ASSERT, ASSERTIONS[klean.metachar], None, None]
+    return [CHAR, _abstract_test(klean), None, None]
+
+def _compile(klean, program, reverse=False):
+    # Append the instructions for klean to program. The tree is walked with an
+    # explicit stack of nodes to emit and of callables that patch jumps once
+    # their target is known; reverse emits the pattern for the reversed text.
+    # The SPLITs deciding whether to repeat a group again carry (loop, greedy)
+    def emit_star(group, loop):
+        greedy = group.repetition.greedy
+        def close():
+            program.append([JMP, split, None, None])
+            program[split][2 if greedy else 1] = len(program)
+        split = len(program)
+        program.append([SPLIT, split+1, None, loop] if greedy else [SPLIT, None, split+1, loop])
+        return [('body', group), close]
+
+    def emit_plus(group, loop):
+        greedy = group.repetition.greedy
+        start = len(program)
+        def close():
+            after = len(program) + 1
+            program.append([SPLIT, start, after, loop] if greedy else [SPLIT, after, start, loop])
+        return [('body', group), close]
+
+    def emit_optional(group, loop, splits):
+        greedy = group.repetition.greedy
+        splits.append(len(program))
+        program.append([SPLIT, len(program)+1, None, loop] if greedy
+                       else [SPLIT, None, len(program)+1, loop])
+        return [('body', group)]
+
+    def close_optional(splits, greedy):
+        for split in splits:
+            program[split][2 if greedy else 1] = len(program)
+
+    def emit_alternatives(members):
+        jumps = []
+        splits = []
+        def open():
+            splits.append(len(program))
+            program.append([SPLIT, len(program)+1, None, None])
+        def close():
+            jumps.append(len(program))
+            program.append([JMP, None, None, None])
+            program[splits[-1]][2] = len(program)
+        def finish():
+            for jump in jumps:
+                program[jump][1] = len(program)
+        tasks = []
+        for member in members[:-1]:
+            tasks.extend((open, ('node', member), close))
+        tasks.extend((('node', members[-1]), finish))
+        return tasks
+
+    loops = count(len(program))
+    stack = [('node', klean)]
+    while stack:
+        if len(program) > MAX_PROGRAM:
+            raise RuntimeError(f'{klean} needs more than {MAX_PROGRAM} instructions')
+        task = stack.pop()
+        if callable(task):
+            task()
+            continue
+        kind, node = task[:2]
+        tasks = []
+        if kind == 'star':
+            tasks = emit_star(node, task[2])
+        elif kind == 'plus':
+            tasks = emit_plus(node, task[2])
+        elif kind == 'optional':
+            tasks = emit_optional(node, task[2], task[3])
+        elif isinstance(node, Sequence):
+            tasks = [('node', char) for char in node]
+            if reverse:
+                tasks.reverse()
+        elif kind == 'body':
+            members = node.groups
+            if node.OR and len(members) > 1:
+                tasks = emit_alternatives(members)
+            else:
+                tasks = [('node', member) for member in members]
+                if reverse:
+                    tasks.reverse()
+        elif isinstance(node, Group):
+            repetition = node.repetition
+            if node.atomic or repetition.possessive:
+                # what they match depends on the order re backtracks in
+                raise RuntimeError(f'{node} is atomic or possessive, which the automaton '
+                                   'does not support')
+            if max(repetition.min, repetition.max) > MAX_PROGRAM:
+                raise RuntimeError(f'{node} needs more than {MAX_PROGRAM} instructions')
+            tasks = [('body', node)] * repetition.min
+            loop = (next(loops), repetition.greedy)
+            if repetition.max == 0:
+                if tasks:
+                    tasks[-1] = ('plus', node, loop)
+                else:
+                    tasks.append(('star', node, loop))
+            elif repetition.max > repetition.min:
+                splits = []
+                tasks.extend([('optional', node, loop, splits)] * (repetition.max - repetition.min))
+                tasks.append(lambda splits=splits, greedy=repetition.greedy: close_optional(splits, greedy))
+        elif isinstance(node, (Literal, Range, Abstract)):
+            program.append(_atom(node))
+        else:
+            raise ValueError(f'compile must be supplied with a Klean object, recieved {type(node)} instead')
+        stack.extend(reversed(tasks))
+    return program
+
+def _closure(program, pcs, context, cut, skip_match=False):
+    # Follow every thread in pcs, in order of preference, through the
+    # instructions that consume no text. Return whether one reached MATCH and
+    # the CHAR instructions the rest are waiting on. With cut, threads less
+    # preferred than a match are dropped, as re would never try them.
+    # Like re, a repetition that has just matched empty text is not repeated
+    # again: threads carry the loops they started an iteration of here
+    waiting = {}
+    matched = False
+    seen = set()
+    stack = [(pc, frozenset()) for pc in reversed(pcs)]
+    while stack:
+        pc, entered = stack.pop()
+        # a thread that has emptied a loop may go where one that has not can't
+        if (pc, entered) in seen:
+            continue
+        seen.add((pc, entered))
+        op, a, b, loop = program[pc]
+        if op == CHAR:
+            waiting.setdefault(pc)
+        elif op == SPLIT:
+            if loop is None:
+                stack.append((b, entered))
+                stack.append((a, entered))
+            elif loop in entered:
+                stack.append((b if loop[1] else a, entered))
+            elif loop[1]:
+                stack.append((b, entered))
+                stack.append((a, entered | {loop}))
+            else:
+                stack.append((b, entered | {loop}))
+                stack.append((a, entered))
+        elif op == JMP:
+            stack.append((a, entered))
+        elif op == ASSERT:
+            if _holds(a, context):
+                stack.append((pc+1, entered))
+        elif not skip_match:
+            matched = True
+            if cut:
+                break
+    return matched, tuple(waiting)
+
+class _Kernel(object):
+    # The threads left after consuming a character, before their closure
+    __slots__ = ('pcs', 'closures')
+
+    def __init__(self, pcs):
+        self.pcs = pcs
+        self.closures = {}
+
+class _State(object):
+    # A DFA state: the threads waiting on the next character. Without
+    # assertions every closure is the same, so states follow one another
+    # directly through nexts
+    __slots__ = ('pcs', 'matched', 'moves', 'nexts')
+
+    def __init__(self, pcs, matched):
+        self.pcs = pcs
+        self.matched = matched
+        self.moves = {}
+        self.nexts = {}
+
+class _DFA(object):
+    # A DFA over one program, built as the input needs it. Kernels cache their
+    # closure under each context and states their successor for each character;
+    # past DFA_STATES of them every cache is dropped, so memory stays bounded
+
+    def __init__(self, program, cut):
+        self.program = program
+        self.cut = cut
+        self.asserts = any(instruction[0] == ASSERT for instruction in program)
+        self.resets = 0
+        self._kernels = {}
+        self._states = {}
+        self.start = self._kernel((0,))
+
+    def _reset(self):
+        for kernel in self._kernels.values():
+            kernel.closures.clear()
+        for state in self._states.values():
+            state.moves.clear()
+            state.nexts.clear()
+        self._kernels.clear()
+        self._states.clear()
+        self.resets += 1
+
+    def _kernel(self, pcs):
+        kernel = self._kernels.get(pcs)
+        if kernel is None:
+            if len(self._kernels) + len(self._states) >= DFA_STATES:
+                self._reset()
+            kernel = self._kernels[pcs] = _Kernel(pcs)
+        return kernel
+
+    def close(self, kernel, context, skip_match=False):
+        matched, pcs = _closure(self.program, kernel.pcs, context, self.cut, skip_match)
+        if skip_match:
+            return _State(pcs, matched)
+        state = self._states.get((matched, pcs))
+        if state is None:
+            if len(self._kernels) + len(self._states) >= DFA_STATES:
+                self._reset()
+            state = self._states[(matched, pcs)] = _State(pcs, matched)
+        kernel.closures[context] = state
+        return state
+
+    def move(self, state, char):
+        program = self.program
+        kernel = self._kernel(tuple(pc+1 for pc in state.pcs if program[pc][1](char)))
+        state.moves[char] = kernel
+        return kernel
+
+    def advance(self, state, char):
+        next = self.close(self.move(state, char), 0)
+        state.nexts[char] = next
+        return next
+
+def _forward(dfa, string, pos, nonempty=False):
+    # The end of the match the DFA prefers starting from pos, or None. With
+    # nonempty an empty match at pos does not count, as for re after an empty
+    # match there
+    if not dfa.asserts:
+        return _forward_plain(dfa, string, pos, nonempty)
+    end = None
+    kernel = dfa.start
+    context = 0
+    i = pos
+    while True:
+        if dfa.asserts:
+            context = _context(string, i)
+        if nonempty and i == pos:
+            state = dfa.close(kernel, context, skip_match=True)
+        else:
+            state = kernel.closures.get(context) or dfa.close(kernel, context)
+        if state.matched:
+            end = i
+        if i == len(string) or not state.pcs:
+            return end
+        char = string[i]
+        kernel = state.moves.get(char) or dfa.move(state, char)
+        i += 1
+
+def _forward_plain(dfa, string, pos, nonempty):
+    # _forward for programs without assertions, one lookup per character
+    state = dfa.close(dfa.start, 0, skip_match=nonempty)
+    end = None
+    for i in range(pos, len(string)):
+        if state.matched:
+            end = i
+        if not state.pcs:
+            return end
+        char = string[i]
+        state = state.nexts.get(char) or dfa.advance(state, char)
+    return len(string) if state.matched else end
+
+def _backward(dfa, string, end, pos):
+    # The furthest position back to pos from which a match reaches end
+    start = None
+    kernel = dfa.start
+    context = 0
+    i = end
+    while True:
+        if dfa.asserts:
+            context = _context(string, i)
+        state = kernel.closures.get(context) or dfa.close(kernel, context)
+        if state.matched:
+            start = i
+        if i == pos or not state.pcs:
+            return start
+        char = string[i-1]
+        kernel = state.moves.get(char) or dfa.move(state, char)
+        i -= 1
+
+class Match(object):
+    """The span of text an Automaton matched, read like an re.Match"""
+    __slots__ = ('string', '_start', '_end')
+
+    def __init__(self, string, start, end):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def span(self):
+        return self._start, self._end
+
+    def group(self):
+        return self.string[self._start:self._end]
+
+    def __repr__(self):
+        return f'<Match span={self.span()!r} match={self.group()!r}>'
+
+class Automaton(object):
+    """A Klean pattern compiled for linear time matching
+
+    match, fullmatch, search and finditer find what the re.Pattern methods of
+    the same name would, without groups. The DFAs are built as inputs need
+    them and kept for later calls.
+    """
+
+    def __init__(self, klean):
+        if not isinstance(klean, Klean):
+            raise ValueError(f'compile must be supplied with a Klean object, recieved {type(klean)} instead')
+        self.klean = klean
+        # find the end of a match, anchored or after any prefix; the prefix
+        # loop is least preferred, so the leftmost start wins
+        anchored = _compile(klean, [])
+        anchored.append([MATCH, None, None, None])
+        self._anchored = _DFA(anchored, cut=True)
+        unanchored = [[SPLIT, 3, 1, None], [CHAR, lambda char: True, None, None], [JMP, 0, None, None]]
+        _compile(klean, unanchored)
+        unanchored.append([MATCH, None, None, None])
+        self._unanchored = _DFA(unanchored, cut=True)
+        whole = _compile(klean, [])
+        whole.extend(([ASSERT, AT_END, None, None], [MATCH, None, None, None]))
+        self._whole = _DFA(whole, cut=True)
+        # find the start of a match from its end, preferring the longest
+        backward = _compile(klean, [], reverse=True)
+        backward.append([MATCH, None, None, None])
+        self._backward = _DFA(backward, cut=False)
+
+    def match(self, string, pos=0):
+        end = _forward(self._anchored, string, pos)
+        return None if end is None else Match(string, pos, end)
+
+    def fullmatch(self, string, pos=0):
+        end = _forward(self._whole, string, pos)
+        return None if end is None else Match(string, pos, end)
+
+    def _search(self, string, pos, nonempty):
+        end = _forward(self._unanchored, string, pos, nonempty)
+        if end is None:
+            return None
+        return Match(string, _backward(self._backward, string, end, pos), end)
+
+    def search(self, string, pos=0):
+        return self._search(string, pos, False)
+
+    def finditer(self, string, pos=0):
+        nonempty = False
+        while pos <= len(string):
+            match = self._search(string, pos, nonempty)
+            if match is None:
+                return
+            yield match
+            pos = match.end()
+            nonempty = match.start() == pos
+
+@lru_cache(maxsize=128)
+def _automaton(klean):
+    return Automaton(klean)
+
+def compile(klean):
+    """Return an Automaton for klean, reusing one built for an equal tree"""
+    if not isinstance(klean, Klean):
+        raise ValueError(f'compile must be supplied with a Klean object, recieved {type(klean)} instead')
+    return _automaton(klean)
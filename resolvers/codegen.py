@@ -0,0 +1,87 @@
+"""Write Klean definitions as a plain python module of compiled patterns
+
+generate() resolves each tree ahead of time and returns the source of a module
+that only imports re. Importing it never loads the Klean model or resolvers;
+by default each pattern is compiled on first use through a module __getattr__,
+and with lazy=False every pattern is compiled when the module is imported.
+
+definitions() finds the trees to write in a module: every public global that is
+a Klean object.
+"""
+
+import keyword
+import re
+from importlib import import_module
+
+from model._klean import Klean
+from model.passes import optimize
+from resolvers.python import format
+
+HEADER = '''"""Compiled patterns generated from {source}; do not edit"""
+
+import re
+'''
+
+LAZY = '''
+_PATTERNS = {{
+{entries}}}
+
+__all__ = {names!r}
+
+def __getattr__(name):
+    # compile each pattern the first time it is used, then keep it as a global
+    try:
+        pattern, flags = _PATTERNS[name]
+    except KeyError:
+        raise AttributeError(f'module {{__name__!r}} has no attribute {{name!r}}') from None
+    compiled = globals()[name] = re.compile(pattern, flags)
+    return compiled
+
+def __dir__():
+    return sorted(set(globals()) | set(_PATTERNS))
+'''
+
+# names the generated module uses itself; besides these it only defines names
+# starting with _, which patterns may not use
+RESERVED = ('re',)
+
+def definitions(module):
+    """Every public Klean global of module, a module object or importable name"""
+    if isinstance(module, str):
+        module = import_module(module)
+    return {name: value for name, value in vars(module).items()
+            if not name.startswith('_') and isinstance(value, Klean)}
+
+def _flags(flags):
+    # flags written as re.X | re.Y, so the module reads the same on every python
+    names = [f're.{flag.name}' for flag in re.RegexFlag if flags & flag]
+    return ' | '.join(names) or '0'
+
+def generate(patterns, flags=0, lazy=True, source='definitions'):
+    """Return the source of a module compiling each of patterns, a dict of name to Klean
+
+    Each tree is optimized and formatted here, so the module holds only the
+    pattern strings. source names where the trees came from in its docstring.
+    """
+    for name, klean in patterns.items():
+        if not name.isidentifier() or name.startswith('_') or keyword.iskeyword(name):
+            raise ValueError(f'pattern names must be public identifiers, recieved {name!r}')
+        if name in RESERVED:
+            raise ValueError(f'{name!r} is used by the generated module, and can not name a pattern')
+        if not isinstance(klean, Klean):
+            raise ValueError(f'generate must be supplied with Klean objects, recieved {type(klean)} for {name}')
+    flags = re.RegexFlag(flags)
+    resolved = {name: format(optimize(klean), flags) for name, klean in patterns.items()}
+    # compiled here once, so a pattern re refuses fails the build and not an import
+    for pattern in resolved.values():
+        re.compile(pattern, flags)
+    out = [HEADER.format(source=source)]
+    if lazy:
+        entries = ''.join(f'    {name!r}: ({pattern!r}, {_flags(flags)}),\n'
+                          for name, pattern in resolved.items())
+        out.append(LAZY.format(entries=entries, names=sorted(resolved)))
+    else:
+        out.append('\n')
+        out.extend(f'{name} = re.compile({pattern!r}, {_flags(flags)})\n'
+                   for name, pattern in resolved.items())
+    return ''.join(out)
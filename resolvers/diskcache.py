@@ -0,0 +1,76 @@
+"""Keep resolved patterns on disk, so later processes need not resolve them
+
+DiskPatternCache is a PatternCache that, on a miss, first looks in a directory
+for the pattern string written for the same tree and flags. The tree is
+optimized and formatted only when it is not there, and the string is then
+saved for the next process. Entries are files named by the tree's digest
+(model.serialize.digest) and the flags. Each entry records the resolver version
+and python version that wrote it, and an entry written by any other version is
+resolved and written again.
+
+A process that kept the digests of its trees can compile the saved patterns
+with load() without building the trees at all.
+"""
+
+import json
+import os
+import re
+import sys
+from tempfile import NamedTemporaryFile
+
+from model.passes import optimize
+from model.serialize import digest
+from resolvers.python import VERSION, PatternCache, format
+
+# python's re may read the same pattern differently from one version to the next
+WRITER = f'{VERSION} python {sys.version_info[0]}.{sys.version_info[1]}'
+
+class DiskPatternCache(PatternCache):
+    """A PatternCache keeping each resolved pattern string in directory"""
+
+    def __init__(self, directory, maxsize=512):
+        super().__init__(maxsize)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, flags):
+        return os.path.join(self.directory, f'{key}-{int(flags)}.json')
+
+    def _read(self, key, flags):
+        # the pattern string saved for key and flags, or None when there is no
+        # entry by this version
+        try:
+            with open(self._path(key, flags), encoding='utf-8') as entry:
+                saved = json.load(entry)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get('writer') != WRITER \
+                or saved.get('flags') != int(flags):
+            return None
+        return saved.get('pattern')
+
+    def _write(self, key, flags, pattern):
+        # written to a temporary file and renamed into place, so other
+        # processes only ever read whole entries
+        with NamedTemporaryFile('w', encoding='utf-8', dir=self.directory, suffix='.tmp',
+                                delete=False) as entry:
+            json.dump({'writer': WRITER, 'flags': int(flags), 'pattern': pattern}, entry,
+                      ensure_ascii=False)
+        os.replace(entry.name, self._path(key, flags))
+
+    def _compile(self, klean, flags):
+        key = digest(klean)
+        pattern = self._read(key, flags)
+        if pattern is None:
+            pattern = format(optimize(klean), flags)
+            try:
+                self._write(key, flags, pattern)
+            except OSError:
+                # a directory that can not be written to only saves nothing
+                pass
+        return re.compile(pattern, flags)
+
+    def load(self, key, flags=0):
+        """Return the compiled pattern saved for the tree of digest key, or None"""
+        pattern = self._read(key, flags)
+        return None if pattern is None else re.compile(pattern, flags)
@@ -1,13 +1,45 @@
-"""Return a Klean object as valid python re string"""
+"""Return a Klean object as valid python re string
+
+format() walks the tree with an explicit stack and writes into a single output
+buffer, so its running time is linear in the number of nodes in the tree (plus
+the length of the output) however deep or wide the tree is. A subtree used in
+several places is walked once, its text copied wherever else it appears.
+"""
 
 import re
+import sys
+from array import array
+from collections import OrderedDict, namedtuple
+from functools import lru_cache, partial
+from itertools import chain
+from threading import Lock
 
-from model._klean import Abstract, Group, Klean, Literal, Range, Sequence, Quantification
+from model._klean import MAX_CODEPOINT, Abstract, Group, Klean, Literal, Range, Sequence,\
+    Quantification
+from model.passes import PASSES, optimize as _optimize
 from model.representations import StringStart, StringEnd, LineStart, LineEnd, WordBoundary,\
     NotWordBoundary, Decimal, NotDecimal, Whitespace, NotWhitespace, Word,\
     NotWord, Any
 
+# raised whenever format() or the optimization passes would write any tree
+# differently, so patterns kept from an earlier version are written again
+VERSION = 2
+
+# re takes atomic groups and possessive repetitions from python 3.11; before
+# that they are refused, as there is no way to write them that re would match
+# the same
+ATOMIC = sys.version_info >= (3, 11)
+
+def _require_atomic(what):
+    if not ATOMIC:
+        raise ValueError(f'{what} need python 3.11 or later, running {sys.version.split()[0]}')
+
 def _format_quantification(quantity):
+    if quantity.possessive:
+        _require_atomic('possessive repetitions')
+        if quantity.min == quantity.max == 1:
+            # one repetition that is not given back is written explicitly
+            return '{1}+'
     repeat = ''
     if quantity.max == 0:
         if quantity.min == 0:
@@ -27,6 +59,8 @@ def _format_quantification(quantity):
 
     if not quantity.greedy:
         repeat += '?'
+    elif quantity.possessive:
+        repeat += '+'
     return repeat
 
 def _format_literal(klean):
@@ -48,6 +82,8 @@ ABSTRACTS = {
     Any(): r'.',
     }
 def _format_abstract(klean):
+    if not isinstance(klean, (Abstract, Literal)):
+        raise TypeError(f'{type(klean)} is not a single character')
     if klean in ABSTRACTS:
         if isinstance(ABSTRACTS[klean], Klean):
             raise RuntimeWarning(f'{type(klean)} is not natively supported'
@@ -57,57 +93,335 @@ def _format_abstract(klean):
     raise RuntimeError(f'{type(klean)} is not supported in python Regular'
                        'Expressions')
 
+ASCII_MAX = 0x7F
+
+@lru_cache(maxsize=1)
+def _everything():
+    # every code point as one string, in order, decoded from their 4 byte values
+    points = array('I', range(MAX_CODEPOINT + 1))
+    return points.tobytes().decode(f'utf-32-{sys.byteorder[0]}e', 'surrogatepass')
+
+@lru_cache(maxsize=None)
+def _class_intervals(escape, flags=0):
+    # The merged code point intervals python's re matches with a one character
+    # pattern such as the class escape \d, under the default (unicode) matching
+    # rules and flags
+    intervals = array('L')
+    for match in re.finditer(f'{escape}+', _everything(), flags):
+        intervals.append(match.start())
+        intervals.append(match.end() - 1)
+    return intervals
+
+@lru_cache(maxsize=None)
+def _ascii_intervals(escape):
+    # The merged intervals of the ASCII characters python's re matches with a
+    # class escape such as \d under re.ASCII
+    intervals = array('L')
+    for match in re.finditer(f'{escape}+', ''.join(map(chr, range(ASCII_MAX + 1))), re.ASCII):
+        intervals.append(match.start())
+        intervals.append(match.end() - 1)
+    return intervals
+
+# class escapes that may stand in for a Range, keyed by their first interval so
+# most ranges never need the full tables built
+CLASS_ESCAPES = {
+    (ord('0'), ord('9')): ((r'\d', r'\D'), (r'\w', r'\W')),
+    (ord('\t'), ord('\r')): ((r'\s', r'\S'),),
+    }
+def _class_escape(klean, flags=0):
+    # under re.ASCII the escapes match only ascii, so they no longer stand in
+    intervals = klean.intervals
+    if len(intervals) <= 2 or flags & re.ASCII:
+        return None
+    for escape, inverse in CLASS_ESCAPES.get((intervals[0], intervals[1]), ()):
+        if intervals == _class_intervals(escape):
+            return inverse if klean.invert else escape
+    return None
+
 RANGE_START = '['
 RANGE_END = ']'
 RANGE_CONT = '-'
 RANGE_NOT = '^'
-def _format_range(klean):
+RANGE_NONE = r'[^\s\S]'
+RANGE_ALL = r'[\s\S]'
+def _format_range(klean, flags=0):
     # A range can only contain literals, but location is important for negation
-    range = f'{RANGE_START}{RANGE_NOT if klean.invert else ""}'
-    #TODO collapse consecutive characters into A-Z
-    #NOTE for now, sort to prep for combining adjacent chars
-    for next in sorted(klean.range):
-        if not isinstance(next, Literal):
-            raise RuntimeError(f'{type(klean)} is not supported in python '
-                               'Regular Expression Ranges')
-        range += _format_literal(next)
-    return f'{range}{RANGE_END}'
-
-def _format_sequence(klean):
-    sequence = ''
-    for next in klean.characters:
+    # Consecutive code points collapse into spans such as a-z, and a range equal
+    # to one of the class escapes is written as that escape
+    if not klean.intervals:
+        return RANGE_ALL if klean.invert else RANGE_NONE
+    escape = _class_escape(klean, flags)
+    if escape:
+        return escape
+    members = []
+    for start, end in klean.spans():
+        members.append(re.escape(chr(start)))
+        if end > start + 1:
+            members.append(RANGE_CONT)
+        if end > start:
+            members.append(re.escape(chr(end)))
+    return f'{RANGE_START}{RANGE_NOT if klean.invert else ""}{"".join(members)}{RANGE_END}'
+
+def _format_sequence(klean, format_literal=_format_literal, format_abstract=_format_abstract,
+                     dialect='python'):
+    sequence = []
+    for next in klean:
         if isinstance(next, Literal):
-            sequence += _format_literal(next)
+            sequence.append(format_literal(next))
         elif isinstance(next, Abstract):
-            sequence += _format_abstract(next)
+            sequence.append(format_abstract(next))
         else:
-            raise RuntimeError(f'{type(next)} is not supported in python '
+            raise RuntimeError(f'{type(next)} is not supported in {dialect} '
                                'Regular Expression Sequences')
-    return sequence
+    return ''.join(sequence)
 
-GROUP_START = '('
+GROUP_START = '(?:'
+CAPTURE_START = '('
+NAMED_START = '(?P<{}>'
+ATOMIC_START = '(?>'
 GROUP_END = ')'
 GROUP_OR = '|'
+
+def _group_start(klean):
+    # Only groups asked to capture are written as capturing groups, as re
+    # saves and restores every capture on each attempt and backtrack. An
+    # atomic group that captures is an atomic group inside a capturing one
+    if klean.atomic:
+        _require_atomic('atomic groups')
+        if klean.capture is None:
+            return ATOMIC_START
+    if klean.capture is None:
+        start = GROUP_START
+    elif klean.capture is True:
+        start = CAPTURE_START
+    else:
+        start = NAMED_START.format(klean.capture)
+    return start + ATOMIC_START if klean.atomic else start
+
+def _group_end(klean):
+    if klean.atomic and klean.capture is not None:
+        return GROUP_END + GROUP_END
+    return GROUP_END
+
+def _close(klean):
+    # the text closing a group, its repetition included
+    return _group_end(klean) + _format_quantification(klean.repetition)
+
 def _format_group(klean):
-    #TODO: groups should not add "()"s if they are not needed. i.e. double paren
-    # or no inner contents need to be contained
-    #TODO: if OR and if a group is a sequence, it needs its own parentheses
-    #TODO: if two sides of an OR are rangees and/or literals, compine into one range
-    group = (GROUP_OR if klean.OR else "").join([format(sub) for sub in klean.groups])
-    quantity = _format_quantification(klean.repetition)
-    return f'{GROUP_START}{group}{GROUP_END}{quantity}'
+    # Every group is written as it is; dropping redundant groups and joining
+    # single character alternatives into one range is left to model.passes,
+    # run by compile(klean, optimize=True)
+    out = []
+    _emit(klean, out)
+    return ''.join(out)
+
+TRIE_END = None
+TRIE_START = '(?:'
+def _alternation_trie(klean):
+    # Factor an alternation of plain literal strings into a prefix trie: nested
+    # dicts from character to subtree, with TRIE_END marking a complete word.
+    # Branch order follows the alternatives, and the trie is only equivalent
+    # when every node's branches were each reached by a contiguous run of
+    # alternatives; otherwise None is returned and the group is left as is
+    words = []
+    for sub in klean:
+        if isinstance(sub, Literal):
+            words.append(sub.char)
+        elif isinstance(sub, Sequence) and all(isinstance(c, Literal) for c in sub):
+            words.append(''.join(c.char for c in sub))
+        else:
+            return None
+    trie = {}
+    for word in words:
+        node = trie
+        for label in chain(word, (TRIE_END,)):
+            if label in node:
+                if next(reversed(node)) != label:
+                    return None
+            else:
+                node[label] = {} if label is not TRIE_END else None
+            node = node[label]
+    return trie
+
+def _emit_trie(trie, out):
+    # Append a factored alternation such as b(?:lue|rown)|g(?:reen|rey) to out.
+    # The root's branches are already enclosed by their group's parentheses
+    stack = [(trie, True)]
+    while stack:
+        next = stack.pop()
+        if isinstance(next, str):
+            out.append(next)
+            continue
+        node, root = next
+        branches = list(node.items())
+        if len(branches) == 1:
+            label, child = branches[0]
+            if label is not TRIE_END:
+                out.append(re.escape(label))
+                stack.append((child, False))
+            continue
+        if not root:
+            if len(branches) == 2 and TRIE_END in node:
+                # a word ending here is an optional tail, tried first if it came first
+                label, child = branches[1] if branches[0][0] is TRIE_END else branches[0]
+                out.append(TRIE_START)
+                stack.append(')??' if branches[0][0] is TRIE_END else ')?')
+                stack.append((child, False))
+                stack.append(re.escape(label))
+                continue
+            out.append(TRIE_START)
+            stack.append(GROUP_END)
+        for i in range(len(branches)-1, -1, -1):
+            label, child = branches[i]
+            if label is not TRIE_END:
+                stack.append((child, False))
+                stack.append(re.escape(label))
+            if i:
+                stack.append(GROUP_OR)
+
+def _reuse(klean, out, written):
+    # Append the text already written for klean if it was, returning whether it
+    # was. written maps a finished group's id to the span of out it wrote, which
+    # is joined into one string the first time the group recurs
+    text = written.get(id(klean))
+    if text is None:
+        return False
+    if isinstance(text, tuple):
+        text = written[id(klean)] = ''.join(out[text[0]:text[1]])
+    out.append(text)
+    return True
+
+def _walk(klean, out, format_literal, format_range, format_abstract, close, dialect,
+          trie=False):
+    # Append the pieces of klean's pattern to out, each leaf written by the
+    # dialect's formatter for it and each group closed by close(group), so
+    # every resolver walks trees the same way in its own spelling; with trie,
+    # alternations of plain strings are factored. Pending work is kept on an
+    # explicit stack of nodes, literal text and (group, start, end text) marks
+    # closing each group, so nesting depth is not limited by the interpreter's
+    # recursion limit. A subtree shared by several parents is written once and
+    # its text copied where it recurs, so the time taken grows with the number
+    # of distinct nodes rather than with the number of paths to them
+    written = {}
+    stack = [klean]
+    while stack:
+        next = stack.pop()
+        if isinstance(next, str):
+            out.append(next)
+        elif isinstance(next, tuple):
+            group, start, end = next
+            out.append(end)
+            written[id(group)] = (start, len(out))
+        elif isinstance(next, Group):
+            if _reuse(next, out, written):
+                continue
+            stack.append((next, len(out), close(next)))
+            out.append(_group_start(next))
+            factored = _alternation_trie(next) if trie and next.OR else None
+            if factored is not None:
+                _emit_trie(factored, out)
+                continue
+            groups = next.groups
+            for i in range(len(groups)-1, -1, -1):
+                stack.append(groups[i])
+                if next.OR and i:
+                    stack.append(GROUP_OR)
+        elif isinstance(next, Sequence):
+            out.append(_format_sequence(next, format_literal, format_abstract, dialect))
+        elif isinstance(next, Range):
+            out.append(format_range(next))
+        elif isinstance(next, Literal):
+            out.append(format_literal(next))
+        elif isinstance(next, Abstract):
+            out.append(format_abstract(next))
+        else:
+            raise ValueError(f'format must be supplied with a Klean object, recieved {type(next)} instead')
+
+def _emit(klean, out, flags=0):
+    _walk(klean, out, _format_literal, partial(_format_range, flags=flags), _format_abstract,
+          _close, 'python', trie=True)
 
 #TODO: rename, format is a built-in
-def format(klean):
-    if isinstance(klean, Group):
-        return _format_group(klean)
-    if isinstance(klean, Sequence):
-        return _format_sequence(klean)
-    if isinstance(klean, Range):
-        return _format_range(klean)
-    if isinstance(klean, Literal):
-        return _format_literal(klean)
-    if isinstance(klean, Abstract):
-        return _format_abstract(klean)
-    else:
+def format(klean, flags=0):
+    """Return klean as a pattern string, written for re to read under flags"""
+    if not isinstance(klean, Klean):
         raise ValueError(f'format must be supplied with a Klean object, recieved {type(klean)} instead')
+    out = []
+    _emit(klean, out, flags)
+    return ''.join(out)
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class PatternCache(object):
+    """A bounded LRU cache of compiled patterns keyed on Klean structure
+
+    Equal Klean trees hash alike, so independently built copies of the same
+    pattern share one compiled re.Pattern.
+    """
+
+    def __init__(self, maxsize=512):
+        if type(maxsize) != int or maxsize < 0:
+            raise ValueError('maxsize must be an unsigned intiger')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._patterns = OrderedDict()
+        self._lock = Lock()
+
+    def compile(self, klean, flags=0, optimize=False):
+        if not isinstance(klean, Klean):
+            raise ValueError(f'compile must be supplied with a Klean object, recieved {type(klean)} instead')
+        passes = _passes(optimize)
+        key = (klean, flags, passes)
+        with self._lock:
+            pattern = self._patterns.get(key)
+            if pattern is not None:
+                self._patterns.move_to_end(key)
+                self.hits += 1
+                return pattern
+            self.misses += 1
+        pattern = self._compile(_optimize(klean, passes) if passes else klean, flags)
+        with self._lock:
+            if self.maxsize:
+                self._patterns[key] = pattern
+                if len(self._patterns) > self.maxsize:
+                    self._patterns.popitem(last=False)
+        return pattern
+
+    def _compile(self, klean, flags):
+        return re.compile(format(klean, flags), flags)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._patterns))
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+            self.hits = self.misses = 0
+
+def _passes(optimize):
+    # the passes optimize= asks for: none, all of model.passes.PASSES, or those given
+    if optimize is True:
+        return PASSES
+    if not optimize:
+        return ()
+    return tuple(optimize)
+
+_cache = PatternCache()
+
+def compile(klean, flags=0, optimize=False):
+    """Return a compiled re.Pattern for klean, reusing any structurally equal one
+
+    With optimize=True the tree is first rewritten by model.passes.optimize
+    into a smaller one matching the same; optimize may also be the sequence
+    of passes to run.
+    """
+    return _cache.compile(klean, flags, optimize)
+
+def cache_info():
+    return _cache.info()
+
+def purge():
+    _cache.clear()
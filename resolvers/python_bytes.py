@@ -0,0 +1,236 @@
+"""Return a Klean object as a python re pattern for matching bytes
+
+The pattern matches the encoded form of the text the str pattern from
+resolvers.python would match, so binary logs, bytearrays, memoryviews and mmaps
+can be searched without decoding them first. Under UTF-8 each character becomes
+the byte sequence encoding it, and a Range or a class escape such as \\d becomes
+an alternation of byte sequences. Under Latin-1 every character is one byte;
+ranges lose their members beyond \\xff, and a character beyond it is refused.
+
+Class escapes keep the unicode meaning they have in a str pattern unless
+re.ASCII is given, when they match ASCII characters as in re. \\b and \\B can
+only be written in ASCII mode, since re finds word boundaries in bytes by the
+ASCII word characters alone. re.IGNORECASE only folds ASCII letters in bytes,
+and ranges are written as the characters they hold, so under it each Range,
+and without re.ASCII each cased Literal, is written as every character its str
+pattern matches ignoring case: k, for one, matches K, k and the Kelvin sign.
+
+In UTF-8 a pattern that can match empty text could otherwise match between
+the bytes of one character, so it only starts where no continuation byte is.
+"""
+
+import re
+from functools import lru_cache, partial
+
+from model._klean import Klean, Range, _complement_intervals
+from model.analysis import length_bounds
+from model.representations import Any, Decimal, NotDecimal, NotWhitespace, NotWord,\
+    NotWordBoundary, Whitespace, Word, WordBoundary
+from resolvers.python import ABSTRACTS, ASCII_MAX, GROUP_END, GROUP_OR, RANGE_CONT, RANGE_ALL,\
+    RANGE_END, RANGE_NONE, RANGE_NOT, RANGE_START, PatternCache, _ascii_intervals,\
+    _class_intervals, _close, _walk, _format_range as _format_str_range
+
+ENCODINGS = ('utf-8', 'latin-1')
+
+# abstracts standing for sets of characters, written out as Ranges as needed
+CLASSES = (Decimal(), NotDecimal(), Whitespace(), NotWhitespace(), Word(), NotWord())
+BOUNDARIES = (WordBoundary(), NotWordBoundary())
+NEGATED = {r'\D': r'\d', r'\S': r'\s', r'\W': r'\w'}
+
+LATIN_1_MAX = 0xFF
+SURROGATES = (0xD800, 0xDFFF)
+# the last code point encoded in 1, 2 and 3 bytes of UTF-8
+UTF_8_LIMITS = (0x7F, 0x7FF, 0xFFFF)
+SEQUENCE_START = '(?:'
+# not inside a character: the next byte is not a UTF-8 continuation byte
+CHARACTER_START = '(?![\x80-\xbf])'
+
+def _text(data):
+    # bytes written as the str of the pattern, one character per byte
+    return re.escape(data.decode('latin-1'))
+
+def _members(pairs):
+    # the inside of a character class of inclusive (low, high) byte pairs
+    members = []
+    for low, high in pairs:
+        members.append(re.escape(chr(low)))
+        if high > low + 1:
+            members.append(RANGE_CONT)
+        if high > low:
+            members.append(re.escape(chr(high)))
+    return ''.join(members)
+
+def _byte_class(pairs):
+    if len(pairs) == 1 and pairs[0][0] == pairs[0][1]:
+        return re.escape(chr(pairs[0][0]))
+    return f'{RANGE_START}{_members(pairs)}{RANGE_END}'
+
+def _latin_1_pairs(intervals):
+    return [(start, min(end, LATIN_1_MAX)) for start, end in zip(intervals[::2], intervals[1::2])
+            if start <= LATIN_1_MAX]
+
+def _utf_8_sequences(start, end):
+    # Split the code points start to end into runs whose UTF-8 encodings differ
+    # only by a range of values in each byte, and yield each run as a list of
+    # (low, high) byte pairs
+    stack = [(start, end)]
+    while stack:
+        start, end = stack.pop()
+        for limit in UTF_8_LIMITS:
+            if start <= limit < end:
+                stack.append((limit + 1, end))
+                end = limit
+                break
+        for length in (1, 2, 3):
+            tail = (1 << 6 * length) - 1
+            if start & ~tail == end & ~tail:
+                continue
+            if start & tail:
+                stack.append(((start | tail) + 1, end))
+                stack.append((start, start | tail))
+                break
+            if end & tail != tail:
+                stack.append((end & ~tail, end))
+                stack.append((start, (end & ~tail) - 1))
+                break
+        else:
+            yield list(zip(chr(start).encode('utf-8'), chr(end).encode('utf-8')))
+
+def _without_surrogates(intervals):
+    # lone surrogates have no UTF-8 encoding, and so never appear in UTF-8 text
+    for start, end in zip(intervals[::2], intervals[1::2]):
+        if start < SURROGATES[0]:
+            yield start, min(end, SURROGATES[0] - 1)
+        if end > SURROGATES[1]:
+            yield max(start, SURROGATES[1] + 1), end
+
+def _format_intervals(intervals, encoding):
+    # a pattern for one character of the code point intervals given
+    if encoding == 'latin-1':
+        pairs = _latin_1_pairs(intervals)
+        return _byte_class(pairs) if pairs else RANGE_NONE
+    single = []
+    sequences = []
+    for start, end in _without_surrogates(intervals):
+        if start <= ASCII_MAX:
+            single.append((start, min(end, ASCII_MAX)))
+            start = ASCII_MAX + 1
+        if start <= end:
+            sequences.extend(''.join(_byte_class([pair]) for pair in sequence)
+                             for sequence in _utf_8_sequences(start, end))
+    if single:
+        sequences.insert(0, _byte_class(single))
+    if not sequences:
+        return RANGE_NONE
+    if len(sequences) == 1:
+        return sequences[0]
+    return f'{SEQUENCE_START}{GROUP_OR.join(sequences)}{GROUP_END}'
+
+@lru_cache(maxsize=None)
+def _format_class(escape, encoding, ascii):
+    if not ascii:
+        return _format_intervals(_class_intervals(escape), encoding)
+    if encoding == 'latin-1' or escape not in NEGATED:
+        return escape
+    # \W in bytes would match the single bytes of a longer character
+    return _format_intervals(_complement_intervals(_ascii_intervals(NEGATED[escape])), encoding)
+
+@lru_cache(maxsize=None)
+def _format_folded(pattern, encoding, ascii):
+    # a pattern for every character the one character str pattern matches
+    # ignoring case
+    flags = re.IGNORECASE | re.ASCII if ascii else re.IGNORECASE
+    return _format_intervals(_class_intervals(pattern, flags), encoding)
+
+def _format_literal(klean, encoding, flags=0):
+    if encoding == 'latin-1' and ord(klean.char) > LATIN_1_MAX:
+        raise ValueError(f'{klean.char!r} can not be encoded in latin-1')
+    if flags & re.IGNORECASE and not flags & re.ASCII and klean.char.lower() != klean.char.upper():
+        return _format_folded(re.escape(klean.char), encoding, False)
+    return _text(klean.char.encode(encoding))
+
+def _format_range(klean, encoding, flags=0):
+    if flags & re.IGNORECASE:
+        return _format_folded(_format_str_range(klean, flags), encoding, bool(flags & re.ASCII))
+    intervals = klean.intervals
+    if encoding == 'utf-8':
+        return _format_intervals(klean._matched_intervals(), encoding)
+    # members beyond \xff are never in latin-1 text, so can be left out
+    pairs = _latin_1_pairs(intervals)
+    if not klean.invert:
+        if intervals and not pairs:
+            raise ValueError('no member of the range can be encoded in latin-1')
+        return _format_intervals(intervals, encoding)
+    if not pairs:
+        return RANGE_ALL
+    return f'{RANGE_START}{RANGE_NOT}{_members(pairs)}{RANGE_END}'
+
+def _format_abstract(klean, encoding, flags):
+    ascii = flags & re.ASCII
+    if klean in BOUNDARIES and not ascii:
+        raise ValueError(f'{ABSTRACTS[klean]} only finds ASCII word boundaries in bytes, '
+                         'pass re.ASCII to use it')
+    if klean in CLASSES:
+        return _format_class(ABSTRACTS[klean], encoding, bool(ascii))
+    if klean == Any() and encoding == 'utf-8':
+        return _format_range(Range(invert=True) if flags & re.DOTALL else Range('\n', invert=True),
+                             encoding)
+    if klean not in ABSTRACTS:
+        raise RuntimeError(f'{type(klean)} is not supported in python Regular'
+                           'Expressions')
+    return ABSTRACTS[klean]
+
+def _emit(klean, out, encoding, flags):
+    # as resolvers.python._emit, writing each byte of the pattern as a character
+    _walk(klean, out, partial(_format_literal, encoding=encoding, flags=flags),
+          partial(_format_range, encoding=encoding, flags=flags),
+          partial(_format_abstract, encoding=encoding, flags=flags), _close, 'python')
+
+def format(klean, encoding='utf-8', flags=0):
+    """Return klean as a bytes pattern matching text in encoding
+
+    Raises ValueError for what can not be written for bytes, such as a
+    character outside latin-1 or, without re.ASCII in flags, a word boundary.
+    flags should be those the pattern will be compiled with.
+    """
+    if not isinstance(klean, Klean):
+        raise ValueError(f'format must be supplied with a Klean object, recieved {type(klean)} instead')
+    if encoding not in ENCODINGS:
+        raise ValueError(f'encoding must be one of {", ".join(ENCODINGS)}, recieved {encoding!r}')
+    out = []
+    if encoding == 'utf-8' and length_bounds(klean).min == 0:
+        out.append(CHARACTER_START)
+    _emit(klean, out, encoding, flags)
+    return ''.join(out).encode('latin-1')
+
+
+class BytesPatternCache(PatternCache):
+    """A PatternCache of bytes patterns for text in one encoding"""
+
+    def __init__(self, maxsize=512, encoding='utf-8'):
+        if encoding not in ENCODINGS:
+            raise ValueError(f'encoding must be one of {", ".join(ENCODINGS)}, recieved {encoding!r}')
+        super().__init__(maxsize)
+        self.encoding = encoding
+
+    def _compile(self, klean, flags):
+        return re.compile(format(klean, self.encoding, flags), flags)
+
+_caches = {encoding: BytesPatternCache(encoding=encoding) for encoding in ENCODINGS}
+
+def compile(klean, flags=0, encoding='utf-8', optimize=False):
+    """Return a compiled bytes re.Pattern for klean, reusing any structurally equal one
+
+    The pattern matches bytes, bytearray, memoryview and mmap objects in place.
+    optimize is as for resolvers.python.compile.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f'encoding must be one of {", ".join(ENCODINGS)}, recieved {encoding!r}')
+    return _caches[encoding].compile(klean, flags, optimize)
+
+def cache_info(encoding='utf-8'):
+    return _caches[encoding].info()
+
+def purge():
+    for cache in _caches.values():
+        cache.clear()
@@ -0,0 +1,222 @@
+"""Return the Klean object for a python re pattern string
+
+parse() reads the pattern with python's own parser, so it takes exactly the
+syntax re.compile does, and builds the tree from what that parser gives: a
+pattern formatted from the tree matches what the string matched. Capturing
+groups come back as capturing Groups, with their names, so groups in matches
+are numbered as before; only a group repeated {0} times is dropped whole.
+
+Patterns that use what Klean has no node for, such as backreferences or
+lookarounds, raise a ValueError naming every such construct in the pattern.
+"""
+
+import re
+try:
+    from re import _constants as sre, _parser as sre_parse
+except ImportError:
+    import sre_constants as sre, sre_parse
+
+from model._klean import MAX_CODEPOINT, Group, Literal, Range, Sequence, Quantification,\
+    _complement_intervals, _merge_intervals
+from model.representations import StringStart, StringEnd, LineStart, LineEnd, WordBoundary,\
+    NotWordBoundary, Decimal, NotDecimal, Whitespace, NotWhitespace, Word, NotWord, Any
+from resolvers.python import _ascii_intervals, _class_intervals
+
+ASSERTIONS = {
+    sre.AT_BEGINNING: LineStart(),
+    sre.AT_BEGINNING_STRING: StringStart(),
+    sre.AT_END: LineEnd(),
+    sre.AT_END_STRING: StringEnd(),
+    sre.AT_BOUNDARY: WordBoundary(),
+    sre.AT_NON_BOUNDARY: NotWordBoundary(),
+    }
+CATEGORIES = {
+    sre.CATEGORY_DIGIT: (Decimal(), r'\d'),
+    sre.CATEGORY_NOT_DIGIT: (NotDecimal(), r'\D'),
+    sre.CATEGORY_SPACE: (Whitespace(), r'\s'),
+    sre.CATEGORY_NOT_SPACE: (NotWhitespace(), r'\S'),
+    sre.CATEGORY_WORD: (Word(), r'\w'),
+    sre.CATEGORY_NOT_WORD: (NotWord(), r'\W'),
+    }
+UNSUPPORTED = {
+    sre.GROUPREF_EXISTS: 'conditional group (?(...)...)',
+    }
+LOOKAROUNDS = {
+    (sre.ASSERT, 1): 'lookahead (?=...)',
+    (sre.ASSERT, -1): 'lookbehind (?<=...)',
+    (sre.ASSERT_NOT, 1): 'negative lookahead (?!...)',
+    (sre.ASSERT_NOT, -1): 'negative lookbehind (?<!...)',
+    }
+# read only from python 3.11
+ATOMIC_GROUP = getattr(sre, 'ATOMIC_GROUP', None)
+POSSESSIVE_REPEAT = getattr(sre, 'POSSESSIVE_REPEAT', None)
+
+# flags that only change how the pattern is read, which the tree has no need of
+READING_FLAGS = re.UNICODE | re.VERBOSE
+FLAG_LETTERS = {re.IGNORECASE: 'i', re.LOCALE: 'L', re.MULTILINE: 'm', re.DOTALL: 's',
+                re.ASCII: 'a'}
+
+def _flag_letters(flags):
+    return ''.join(letter for flag, letter in FLAG_LETTERS.items() if flags & flag)
+
+def _category_intervals(category, ascii):
+    escape = CATEGORIES[category][1]
+    if not ascii:
+        return _class_intervals(escape)
+    # under re.ASCII the class only holds (or, negated, leaves out) ASCII
+    positive = escape.lower()
+    intervals = _ascii_intervals(positive)
+    return _complement_intervals(intervals) if positive != escape else intervals
+
+def _class(items, ascii):
+    # the Abstract or Range for the members of a [...] class
+    invert = False
+    pairs = []
+    for op, av in items:
+        if op == sre.NEGATE:
+            invert = True
+        elif op == sre.LITERAL:
+            pairs.append((av, av))
+        elif op == sre.RANGE:
+            pairs.append(av)
+        elif op == sre.CATEGORY:
+            if len(items) == 1:
+                return CATEGORIES[av][0]
+            intervals = _category_intervals(av, ascii)
+            pairs.extend(zip(intervals[::2], intervals[1::2]))
+        else:
+            raise ValueError(f'unexpected {op} in a character class')
+    intervals = _merge_intervals(pairs)
+    if list(intervals) == [0, MAX_CODEPOINT]:
+        # kept as the complement of nothing, which is written [\s\S]
+        return Range._from_intervals(intervals[:0], not invert)
+    return Range._from_intervals(intervals, invert)
+
+def _repeat(body, low, high, greedy, possessive=False):
+    if high == 0:
+        return Group()
+    if low == high == 1 and not possessive:
+        return body
+    repetition = Quantification(min=low, max=0 if high == sre.MAXREPEAT else high, greedy=greedy,
+                                possessive=possessive)
+    if isinstance(body, Group) and body.repetition == Quantification(min=1, max=1):
+        # a repeated capture keeps its last repetition, as in re
+        return Group(*body.groups, OR=body.OR, repetition=repetition, capture=body.capture,
+                     atomic=body.atomic)
+    return Group(body, repetition=repetition)
+
+def _subpattern(body, capture):
+    # the Group for a parenthesised body, a capture or a plain (?:...) group
+    once = isinstance(body, Group) and body.repetition == Quantification(min=1, max=1)
+    if capture is None:
+        return body if once else Group(body)
+    if once and body.capture is None and not body.atomic:
+        return Group(*body.groups, OR=body.OR, capture=capture)
+    return Group(body, capture=capture)
+
+def _atomic(body):
+    if (isinstance(body, Group) and body.repetition == Quantification(min=1, max=1)
+            and body.capture is None):
+        return Group(*body.groups, OR=body.OR, atomic=True)
+    return Group(body, atomic=True)
+
+def _branch(alternatives):
+    # An empty alternative matches at once, so the ones after it are only tried
+    # when what follows fails; that is a lazy optional group of them
+    empty = next((i for i, alternative in enumerate(alternatives)
+                  if alternative == Group()), None)
+    if empty is None:
+        return Group(*alternatives, OR=True)
+    before = alternatives[:empty]
+    after = [alternative for alternative in alternatives[empty+1:] if alternative != Group()]
+    if after:
+        before.append(Group(*after, OR=True, repetition=Quantification(min=0, max=1, greedy=False)))
+        return Group(*before, OR=True) if len(before) > 1 else before[0]
+    if before:
+        return Group(*before, OR=True, repetition=Quantification(min=0, max=1))
+    return Group()
+
+def _sequence(items):
+    # runs of literals become Sequences, and a single item stands alone
+    members = []
+    run = []
+    for item in items + [None]:
+        if isinstance(item, Literal):
+            run.append(item)
+            continue
+        if len(run) > 1:
+            members.append(Sequence(''.join(literal.char for literal in run)))
+        else:
+            members.extend(run)
+        run = []
+        if item is not None and item != Group():
+            members.append(item)
+    if len(members) == 1:
+        return members[0]
+    return Group(*members)
+
+def _convert(subpattern, ascii, names, unsupported):
+    items = []
+    for op, av in subpattern:
+        if op == sre.LITERAL:
+            items.append(Literal(chr(av)))
+        elif op == sre.NOT_LITERAL:
+            items.append(Range(chr(av), invert=True))
+        elif op == sre.ANY:
+            items.append(Any())
+        elif op == sre.IN:
+            items.append(_class(av, ascii))
+        elif op == sre.AT:
+            items.append(ASSERTIONS[av])
+        elif op == sre.BRANCH:
+            items.append(_branch([_convert(branch, ascii, names, unsupported) for branch in av[1]]))
+        elif op == sre.SUBPATTERN:
+            group, add_flags, del_flags, body = av
+            if add_flags or del_flags:
+                letters = _flag_letters(add_flags)
+                if del_flags:
+                    letters += '-' + _flag_letters(del_flags)
+                unsupported.append(f'scoped flags (?{letters}:...)')
+            capture = None if group is None else names.get(group, True)
+            items.append(_subpattern(_convert(body, ascii, names, unsupported), capture))
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT):
+            low, high, body = av
+            items.append(_repeat(_convert(body, ascii, names, unsupported), low, high,
+                                 op == sre.MAX_REPEAT))
+        elif op == POSSESSIVE_REPEAT:
+            low, high, body = av
+            items.append(_repeat(_convert(body, ascii, names, unsupported), low, high, True, True))
+        elif op == ATOMIC_GROUP:
+            items.append(_atomic(_convert(av, ascii, names, unsupported)))
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            unsupported.append(LOOKAROUNDS[op, av[0]])
+        elif op == sre.GROUPREF:
+            unsupported.append(f'backreference \\{av}')
+        elif op in UNSUPPORTED:
+            unsupported.append(UNSUPPORTED[op])
+        else:
+            unsupported.append(str(op))
+    return _sequence(items)
+
+def parse(pattern, flags=0):
+    """Return the Klean object matching what re.compile(pattern, flags) matches
+
+    flags are needed only for how they change reading the pattern (re.VERBOSE)
+    or the classes in it (re.ASCII); the tree is meant to be compiled with
+    the same flags. Flags set inside the pattern, as (?i) or (?s:...), can not
+    be carried by the tree and are reported with the other unsupported
+    constructs.
+    """
+    if not isinstance(pattern, str):
+        raise ValueError(f'parse must be supplied with a str pattern, recieved {type(pattern)} instead')
+    parsed = sre_parse.parse(pattern, flags)
+    unsupported = []
+    inline = parsed.state.flags & ~flags & ~READING_FLAGS
+    if inline:
+        unsupported.append(f'inline flags (?{_flag_letters(inline)})')
+    names = {group: name for name, group in parsed.state.groupdict.items()}
+    klean = _convert(parsed, bool(parsed.state.flags & re.ASCII), names, unsupported)
+    if unsupported:
+        constructs = ', '.join(dict.fromkeys(unsupported))
+        raise ValueError(f'{pattern!r} uses what Klean can not represent: {constructs}')
+    return klean
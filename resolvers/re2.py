@@ -0,0 +1,161 @@
+"""Return a Klean object as a pattern for RE2 or for Rust's regex crate
+
+Both engines match in linear time and take much the same syntax, but lack
+some of python's: the pattern written matches what the python resolver's
+pattern matches, and a ValueError is raised for what can not be said the same
+way, rather than a pattern that quietly matches something else.
+
+Characters outside printable ASCII are written as \\x{...}, and class escapes
+such as \\d are written out as the code point intervals python's re gives them,
+so the patterns do not depend on either engine's idea of unicode classes. With
+re.ASCII they are written as their ASCII classes instead. A few things python
+can match have no equivalent in these engines:
+
+- $ without re.MULTILINE, which in python also matches before a newline at the
+  end of the text; use StringEnd, or re.MULTILINE where lines are meant
+- \\b and \\B without re.ASCII, as neither engine has python's word characters
+- repetitions of more than 1000 in RE2
+- atomic groups and possessive repetitions, which neither engine has
+"""
+
+import re
+from functools import lru_cache, partial
+
+from model._klean import Klean
+from model.representations import Any, Decimal, LineEnd, LineStart, NotDecimal,\
+    NotWhitespace, NotWord, NotWordBoundary, StringEnd, StringStart, Whitespace, Word,\
+    WordBoundary
+from resolvers.python import GROUP_END, RANGE_CONT, RANGE_END, RANGE_NOT, RANGE_START,\
+    _ascii_intervals, _class_intervals, _format_quantification, _walk
+from resolvers.python_bytes import _without_surrogates
+
+DIALECTS = ('re2', 'rust')
+
+# the largest repetition count RE2 accepts
+RE2_MAX_REPEAT = 1000
+
+# characters escaped with a backslash, outside and inside a character class
+META = frozenset('\\.+*?()|[]{}^$')
+CLASS_META = frozenset('\\[]^-&~')
+
+RANGE_NONE = '[^\\x00-\\x{10FFFF}]'
+RANGE_ALL = '[\\x00-\\x{10FFFF}]'
+
+FLAGS = {
+    re.IGNORECASE: 'i',
+    re.MULTILINE: 'm',
+    re.DOTALL: 's',
+    }
+# flags that change how the pattern is written rather than how it is matched
+WRITTEN_FLAGS = re.ASCII
+
+ANCHORS = {
+    StringStart(): r'\A',
+    StringEnd(): r'\z',
+    LineStart(): '^',
+    Any(): '.',
+    }
+CLASSES = {
+    Decimal(): r'\d',
+    NotDecimal(): r'\D',
+    Whitespace(): r'\s',
+    NotWhitespace(): r'\S',
+    Word(): r'\w',
+    NotWord(): r'\W',
+    }
+BOUNDARIES = {
+    're2': {WordBoundary(): r'\b', NotWordBoundary(): r'\B'},
+    'rust': {WordBoundary(): r'(?-u:\b)', NotWordBoundary(): r'(?-u:\B)'},
+    }
+
+def _escape(point, meta=META):
+    char = chr(point)
+    if char in meta:
+        return '\\' + char
+    if ' ' <= char <= '~':
+        return char
+    return f'\\x{{{point:X}}}'
+
+def _format_intervals(intervals, invert=False):
+    # Neither engine takes a lone surrogate in a class; they can not appear in
+    # the UTF-8 text these engines match, so are left out
+    members = []
+    for start, end in _without_surrogates(intervals):
+        members.append(_escape(start, CLASS_META))
+        if end > start + 1:
+            members.append(RANGE_CONT)
+        if end > start:
+            members.append(_escape(end, CLASS_META))
+    if not members:
+        return RANGE_ALL if invert else RANGE_NONE
+    return f'{RANGE_START}{RANGE_NOT if invert else ""}{"".join(members)}{RANGE_END}'
+
+@lru_cache(maxsize=None)
+def _format_class(escape, ascii):
+    if not ascii:
+        return _format_intervals(_class_intervals(escape))
+    positive = escape.lower()
+    return _format_intervals(_ascii_intervals(positive), invert=escape != positive)
+
+def _format_literal(klean):
+    point = ord(klean.char)
+    if 0xD800 <= point <= 0xDFFF:
+        raise ValueError(f'the surrogate {klean.char!r} can not be matched by RE2 or Rust')
+    return _escape(point)
+
+def _format_abstract(klean, dialect, flags):
+    if klean in ANCHORS:
+        return ANCHORS[klean]
+    if klean in CLASSES:
+        return _format_class(CLASSES[klean], bool(flags & re.ASCII))
+    if klean == LineEnd():
+        if not flags & re.MULTILINE:
+            raise ValueError('$ also matches before a final newline in python, which RE2 and '
+                             'Rust can not express; use StringEnd, or re.MULTILINE')
+        return '$'
+    if klean in BOUNDARIES[dialect]:
+        if not flags & re.ASCII:
+            raise ValueError(f'{dialect} has no word boundary on python\'s word characters, '
+                             'pass re.ASCII for one on ASCII word characters')
+        return BOUNDARIES[dialect][klean]
+    raise ValueError(f'{type(klean)} is not supported in {dialect} Regular Expressions')
+
+def _format_repetition(quantity, dialect):
+    if quantity.possessive:
+        raise ValueError(f'{dialect} has no possessive repetitions, recieved {quantity}')
+    if dialect == 're2' and max(quantity.min, quantity.max) > RE2_MAX_REPEAT:
+        raise ValueError(f're2 repeats at most {RE2_MAX_REPEAT} times, recieved {quantity}')
+    return _format_quantification(quantity)
+
+def _format_range(klean):
+    return _format_intervals(klean.intervals, klean.invert)
+
+def _close(klean, dialect):
+    if klean.atomic:
+        raise ValueError(f'{dialect} has no atomic groups')
+    return GROUP_END + _format_repetition(klean.repetition, dialect)
+
+def _emit(klean, out, dialect, flags):
+    # as resolvers.python._emit, with this dialect's spelling of each piece
+    _walk(klean, out, _format_literal, _format_range,
+          partial(_format_abstract, dialect=dialect, flags=flags), partial(_close, dialect=dialect),
+          dialect)
+
+def format(klean, dialect='re2', flags=0):
+    """Return klean as a pattern string for dialect, 're2' or 'rust'
+
+    flags are python's re flags: re.IGNORECASE, re.MULTILINE and re.DOTALL
+    become inline flags at the start of the pattern, and re.ASCII writes
+    classes and word boundaries for ASCII text.
+    """
+    if not isinstance(klean, Klean):
+        raise ValueError(f'format must be supplied with a Klean object, recieved {type(klean)} instead')
+    if dialect not in DIALECTS:
+        raise ValueError(f'dialect must be one of {", ".join(DIALECTS)}, recieved {dialect!r}')
+    unknown = flags & ~(WRITTEN_FLAGS | sum(FLAGS))
+    if unknown:
+        raise ValueError(f'{re.RegexFlag(unknown)!r} is not supported in {dialect}')
+    inline = ''.join(letter for flag, letter in FLAGS.items() if flags & flag)
+    out = [f'(?{inline})'] if inline else []
+    _emit(klean, out, dialect, flags)
+    return ''.join(out)
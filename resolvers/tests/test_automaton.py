@@ -0,0 +1,102 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Any, Decimal, LineEnd, NotWordBoundary, StringEnd,\
+    StringStart, Whitespace, Word, WordBoundary
+from model.tests._trees import random_klean
+from resolvers import automaton
+from resolvers.automaton import Automaton, compile
+from resolvers.python import format
+
+def _spans(matches):
+    return [match.span() for match in matches]
+
+@pytest.mark.parametrize("klean,string,expected", [
+    (Sequence('ab'), 'xxabab', [(2, 4), (4, 6)]),
+    (Group(Literal('a'), Sequence('ab'), OR=True, repetition=Quantification()), 'aab ab',
+     [(0, 2), (2, 2), (3, 3), (4, 5), (5, 5), (6, 6)]),
+    (Group(Word(), repetition=Quantification(min=1)), 'hi there!', [(0, 2), (3, 8)]),
+    (Group(Word(), repetition=Quantification(min=1, greedy=False)), 'hi', [(0, 1), (1, 2)]),
+    (Sequence(WordBoundary(), 'a'), 'ba a', [(3, 4)]),
+    (Sequence(NotWordBoundary()), '', []),
+    (Sequence('a', LineEnd()), 'a\na\n', [(2, 3)]),
+    (Sequence(StringStart(), 'a'), 'aa', [(0, 1)]),
+    (Group(Decimal(), repetition=Quantification(min=2, max=3)), '1234567', [(0, 3), (3, 6)]),
+    (Range('b', 'd', invert=True), 'abe', [(0, 1), (2, 3)]),
+    ])
+def test_finditer(klean, string, expected):
+    assert _spans(compile(klean).finditer(string)) == expected
+    assert _spans(re.finditer(format(klean), string)) == expected
+
+def test_match():
+    exp = Group(Sequence('ab'), Decimal(), repetition=Quantification(min=1))
+    matcher = compile(exp)
+    assert matcher.match('ab1ab2x').span() == (0, 6)
+    assert matcher.match('ab1ab2x').group() == 'ab1ab2'
+    assert matcher.match('xab1') is None
+    assert matcher.match('xab1', 1).span() == (1, 4)
+    assert matcher.fullmatch('ab1ab2') is not None
+    assert matcher.fullmatch('ab1ab2x') is None
+    assert matcher.search('x ab1').span() == (2, 5)
+    assert matcher.search('x ab') is None
+
+LEAVES = [Decimal(), StringStart(), StringEnd(), Range('a', 'b'), WordBoundary(), NotWordBoundary(),
+          LineEnd(), Any(), Whitespace()]
+
+def test_agrees_with_re():
+    rng = random.Random(5)
+    for i in range(500):
+        exp = random_klean(rng, 2, LEAVES)
+        pattern = re.compile(format(exp))
+        matcher = Automaton(exp)
+        for j in range(10):
+            string = ''.join(rng.choice('ab1 \n') for k in range(rng.randint(0, 8)))
+            for method in ('match', 'search', 'fullmatch'):
+                expected = getattr(pattern, method)(string)
+                result = getattr(matcher, method)(string)
+                assert (result and result.span()) == (expected and expected.span())
+            assert _spans(matcher.finditer(string)) == _spans(pattern.finditer(string))
+
+def test_adversarial():
+    # re takes exponential time to reject this; the automaton reads each
+    # character a bounded number of times
+    exp = Group(StringStart(), Group(Group(Word(), repetition=Quantification(min=1)),
+                                     Group(Whitespace(), repetition=Quantification(min=0, max=1)),
+                                     repetition=Quantification(min=1)), StringEnd())
+    assert compile(exp).search('a' * 5000 + '!') is None
+    assert compile(exp).search('a' * 5000).span() == (0, 5000)
+
+def test_deep():
+    exp = Literal('a')
+    for i in range(5000):
+        exp = Group(exp, Literal('b'), OR=True)
+    assert compile(exp).search('xb').span() == (1, 2)
+
+def test_cache_reset(monkeypatch):
+    monkeypatch.setattr(automaton, 'DFA_STATES', 8)
+    exp = Group(Range(('a', 'z')), repetition=Quantification(min=3, max=6))
+    matcher = Automaton(exp)
+    string = 'the quick brown fox jumps over the lazy dog'
+    assert _spans(matcher.finditer(string)) == _spans(re.finditer(format(exp), string))
+    assert matcher._unanchored.resets > 0
+
+def test_too_large():
+    with pytest.raises(RuntimeError):
+        compile(Group(Decimal(), repetition=Quantification(min=10**9)))
+
+def test_atomic_unsupported():
+    with pytest.raises(RuntimeError):
+        compile(Group(Literal('a'), atomic=True))
+    with pytest.raises(RuntimeError):
+        compile(Group(Literal('a'), repetition=Quantification(min=1, possessive=True)))
+
+def test_compile_shared():
+    assert compile(Sequence('abc')) is compile(Sequence('abc'))
+
+@pytest.mark.parametrize("illegal", ['abc', None, 5])
+def test_compile_illegal(illegal):
+    with pytest.raises(ValueError):
+        compile(illegal)
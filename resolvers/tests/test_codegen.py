@@ -0,0 +1,76 @@
+import re
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+from model._klean import Group, Literal, Quantification, Sequence
+from model.representations import Decimal, Word
+from resolvers.codegen import definitions, generate
+from resolvers.python import format
+
+ROOT = Path(__file__).resolve().parents[2]
+
+PATTERNS = {
+    'KEY': Group(Group(Word(), repetition=Quantification(min=1), capture='key'), Literal('=')),
+    'NUMBER': Group(Group(Decimal()), repetition=Quantification(min=1)),
+    'WORDS': Group(Sequence('blue'), Sequence('black'), OR=True),
+    }
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_generate(lazy):
+    namespace = {'__name__': 'generated'}
+    exec(generate(PATTERNS, flags=re.IGNORECASE | re.MULTILINE, lazy=lazy), namespace)
+    get = namespace['__getattr__'] if lazy else namespace.get
+    assert get('KEY').pattern == r'(?:(?P<key>\w)+=)'
+    assert get('NUMBER').pattern == r'(?:\d)+'
+    assert get('WORDS').pattern == format(PATTERNS['WORDS'])
+    assert get('WORDS').flags & re.IGNORECASE and get('WORDS').flags & re.MULTILINE
+    assert get('WORDS').search('BLACK').span() == (0, 5)
+    if lazy:
+        assert namespace['__all__'] == ['KEY', 'NUMBER', 'WORDS']
+        assert get('KEY') is namespace['KEY']
+        with pytest.raises(AttributeError):
+            get('OTHER')
+
+@pytest.mark.parametrize("patterns", [
+    {'_key': Literal('a')},
+    {'not a name': Literal('a')},
+    {'class': Literal('a')},
+    {'re': Literal('a')},
+    {'__getattr__': Literal('a')},
+    {'__all__': Literal('a')},
+    {'KEY': 'a'},
+    ])
+@pytest.mark.parametrize("lazy", [True, False])
+def test_generate_illegal(patterns, lazy):
+    with pytest.raises(ValueError):
+        generate(patterns, lazy=lazy)
+
+def test_definitions():
+    module = ModuleType('rules')
+    module.DIGITS = PATTERNS['NUMBER']
+    module._HIDDEN = Literal('a')
+    module.Group = Group
+    module.count = 3
+    assert definitions(module) == {'DIGITS': PATTERNS['NUMBER']}
+    assert definitions('model.representations') == {}
+
+def test_codegen_command(tmp_path):
+    (tmp_path / 'rules.py').write_text(
+        'from model._klean import Group, Literal, Quantification\n'
+        'from model.representations import Decimal\n'
+        "DIGITS = Group(Decimal(), repetition=Quantification(min=1))\n"
+        "_PRIVATE = Literal('x')\n"
+        "COMMA = Literal(',')\n")
+    command = [sys.executable, str(ROOT), 'codegen', 'rules', '-o', str(tmp_path / 'compiled.py')]
+    subprocess.run(command, cwd=tmp_path, check=True)
+    check = ('import sys, compiled; '
+             "assert compiled.DIGITS.findall('a 12, 3') == ['12', '3']; "
+             "assert compiled.COMMA.pattern == ','; "
+             "assert not hasattr(compiled, '_PRIVATE'); "
+             "assert not [name for name in sys.modules if name.split('.')[0] in "
+             "('model', 'resolvers')]")
+    subprocess.run([sys.executable, '-c', check], cwd=tmp_path, check=True)
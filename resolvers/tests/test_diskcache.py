@@ -0,0 +1,47 @@
+import json
+import re
+
+from model._klean import Group, Literal, Quantification, Sequence
+from model.representations import Decimal
+from model.serialize import digest
+from resolvers import diskcache
+from resolvers.diskcache import DiskPatternCache
+from resolvers.python import format
+
+TREE = Group(Group(Sequence('ab'), Literal('c'), OR=True, capture='x'),
+             Group(Group(Decimal()), repetition=Quantification(min=1)))
+
+def test_saved_for_later_processes(tmp_path):
+    pattern = DiskPatternCache(tmp_path).compile(TREE, re.IGNORECASE)
+    assert pattern.pattern == r'(?:(?P<x>ab|c)(?:\d)+)'
+    assert pattern.flags & re.IGNORECASE
+    assert [path.name for path in tmp_path.iterdir()] == [f'{digest(TREE)}-{int(re.I)}.json']
+    later = DiskPatternCache(tmp_path)
+    assert later.load(digest(TREE), re.IGNORECASE).pattern == pattern.pattern
+    assert later.load(digest(TREE)) is None
+    assert later.compile(TREE, re.IGNORECASE).pattern == pattern.pattern
+    assert later.info().misses == 1
+
+def test_read_not_resolved(tmp_path, monkeypatch):
+    DiskPatternCache(tmp_path).compile(TREE)
+    monkeypatch.setattr(diskcache, 'format', None)
+    assert DiskPatternCache(tmp_path).compile(TREE).groupindex == {'x': 1}
+
+def test_other_version_written_again(tmp_path, monkeypatch):
+    cache = DiskPatternCache(tmp_path)
+    cache.compile(TREE)
+    path = next(tmp_path.iterdir())
+    saved = json.loads(path.read_text())
+    path.write_text(json.dumps({**saved, 'pattern': 'stale'}))
+    assert DiskPatternCache(tmp_path).load(digest(TREE)).pattern == 'stale'
+    monkeypatch.setattr(diskcache, 'WRITER', 'another')
+    assert DiskPatternCache(tmp_path).load(digest(TREE)) is None
+    assert DiskPatternCache(tmp_path).compile(TREE).pattern == r'(?:(?P<x>ab|c)(?:\d)+)'
+    assert json.loads(path.read_text())['writer'] == 'another'
+
+def test_broken_entry(tmp_path):
+    DiskPatternCache(tmp_path).compile(TREE)
+    next(tmp_path.iterdir()).write_text('{"writer"')
+    assert DiskPatternCache(tmp_path).compile(TREE).pattern == format(Group(
+        Group(Sequence('ab'), Literal('c'), OR=True, capture='x'),
+        Group(Decimal(), repetition=Quantification(min=1))))
@@ -1,11 +1,14 @@
+import re
+
 import pytest
 
 from model._klean import Abstract, Group, Literal, Range, Sequence, Quantification
-from model.representations import Any, Decimal, LineEnd, LineStart, NotDecimal,\
-    NotWhitespace, NotWord, NotWordBoundary, StringEnd, StringStart,\
+from model.representations import Any, Decimal, LineEnd, LineStart, LowerAscii, NotDecimal,\
+    NotWhitespace, NotWord, NotWordBoundary, StringEnd, StringStart, UpperAscii,\
     Whitespace, Word, WordBoundary
-from resolvers.python import format, _format_abstract, _format_group, _format_literal,\
-    _format_quantification, _format_range, _format_sequence
+from model.passes import PASSES, drop_groups
+from resolvers.python import PatternCache, compile, format, _format_abstract, _format_group,\
+    _format_literal, _format_quantification, _format_range, _format_sequence
 
 @pytest.mark.parametrize("quantity,expected", [
     (Quantification(min=0, max=0, greedy=True), '*'),
@@ -46,6 +49,11 @@ from resolvers.python import format, _format_abstract, _format_group, _format_li
     (Quantification(min=9999, max=9999, greedy=True), '{9999}'),
     (Quantification(min=9999, max=0, greedy=False), '{9999,}?'),
     (Quantification(min=9999, max=9999, greedy=False), '{9999}?'),
+    (Quantification(min=0, max=0, possessive=True), '*+'),
+    (Quantification(min=0, max=1, possessive=True), '?+'),
+    (Quantification(min=1, max=0, possessive=True), '++'),
+    (Quantification(min=2, max=5, possessive=True), '{2,5}+'),
+    (Quantification(min=1, max=1, possessive=True), '{1}+'),
 ])
 def test_format_quantification(quantity, expected):
     assert _format_quantification(quantity) == expected
@@ -120,10 +128,59 @@ def test_format_abstract_type_error(illegal):
     (Range('A', '%', '-', invert=True), r'[^%\-A]'),
     (Range('z', 'z', '%', '^', invert=True), r'[^%\^z]'),
     (Range('A', '\u03A9', 'z', '\u03B0', invert=True), '[^Az\u03A9\u03B0]'),
+    (Range(('a', 'z')), '[a-z]'),
+    (Range(('a', 'c'), ('A', 'B'), '_', ('0', '9')), '[0-9AB_a-c]'),
+    (Range(('a', 'z'), invert=True), '[^a-z]'),
+    (Range(('+', '-')), r'[\+-\-]'),
+    (Range(('\u4E00', '\u9FFF')), '[\u4E00-\u9FFF]'),
+    (Range(('\x00', '\U0010FFFF')), '[\x00-\U0010FFFF]'),
+    (Range(), r'[^\s\S]'),
+    (Range(invert=True), r'[\s\S]'),
+    (LowerAscii(), '[a-z]'),
+    (UpperAscii(), '[A-Z]'),
 ])
 def test_format_range(range, expected):
     assert _format_range(range) == expected
 
+@pytest.mark.parametrize("members", [
+    Range(('a', 'z'), '-', ']', '^', '\\'),
+    Range(('\x00', '/'), ('[', '^'), invert=True),
+    Range(('\u4E00', '\u9FFF'), ('0', '2')),
+    Range(),
+    Range(invert=True),
+    LowerAscii(),
+    UpperAscii(),
+])
+def test_format_range_membership(members):
+    pattern = re.compile(_format_range(members))
+    for point in list(range(0x300)) + [0x4DFF, 0x4E00, 0x9FFF, 0xA000, 0x10FFFF]:
+        char = chr(point)
+        assert bool(pattern.fullmatch(char)) == (char in members)
+
+def test_ascii_letters():
+    assert 'm' in LowerAscii() and 'M' in UpperAscii()
+    assert 'M' not in LowerAscii() and 'm' not in UpperAscii()
+    assert compile(LowerAscii()).fullmatch('m')
+    assert compile(UpperAscii()).fullmatch('M')
+
+@pytest.mark.parametrize("escape", [r'\d', r'\w', r'\s'])
+def test_format_range_class_escape(escape):
+    everything = ''.join(map(chr, range(0x110000)))
+    members = [(m.group()[0], m.group()[-1]) for m in re.finditer(f'{escape}+', everything)]
+    assert _format_range(Range(*members)) == escape
+    assert _format_range(Range(*members, invert=True)) == escape.upper()
+    assert _format_range(Range(*members[1:])).startswith('[')
+
+@pytest.mark.parametrize("escape", [r'\d', r'\s'])
+def test_format_range_class_escape_ascii(escape):
+    everything = ''.join(map(chr, range(0x110000)))
+    members = [(m.group()[0], m.group()[-1]) for m in re.finditer(f'{escape}+', everything)]
+    klean = Range(*members)
+    assert _format_range(klean, re.ASCII).startswith('[')
+    pattern = compile(klean, re.ASCII)
+    assert pattern.pattern == format(klean, re.ASCII)
+    assert pattern.fullmatch('\u0663' if escape == r'\d' else '\u3000')
+
 @pytest.mark.parametrize("illegal", [
     #TODO
 ])
@@ -149,16 +206,16 @@ def test_format_sequence_runtime_error(illegal):
         _format_sequence(illegal)
 
 @pytest.mark.parametrize("group,expected", [
-    (Group(Literal('A'), Literal('B'), OR=False), '(AB)'),
-    (Group(Range('A', 'B'), Literal('z'), OR=False), '([AB]z)'),
-    (Group(Literal('A'), Sequence('%-'), OR=False), r'(A%\-)'),
-    (Group(Group(Literal('z'), Literal('z'), OR=False), Range('%', '^')), r'((zz)[%\^])'),
-    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=False), '(A\u03A9z\u03B0)'),
-    (Group(Literal('A'), Literal('B'), OR=True), '(A|B)'),
-    (Group(Range('A', 'B'), Literal('z'), OR=True), '([AB]|z)'),
-    (Group(Literal('A'), Sequence('%-'), OR=True), r'(A|%\-)'),
-    (Group(Group(Literal('z'), Literal('z')), Range('%', '^'), OR=True), r'((zz)|[%\^])'),
-    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=True), '(A\u03A9z\u03B0)'),
+    (Group(Literal('A'), Literal('B'), OR=False), '(?:AB)'),
+    (Group(Range('A', 'B'), Literal('z'), OR=False), '(?:[AB]z)'),
+    (Group(Literal('A'), Sequence('%-'), OR=False), r'(?:A%\-)'),
+    (Group(Group(Literal('z'), Literal('z'), OR=False), Range('%', '^')), r'(?:(?:zz)[%\^])'),
+    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=False), '(?:A\u03A9z\u03B0)'),
+    (Group(Literal('A'), Literal('B'), OR=True), '(?:A|B)'),
+    (Group(Range('A', 'B'), Literal('z'), OR=True), '(?:[AB]|z)'),
+    (Group(Literal('A'), Sequence('%-'), OR=True), r'(?:A|%\-)'),
+    (Group(Group(Literal('z'), Literal('z')), Range('%', '^'), OR=True), r'(?:(?:zz)|[%\^])'),
+    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=True), '(?:A\u03A9z\u03B0)'),
 ])
 def test_format_group(group, expected):
     assert _format_group(group) == expected
@@ -171,16 +228,16 @@ def test_format_group_illegal(illegal):
         _format_group(illegal)
 
 @pytest.mark.parametrize("input,expected", [
-    (Group(Literal('A'), Literal('B'), OR=False), '(AB)'),
-    (Group(Range('A', 'B'), Literal('z'), OR=False), '([AB]z)'),
-    (Group(Literal('A'), Sequence('%-'), OR=False), r'(A%\-)'),
-    (Group(Group(Literal('z'), Literal('z'), OR=False), Range('%', '^')), r'((zz)[%\^])'),
-    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=False), '(A\u03A9z\u03B0)'),
-    (Group(Literal('A'), Literal('B'), OR=True), '(A|B)'),
-    (Group(Range('A', 'B'), Literal('z'), OR=True), '([AB]|z)'),
-    (Group(Literal('A'), Sequence('%-'), OR=True), r'(A|%\-)'),
-    (Group(Group(Literal('z'), Literal('z')), Range('%', '^'), OR=True), r'((zz)|[%\^])'),
-    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=True), '(A\u03A9z\u03B0)'),
+    (Group(Literal('A'), Literal('B'), OR=False), '(?:AB)'),
+    (Group(Range('A', 'B'), Literal('z'), OR=False), '(?:[AB]z)'),
+    (Group(Literal('A'), Sequence('%-'), OR=False), r'(?:A%\-)'),
+    (Group(Group(Literal('z'), Literal('z'), OR=False), Range('%', '^')), r'(?:(?:zz)[%\^])'),
+    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=False), '(?:A\u03A9z\u03B0)'),
+    (Group(Literal('A'), Literal('B'), OR=True), '(?:A|B)'),
+    (Group(Range('A', 'B'), Literal('z'), OR=True), '(?:[AB]|z)'),
+    (Group(Literal('A'), Sequence('%-'), OR=True), r'(?:A|%\-)'),
+    (Group(Group(Literal('z'), Literal('z')), Range('%', '^'), OR=True), r'(?:(?:zz)|[%\^])'),
+    (Group(Sequence('A\u03A9', 'z\u03B0'), OR=True), '(?:A\u03A9z\u03B0)'),
 ])
 def test_format(input, expected):
     assert format(input) == expected
@@ -195,3 +252,148 @@ def test_format(input, expected):
 def test_format_illegal(illegal):
     with pytest.raises(ValueError):
         format(illegal)
+
+def _doubled(levels):
+    # a tree of levels distinct groups, each holding the one below it twice
+    tree = Group(Sequence('ab'), Literal('c'), OR=True)
+    for i in range(levels):
+        tree = Group(tree, Range('x', 'y'), tree, repetition=Quantification(max=i % 3))
+    return tree
+
+def _expected(levels):
+    text = '(?:ab|c)'
+    for i in range(levels):
+        text = f'(?:{text}[xy]{text}){_format_quantification(Quantification(max=i % 3))}'
+    return text
+
+def test_format_shared():
+    assert format(_doubled(16)) == _expected(16)
+    spacing = Group(Whitespace(), repetition=Quantification(min=1))
+    entry = Group(Sequence('ab'), Sequence('ac'), OR=True, capture='entry')
+    line = Group(entry, spacing, Group(entry, spacing, OR=True), spacing, entry)
+    assert format(Group(line, line, OR=True)) == \
+        r'(?:(?:(?P<entry>a(?:b|c))(?:\s)+(?:(?P<entry>a(?:b|c))|(?:\s)+)(?:\s)+' \
+        r'(?P<entry>a(?:b|c)))|(?:(?P<entry>a(?:b|c))(?:\s)+(?:(?P<entry>a(?:b|c))|(?:\s)+)' \
+        r'(?:\s)+(?P<entry>a(?:b|c))))'
+
+def test_pattern_cache_shares_equal_trees():
+    cache = PatternCache(maxsize=4)
+    colors = cache.compile(Group(Sequence('blue'), Sequence('green'), OR=True))
+    again = cache.compile(Group(Sequence('blue'), Sequence('green'), OR=True))
+    assert isinstance(colors, re.Pattern)
+    assert colors is again
+    assert colors.pattern == '(?:blue|green)'
+    assert cache.compile(Sequence('blue')) is cache.compile(Sequence('b', 'lue'))
+    assert cache.info() == (2, 2, 4, 2)
+
+def test_pattern_cache_keys():
+    cache = PatternCache(maxsize=4)
+    assert cache.compile(Sequence('blue')) is not cache.compile(Sequence('blue'), re.IGNORECASE)
+    assert cache.compile(Group(Literal('A'), Literal('B'))) is not \
+        cache.compile(Group(Literal('A'), Literal('B'), OR=True))
+    assert cache.info().hits == 0
+
+def test_compile_optimize():
+    exp = Group(Group(Literal('a'), Literal('b'), OR=True), Group(Sequence('cd')))
+    assert compile(exp).pattern == '(?:(?:a|b)(?:cd))'
+    assert compile(exp, optimize=True).pattern == '(?:[ab]cd)'
+    assert compile(exp, optimize=[drop_groups]).pattern == '(?:(?:a|b)cd)'
+    assert compile(exp, optimize=True) is compile(exp, optimize=list(PASSES))
+    cache = PatternCache()
+    cache.compile(exp)
+    cache.compile(exp, optimize=True)
+    assert cache.info().misses == 2
+
+def test_pattern_cache_eviction():
+    cache = PatternCache(maxsize=2)
+    first = cache.compile(Sequence('first'))
+    cache.compile(Sequence('second'))
+    assert cache.compile(Sequence('first')) is first
+    cache.compile(Sequence('third'))
+    assert cache.info() == (1, 3, 2, 2)
+    assert cache.compile(Sequence('first')) is first
+    cache.compile(Sequence('second'))
+    assert cache.info() == (2, 4, 2, 2)
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0)
+
+def test_pattern_cache_disabled():
+    cache = PatternCache(maxsize=0)
+    assert cache.compile(Sequence('blue')).pattern == 'blue'
+    assert cache.info() == (0, 1, 0, 0)
+
+@pytest.mark.parametrize("illegal", [
+    None,
+    "",
+    42,
+])
+def test_pattern_cache_illegal(illegal):
+    with pytest.raises(ValueError):
+        PatternCache().compile(illegal)
+    with pytest.raises(ValueError):
+        PatternCache(maxsize=-1)
+
+def test_format_captures():
+    exp = Group(Group(Sequence('ab'), capture=True), Group(Decimal(), capture='digit',
+                                                           repetition=Quantification(min=1)))
+    assert format(exp) == r'(?:(ab)(?P<digit>\d)+)'
+    match = compile(exp).match('ab12')
+    assert match.groups() == ('ab', '2')
+    assert match.group('digit') == '2'
+
+def test_format_atomic():
+    exp = Group(Group(Literal('a'), Sequence('ab'), OR=True, atomic=True), Literal('c'))
+    assert format(exp) == '(?:(?>a(?:b)??)c)'
+    assert compile(exp).search('abc') is None
+    exp = Group(Group(Word(), repetition=Quantification(min=1, possessive=True)), Literal('!'))
+    assert format(exp) == r'(?:(?:\w)++!)'
+    assert compile(exp).search('abc') is None
+    exp = Group(Literal('a'), capture='x', atomic=True, repetition=Quantification(min=2))
+    assert format(exp) == '(?P<x>(?>a)){2,}'
+    assert compile(exp).match('aaa').group('x') == 'a'
+
+def test_format_atomic_unsupported(monkeypatch):
+    import resolvers.python
+    monkeypatch.setattr(resolvers.python, 'ATOMIC', False)
+    with pytest.raises(ValueError):
+        format(Group(Literal('a'), atomic=True))
+    with pytest.raises(ValueError):
+        format(Group(Literal('a'), repetition=Quantification(possessive=True)))
+    assert format(Group(Literal('a'), repetition=Quantification())) == '(?:a)*'
+
+def test_format_deep():
+    depth = 20000
+    exp = Literal('a')
+    for i in range(depth):
+        exp = Group(exp, Literal('b'), repetition=Quantification(min=0, max=1))
+    assert format(exp) == '(?:' * depth + 'a' + 'b)?' * depth
+
+def test_format_wide():
+    exp = Group(*[Group(Sequence('ab'), Range('c', 'd'), OR=True) for i in range(10000)])
+    assert format(exp) == '(?:' + '(?:ab|[cd])' * 10000 + ')'
+
+@pytest.mark.parametrize("words,expected", [
+    (['blue', 'brown', 'green', 'grey'], '(?:b(?:lue|rown)|gre(?:en|y))'),
+    (['a', 'ab', 'abc', 'b'], '(?:a(?:b(?:c)??)??|b)'),
+    (['abc', 'ab', 'a'], '(?:a(?:b(?:c)?)?)'),
+    (['a+b', 'a+c', '(x'], r'(?:a\+(?:b|c)|\(x)'),
+    (['blue', 'green', 'black'], '(?:blue|green|black)'),
+    (['ab', 'a', 'abc'], '(?:ab|a|abc)'),
+])
+def test_format_alternation_trie(words, expected):
+    group = Group(*[Sequence(word) if len(word) > 1 else Literal(word) for word in words], OR=True)
+    assert _format_group(group) == expected
+
+def test_format_alternation_trie_equivalent():
+    import random
+    generator = random.Random(7)
+    for attempt in range(200):
+        words = [''.join(generator.choice('abc') for _ in range(generator.randint(1, 4)))
+                 for _ in range(generator.randint(2, 8))]
+        if generator.random() < 0.5:
+            words.sort()
+        naive = re.compile('|'.join(map(re.escape, words)))
+        trie = re.compile(format(Group(*map(Sequence, words), OR=True)))
+        for _ in range(20):
+            text = ''.join(generator.choice('abcd') for _ in range(generator.randint(0, 10)))
+            assert [m.span() for m in naive.finditer(text)] == [m.span() for m in trie.finditer(text)]
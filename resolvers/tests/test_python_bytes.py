@@ -0,0 +1,129 @@
+import mmap
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Any, Decimal, NotWord, StringEnd, StringStart, Whitespace,\
+    Word, WordBoundary
+from resolvers import python
+from resolvers.python_bytes import compile, format
+
+TEXT = 'key=1 Straße ٣٤ 中文 😀 x\ny　z é É\u212a STRASSE'
+
+@pytest.mark.parametrize("klean,expected", [
+    (Sequence('a.b'), b'a\\.b'),
+    (Literal('é'), b'\xc3\xa9'),
+    (Range(('a', 'c'), 'x'), b'[a-cx]'),
+    (Range('é', '中'), b'(?:\xc3\xa9|\xe4\xb8\xad)'),
+    (Range(('\x80', '߿')), b'[\xc2-\xdf][\x80-\xbf]'),
+    (Group(Literal('é'), repetition=Quantification(min=1)), b'(?:\xc3\xa9)+'),
+    (Group(Literal('é'), capture='e'), b'(?P<e>\xc3\xa9)'),
+    ])
+def test_format(klean, expected):
+    assert format(klean) == expected
+
+@pytest.mark.parametrize("klean,expected", [
+    (Literal('é'), b'\xe9'),
+    (Range('a', invert=True), b'[^a]'),
+    (Range('a', '中', invert=True), b'[^a]'),
+    (Range('a', '中'), b'a'),
+    (Any(), b'.'),
+    ])
+def test_format_latin_1(klean, expected):
+    assert format(klean, 'latin-1') == expected
+
+@pytest.mark.parametrize("klean,encoding,flags", [
+    (Literal('中'), 'latin-1', 0),
+    (Range('中', '文'), 'latin-1', 0),
+    (WordBoundary(), 'utf-8', 0),
+    (WordBoundary(), 'latin-1', 0),
+    (Literal('a'), 'utf-16', 0),
+    ('a', 'utf-8', 0),
+    ])
+def test_format_illegal(klean, encoding, flags):
+    with pytest.raises(ValueError):
+        format(klean, encoding, flags)
+
+def _spans(pattern, text, encoding):
+    # the spans pattern finds in the encoded text, as offsets into text
+    data = text.encode(encoding)
+    offsets = {len(text[:i].encode(encoding)): i for i in range(len(text) + 1)}
+    return [(offsets[m.start()], offsets[m.end()]) for m in pattern.finditer(data)]
+
+@pytest.mark.parametrize("klean", [
+    Group(Word(), repetition=Quantification(min=1)),
+    Group(Decimal(), repetition=Quantification(min=1)),
+    Group(NotWord(), Whitespace()),
+    Group(Any(), Any()),
+    Range(('a', 'z'), invert=True),
+    Group(StringStart(), Any(), OR=True),
+    Group(Range(('\x00', '\U0010ffff')), StringEnd()),
+    Sequence('straße'),
+    Group(Literal('k'), Range(('à', 'ö'), 'z'), OR=True),
+    Group(Literal('x'), repetition=Quantification()),
+    Group(Range('é', invert=True), repetition=Quantification(max=1)),
+    ])
+@pytest.mark.parametrize("flags", [0, re.DOTALL, re.ASCII, re.IGNORECASE,
+                                   re.IGNORECASE | re.ASCII])
+def test_agrees_with_str(klean, flags):
+    expected = [m.span() for m in python.compile(klean, flags).finditer(TEXT)]
+    assert _spans(compile(klean, flags), TEXT, 'utf-8') == expected
+    latin = ''.join(c for c in TEXT if ord(c) <= 0xff)
+    expected = [m.span() for m in python.compile(klean, flags).finditer(latin)]
+    assert _spans(compile(klean, flags, 'latin-1'), latin, 'latin-1') == expected
+
+def test_random_ranges():
+    rng = random.Random(3)
+    points = [0, 0x41, 0x7f, 0x80, 0x7ff, 0x800, 0xd7ff, 0xe000, 0xffff, 0x10000, 0x10ffff]
+    for i in range(200):
+        pairs = []
+        for j in range(rng.randint(1, 3)):
+            start = min(rng.choice(points) + rng.randint(0, 3), 0x10ffff)
+            end = min(start + rng.choice((0, 1, 60, 5000, 100000)), 0x10ffff)
+            pairs.append((chr(start), chr(end)))
+        klean = Range(*pairs, invert=rng.random() < 0.3)
+        pattern = re.compile(format(klean))
+        for c in rng.sample(range(0x110000), 300) + points:
+            if 0xd800 <= c <= 0xdfff:
+                continue
+            assert bool(pattern.fullmatch(chr(c).encode())) == (chr(c) in klean)
+
+def test_buffers(tmp_path):
+    pattern = compile(Group(Sequence('key='), Decimal()))
+    data = TEXT.encode()
+    assert pattern.search(bytearray(data)).span() == (0, 5)
+    assert pattern.search(memoryview(data)[1:]) is None
+    path = tmp_path / 'log'
+    path.write_bytes(b'\xff' * 10 + data)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        assert pattern.search(view).span() == (10, 15)
+
+def test_ignorecase():
+    assert compile(Sequence('é'), re.IGNORECASE).search('É'.encode())
+    assert compile(Sequence('é'), re.IGNORECASE | re.ASCII).search('É'.encode()) is None
+    assert compile(Literal('k'), re.IGNORECASE).fullmatch('\u212a'.encode())
+    assert format(Literal('1'), flags=re.IGNORECASE) == b'1'
+
+def test_empty_matches_between_characters():
+    # empty matches fall only between characters, never inside one
+    pattern = compile(Group(Literal('x'), repetition=Quantification()))
+    assert [m.span() for m in pattern.finditer('é\n'.encode())] == [(0, 0), (2, 2), (3, 3)]
+    assert format(Literal('x')) == b'x'
+    assert format(Literal('x'), 'latin-1', 0) == b'x'
+
+def test_word_boundary_ascii():
+    pattern = compile(Sequence(WordBoundary(), 'x'), re.ASCII)
+    assert [m.span() for m in pattern.finditer(b'x ax x')] == [(0, 1), (5, 6)]
+
+def test_compile_shared():
+    assert compile(Literal('é')) is compile(Literal('é'))
+    assert compile(Literal('é')) is not compile(Literal('é'), encoding='latin-1')
+    with pytest.raises(ValueError):
+        compile(Literal('é'), encoding='ascii')
+
+def test_format_shared():
+    pair = Group(Literal('é'), Range('a', 'b'), OR=True, repetition=Quantification(min=1))
+    tree = Group(pair, Group(pair, Sequence('xy'), pair), pair)
+    assert format(tree) == python.format(tree).encode('utf-8')
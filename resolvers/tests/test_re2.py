@@ -0,0 +1,103 @@
+import random
+import re
+
+import pytest
+
+from model._klean import Group, Literal, Range, Sequence, Quantification
+from model.representations import Any, Decimal, LineEnd, LineStart, NotWord, NotWordBoundary,\
+    StringEnd, StringStart, Whitespace, Word, WordBoundary
+from model.tests._trees import random_klean
+from resolvers import python
+from resolvers.re2 import format
+
+@pytest.mark.parametrize("klean,dialect,flags,expected", [
+    (Sequence('a.b'), 're2', 0, r'a\.b'),
+    (Sequence('a b#-'), 're2', 0, r'a b#-'),
+    (Literal('é'), 're2', 0, r'\x{E9}'),
+    (Literal('\n'), 'rust', 0, r'\x{A}'),
+    (Range(('a', 'c'), '-', ']'), 're2', 0, r'[\-\]a-c]'),
+    (Range('a', invert=True), 'rust', 0, r'[^a]'),
+    (Range(), 're2', 0, r'[^\x00-\x{10FFFF}]'),
+    (Range(('\ud000', '\ue000')), 're2', 0, r'[\x{D000}-\x{D7FF}\x{E000}]'),
+    (Decimal(), 're2', re.ASCII, r'[0-9]'),
+    (NotWord(), 'rust', re.ASCII, r'[^0-9A-Z_a-z]'),
+    (Group(StringStart(), Word(), StringEnd(), repetition=Quantification(min=2, max=5)),
+     'rust', re.ASCII, r'(?:\A[0-9A-Z_a-z]\z){2,5}'),
+    (Sequence(LineStart(), 'x', LineEnd()), 're2', re.MULTILINE, r'(?m)^x$'),
+    (Sequence(WordBoundary(), 'x'), 're2', re.ASCII, r'\bx'),
+    (Sequence(NotWordBoundary(), 'x'), 'rust', re.ASCII, r'(?-u:\B)x'),
+    (Group(Any(), repetition=Quantification(greedy=False)), 're2', re.DOTALL | re.I, r'(?is)(?:.)*?'),
+    (Group(Literal('a'), capture=True), 're2', 0, '(a)'),
+    (Group(Literal('a'), capture='x'), 'rust', 0, '(?P<x>a)'),
+    ])
+def test_format(klean, dialect, flags, expected):
+    assert format(klean, dialect, flags) == expected
+
+@pytest.mark.parametrize("klean,dialect,flags", [
+    (LineEnd(), 're2', 0),
+    (WordBoundary(), 're2', 0),
+    (NotWordBoundary(), 'rust', 0),
+    (Literal('\ud800'), 'rust', 0),
+    (Group(Literal('a'), repetition=Quantification(min=1001)), 're2', 0),
+    (Literal('a'), 're2', re.VERBOSE),
+    (Literal('a'), 'pcre', 0),
+    (Group(Literal('a'), atomic=True), 're2', 0),
+    (Group(Literal('a'), repetition=Quantification(possessive=True)), 'rust', 0),
+    ('a', 're2', 0),
+    ])
+def test_format_illegal(klean, dialect, flags):
+    with pytest.raises(ValueError):
+        format(klean, dialect, flags)
+
+def test_format_long_repetition_rust():
+    assert format(Group(Literal('a'), repetition=Quantification(min=1001)), 'rust') == '(?:a){1001,}'
+
+# every escape either engine is given: an escaped metacharacter, a code point,
+# or one of the assertions both know
+ESCAPES = re.compile(r'\\(?:[\\.+*?()|\[\]{}^$&~\-]|x\{[0-9A-F]+\}|[Azb]|B)')
+
+def _to_python(pattern):
+    # the same pattern in python's syntax, changing only how things are spelled
+    assert '\\' not in ESCAPES.sub('', pattern)
+    pattern = re.sub(r'\\x\{([0-9A-F]+)\}', lambda m: f'\\U{int(m.group(1), 16):08X}', pattern)
+    pattern = re.sub(r'\(\?-u:(\\[bB])\)', r'\1', pattern)
+    return re.sub(r'\\z', r'\\Z', pattern)
+
+LEAVES = [Decimal(), StringStart(), StringEnd(), Range('a', ('é', 'ü')),
+          Range('b', '\n', invert=True), WordBoundary(), NotWordBoundary(), LineStart(), LineEnd(),
+          Any(), Whitespace(), Word(), NotWord()]
+
+@pytest.mark.parametrize("dialect", ['re2', 'rust'])
+@pytest.mark.parametrize("flags", [re.MULTILINE | re.ASCII, re.MULTILINE | re.DOTALL | re.ASCII])
+def test_agrees_with_python(dialect, flags):
+    rng = random.Random(7)
+    for i in range(300):
+        exp = random_klean(rng, 2, LEAVES, 'ab-]', 'ab1é٣')
+        pattern = re.compile(python.format(exp), flags)
+        translated = re.compile(_to_python(format(exp, dialect, flags)), flags & re.ASCII)
+        for j in range(5):
+            string = ''.join(rng.choice('ab1 \n-]é٣\u3000') for k in range(rng.randint(0, 8)))
+            assert [m.span() for m in translated.finditer(string)] == \
+                [m.span() for m in pattern.finditer(string)]
+
+def test_agrees_with_python_unicode():
+    # classes are written out with python's unicode intervals
+    rng = random.Random(8)
+    text = ''.join(chr(rng.randrange(0x3000)) for i in range(5000))
+    for klean in (Decimal(), Whitespace(), Word(), NotWord(), Range('a', ('é', 'ü'), invert=True),
+                  Group(Sequence('ab'), Literal('é'), OR=True, repetition=Quantification(min=1))):
+        translated = re.compile(_to_python(format(klean)))
+        assert [m.span() for m in translated.finditer(text)] == \
+            [m.span() for m in python.compile(klean).finditer(text)]
+
+def test_compiles_in_re2():
+    re2 = pytest.importorskip('re2')
+    rng = random.Random(9)
+    for i in range(200):
+        exp = random_klean(rng, 2, LEAVES, 'ab-]', 'ab1é٣')
+        re2.compile(format(exp, 're2', re.MULTILINE | re.ASCII))
+
+def test_format_shared():
+    pair = Group(Sequence('ab'), Literal('c'), OR=True, repetition=Quantification(min=1))
+    tree = Group(pair, Group(pair, Literal('x'), pair, OR=True), pair)
+    assert format(tree) == '(?:(?:ab|c)+(?:(?:ab|c)+|x|(?:ab|c)+)(?:ab|c)+)'
@@ -18,7 +18,9 @@ def test_building():
     assert str(positions) == '(first<OR>last<OR>second<OR>third)<1,1GREATEST>'
 
     noun = Group(UpperAscii(), Group(LowerAscii(), repetition=Quantification(min=0, max=0)))
-    assert str(noun) == r'({A,Z}({a,z})<0,GREATEST>)<1,1GREATEST>'
+    assert str(noun) == ('({A,B,C,D,E,F,G,H,I,J,K,L,M,N,O,P,Q,R,S,T,U,V,W,X,Y,Z}'
+                         '({a,b,c,d,e,f,g,h,i,j,k,l,m,n,o,p,q,r,s,t,u,v,w,x,y,z})<0,GREATEST>)'
+                         '<1,1GREATEST>')
 
     spacing = Group(Whitespace(), repetition=Quantification(min=1, max=0))
     assert str(spacing) == r'(<SPACE>)<1,GREATEST>'
@@ -26,3 +28,12 @@ def test_building():
     entry = Group(positions, spacing, sizes, spacing, colors, spacing, noun)
 
     listing = Group(Group(entry, LineEnd(), repetition=Quantification(min=3)), entry)
+
+def test_compile_shared():
+    from resolvers.python import compile
+    colors = Group(Sequence('blue'), Sequence('green'), Sequence('orange'),
+                   OR=True, repetition=Quantification(min=0, max=1))
+    hues = Group(Sequence('blue'), Sequence('green'), Sequence('orange'),
+                 OR=True, repetition=Quantification(min=0, max=1))
+    assert colors is hues
+    assert compile(colors) is compile(hues)
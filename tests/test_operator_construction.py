@@ -2,24 +2,52 @@ import pytest
 
 from model._klean import Abstract, Group, Literal, Range, Sequence, Quantification
 from model.representations import Decimal, StringEnd, StringStart, Whitespace, Word
-from resolvers.python import format
+from resolvers.python import compile, format
 
 def test_and():
     exp = StringStart() & 'Title'
     assert format(exp) == r'\ATitle'
     exp &= Group(Whitespace(), repetition=Quantification(min=0, max=0)) & ':' & Word()
-    assert format(exp) == r'(\ATitle(((\s)*:)\w))'
+    assert format(exp) == r'(?:\ATitle(?:\s)*:\w)'
     exp &= '\n'
-    assert format(exp) == '((\ATitle(((\s)*:)\w))\\\n)'
+    assert format(exp) == '(?:\\ATitle(?:\\s)*:\\w\\\n)'
     exp &= Group(Whitespace(), repetition=Quantification(min=1, max=0)) & 'H' & 'e' & 'a' & 'd' & 'e' & 'r'
-    assert format(exp) == '(((\ATitle(((\s)*:)\w))\\\n)(((((((\s)+H)e)a)d)e)r))'
+    assert format(exp) == '(?:\\ATitle(?:\\s)*:\\w\\\n(?:\\s)+Header)'
     exp &= StringEnd()
-    assert format(exp) == '((((\ATitle(((\s)*:)\w))\\\n)(((((((\s)+H)e)a)d)e)r))\Z)'
-    assert str(exp) == '((((<SOS>Title(((<SPACE>)<0,GREATEST>:)<1,1GREATEST><WORD>)<1,1GREATEST>)<1,1GREATEST>\n)<1,1GREATEST>(((((((<SPACE>)<1,GREATEST>H)<1,1GREATEST>e)<1,1GREATEST>a)<1,1GREATEST>d)<1,1GREATEST>e)<1,1GREATEST>r)<1,1GREATEST>)<1,1GREATEST><EOS>)<1,1GREATEST>'
+    assert format(exp) == '(?:\\ATitle(?:\\s)*:\\w\\\n(?:\\s)+Header\\Z)'
+    assert str(exp) == '(<SOS>Title(<SPACE>)<0,GREATEST>:<WORD>\n(<SPACE>)<1,GREATEST>Header<EOS>)<1,1GREATEST>'
 
 def test_or():
     exp = Group(Literal('+'), Literal('-'), OR=True, repetition=Quantification(min=0, max=1))
-    assert format(exp) == r'(\+|\-)?'
+    assert format(exp) == r'(?:\+|\-)?'
     exp |= Decimal() | Group(Decimal(), Literal('.'), Decimal())
-    assert format(exp) == r'((\+|\-)?|(\d|(\d\.\d)))'
-    assert str(exp) == "((+<OR>-)<0,1GREATEST><OR>(<D><OR>(<D>.<D>)<1,1GREATEST>)<1,1GREATEST>)<1,1GREATEST>"
+    assert format(exp) == r'(?:(?:\+|\-)?|\d|(?:\d\.\d))'
+    assert compile(exp, optimize=True).pattern == r'(?:(?:[\+\-])?|\d|\d\.\d)'
+    assert str(exp) == "((+<OR>-)<0,1GREATEST><OR><D><OR>(<D>.<D>)<1,1GREATEST>)<1,1GREATEST>"
+
+def test_long_chains():
+    exp = Group(Whitespace(), repetition=Quantification(min=1))
+    for i in range(10000):
+        exp &= Group(Word(), repetition=Quantification())
+    assert len(exp) == 10001
+    assert format(exp) == '(?:(?:\\s)+' + '(?:\\w)*' * 10000 + ')'
+
+    exp = Literal('a')
+    for i in range(10000):
+        exp &= 'b'
+    assert exp == Sequence('a' + 'b' * 10000)
+
+    exp = Sequence('start')
+    for i in range(10000):
+        exp |= Sequence(str(i))
+    assert len(exp) == 10001
+    assert format(exp).count('|') == 10000
+
+def test_shared_prefix():
+    base = Sequence('ab') & Group(Decimal(), repetition=Quantification())
+    left = base & 'c'
+    right = base & 'd'
+    assert len(base) == 2
+    assert left == Group(Sequence('ab'), Group(Decimal(), repetition=Quantification()), Literal('c'))
+    assert right == Group(Sequence('ab'), Group(Decimal(), repetition=Quantification()), Literal('d'))
+    assert base & 'c' is left